@@ -0,0 +1,391 @@
+"""
+Cross-engine / cross-script benchmark on synthetic TLC data
+
+- Generates yellow-taxi data at each --sizes scale by running generate_tlc_data.py as a
+  subprocess (cached under --data-dir; rerunning with the same settings reuses the files), so
+  the harness itself stays small
+- Runs every case as its own subprocess, so each gets a clean interpreter and its own peak RSS,
+  and a crash/OOM in one case doesn't stop the run:
+    engines   python3 -m taxi_kpi build --engine duckdb | polars | pandas | pandas-stream
+    concat    concat_parquet.py over the monthly Parquet files
+    split     split_parquet.py --parts N over one file holding all months (prepared once, unmeasured)
+    csv2parquet / parquet2csv   duckdb_csv_to_parquet.py / duckdb_parquet_to_csv.py over the month files
+- Peak RSS is the child's own. A forked child inherits the harness's RSS high-water mark in
+  ru_maxrss (it survives exec), so the os.wait4 value is only trusted when it is above the
+  harness's ru_maxrss at spawn time. Otherwise the child's peak is the last VmHWM polled from
+  /proc/<pid>/status while it ran (VmHWM resets on exec). Where /proc is unavailable, the
+  wait4 value is an upper bound.
+- Records wall time, input rows/s and MB/s (input size on disk), peak RSS, output size and the exit
+  status per case and repeat; appends them to --results (.jsonl or .csv) so runs on different
+  machines/versions accumulate in one file. With --stages the engine cases also record the
+  per-stage seconds from `build --instrument`.
+- Prints a summary table (best repeat per size/case) at the end.
+
+Install:
+  python3 -m pip install duckdb polars pandas pyarrow numpy
+
+Usage examples:
+  # Quick look: every engine and script at 1M and 10M rows
+  python3 scripts/benchmark.py --sizes 1M 10M --results bench/results.jsonl
+
+  # Only the engines that matter on a big box, 3 repeats, direct file output, stage timings
+  python3 scripts/benchmark.py --sizes 100M 500M --months 12 \
+    --engines duckdb polars --scripts --repeat 3 --direct --stages \
+    --data-dir /Volumes/alienHD/bench_data --work-dir /Volumes/alienHD/bench_work \
+    --results bench/results.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from generate_tlc_data import PARAMS_FILE, format_count, parse_count
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_DIR = SCRIPTS_DIR.parent
+MB = 1024 * 1024
+RSS_POLL_SECONDS = 0.02
+
+ENGINES = ("duckdb", "polars", "pandas", "pandas-stream")
+SCRIPT_CASES = ("concat", "split", "csv2parquet", "parquet2csv")
+RESULT_FORMATS = ("jsonl", "csv")
+VERSIONED_PACKAGES = ("duckdb", "polars", "pandas", "pyarrow", "numpy")
+RESULT_FIELDS = (
+    "started_at", "size", "rows", "case", "kind", "run", "status", "returncode",
+    "seconds", "rows_per_s", "mb_per_s", "peak_rss_mb", "input_mb", "output_mb",
+    "threads", "cpus", "versions", "stages", "log",
+)
+
+
+class Case:
+    """One benchmarked command: what it reads (for throughput) and what it writes (cleared per run)."""
+
+    def __init__(self, name: str, kind: str, cmd: List[str], rows: int, input_bytes: int, output: Path,
+                 instrument: Optional[Path] = None):
+        self.name = name
+        self.kind = kind
+        self.cmd = cmd
+        self.rows = rows
+        self.input_bytes = input_bytes
+        self.output = output
+        self.instrument = instrument
+
+
+def versions() -> str:
+    out = []
+    for pkg in VERSIONED_PACKAGES:
+        try:
+            out.append(f"{pkg}={metadata.version(pkg)}")
+        except metadata.PackageNotFoundError:
+            pass
+    return " ".join(out)
+
+
+def path_bytes(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return 0
+
+
+def clear_output(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def files_bytes(files: List[Dict], suffix: str) -> int:
+    return sum(f["bytes"] for f in files if f["path"].endswith(suffix))
+
+
+def prepare_single_file(parquet_dir: Path, dst: Path) -> Path:
+    """All months in one Parquet file for the split case (row groups copied verbatim, not timed)."""
+    if not dst.exists() or any(p.stat().st_mtime > dst.stat().st_mtime for p in parquet_dir.glob("*.parquet")):
+        print(f"→ Preparing split input: {dst}")
+        subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "concat_parquet.py"), "--input", str(parquet_dir),
+             "-o", str(dst), "--fast-copy"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+    return dst
+
+
+def build_cases(args, rows: int, data: Dict, data_dir: Path, work: Path) -> List[Case]:
+    parquet_dir = data_dir / "parquet"
+    csv_dir = data_dir / "csv"
+    parquet_bytes = files_bytes(data["files"], ".parquet")
+    cases = []
+
+    for engine in args.engines:
+        out = work / f"{engine}.{args.output_format}"
+        cmd = [
+            sys.executable, "-m", "taxi_kpi", "build", "--engine", engine, "--trips", str(parquet_dir),
+            "--output", str(out), "--zones", args.zones, "--weather", args.weather,
+        ]
+        if args.threads:
+            cmd += ["--threads", str(args.threads)]
+        if args.direct:
+            cmd.append("--direct")
+        instrument = None
+        if args.stages:
+            instrument = work / f"{engine}.instrument.json"
+            cmd += ["--instrument", str(instrument)]
+        cases.append(Case(engine, "engine", cmd, rows, parquet_bytes, out, instrument))
+
+    threads = str(args.threads or os.cpu_count() or 1)
+    for name in args.scripts:
+        if name == "concat":
+            out = work / "concat.parquet"
+            cmd = [sys.executable, str(SCRIPTS_DIR / "concat_parquet.py"), "--input", str(parquet_dir), "-o", str(out)]
+            cases.append(Case(name, "script", cmd, rows, parquet_bytes, out))
+        elif name == "split":
+            src = prepare_single_file(parquet_dir, data_dir / "all.parquet")
+            out = work / "split"
+            cmd = [sys.executable, str(SCRIPTS_DIR / "split_parquet.py"), "--input", str(src),
+                   "--output-dir", str(out), "--parts", str(args.split_parts)]
+            cases.append(Case(name, "script", cmd, rows, src.stat().st_size, out))
+        elif name == "csv2parquet":
+            out = work / "csv2parquet"
+            cmd = [sys.executable, str(SCRIPTS_DIR / "duckdb_csv_to_parquet.py"), "--in-dir", str(csv_dir),
+                   "--out-dir", str(out), "--threads", threads, "--level", str(args.level), "--overwrite"]
+            cases.append(Case(name, "script", cmd, rows, files_bytes(data["files"], ".csv"), out))
+        elif name == "parquet2csv":
+            out = work / "parquet2csv"
+            cmd = [sys.executable, str(SCRIPTS_DIR / "duckdb_parquet_to_csv.py"), "--in-dir", str(parquet_dir),
+                   "--out-dir", str(out), "--threads", threads, "--overwrite"]
+            cases.append(Case(name, "script", cmd, rows, parquet_bytes, out))
+    return cases
+
+
+def max_rss_bytes() -> int:
+    """This process's ru_maxrss in bytes (what a child forked now starts from)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return own if sys.platform == "darwin" else own * 1024
+
+
+def vm_hwm_bytes(pid: int) -> Optional[int]:
+    """VmHWM of a running process from /proc (reset on exec, so it is the child's own peak)."""
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class HwmPoller(threading.Thread):
+    """Polls a child's VmHWM until stopped; `peak` is the highest value seen (None without /proc)."""
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak: Optional[int] = None
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.is_set():
+            hwm = vm_hwm_bytes(self.pid)
+            if hwm is not None:
+                self.peak = max(self.peak or 0, hwm)
+            self.done.wait(RSS_POLL_SECONDS)
+
+
+def child_peak(usage_peak: int, inherited: int, polled: Optional[int]) -> int:
+    # ru_maxrss starts at the parent's high-water mark; above it, it is the child's real peak
+    if usage_peak > inherited or polled is None:
+        return usage_peak
+    return polled
+
+
+def generate_data(args, data_dir: Path, rows: int, fmt: str) -> Dict:
+    """Run generate_tlc_data.py in its own process (keeps the harness RSS small); returns generated.json."""
+    cmd = [
+        sys.executable, str(SCRIPTS_DIR / "generate_tlc_data.py"),
+        "--out-dir", str(data_dir), "--rows", str(rows), "--months", str(args.months),
+        "--format", fmt, "--seed", str(args.seed), "--chunk-rows", str(args.chunk_rows),
+    ]
+    if subprocess.run(cmd, cwd=str(REPO_DIR)).returncode != 0:
+        raise SystemExit(f"✖ Data generation failed for {format_count(rows)} rows")
+    return json.loads((data_dir / PARAMS_FILE).read_text(encoding="utf-8"))
+
+
+def run_case(case: Case, log: Path, timeout: Optional[float]) -> Dict:
+    """Run one case in a child process; wall time and that child's own peak RSS (see module docstring)."""
+    clear_output(case.output)
+    if case.instrument is not None:
+        clear_output(case.instrument)
+    log.parent.mkdir(parents=True, exist_ok=True)
+    with open(log, "w", encoding="utf-8") as out:
+        inherited = max_rss_bytes()
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(case.cmd, cwd=str(REPO_DIR), stdout=out, stderr=subprocess.STDOUT)
+        poller = HwmPoller(proc.pid)
+        poller.start()
+        timer = threading.Timer(timeout, proc.kill) if timeout else None
+        if timer is not None:
+            timer.start()
+        try:
+            # wait4 (not proc.wait) so the rusage is this child's, not every child's so far
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            poller.done.set()
+            if timer is not None:
+                timer.cancel()
+        secs = time.perf_counter() - t0
+        poller.join()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    usage_peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    peak = child_peak(usage_peak, inherited, poller.peak)
+
+    if proc.returncode == 0:
+        state = "ok"
+    elif proc.returncode == -9 and timeout and secs >= timeout:
+        state = "timeout"
+    else:
+        state = "failed"
+    stages = None
+    if state == "ok" and case.instrument is not None and case.instrument.exists():
+        report = json.loads(case.instrument.read_text(encoding="utf-8"))
+        stages = {st["stage"]: st["seconds"] for st in report["stages"]}
+    return {
+        "status": state,
+        "returncode": proc.returncode,
+        "seconds": round(secs, 3),
+        "rows_per_s": round(case.rows / secs) if secs > 0 else None,
+        "mb_per_s": round(case.input_bytes / MB / secs, 1) if secs > 0 else None,
+        "peak_rss_mb": round(peak / MB, 1),
+        "input_mb": round(case.input_bytes / MB, 1),
+        "output_mb": round(path_bytes(case.output) / MB, 1),
+        "stages": stages,
+    }
+
+
+def result_format(path: str) -> str:
+    fmt = Path(path).suffix.lower().lstrip(".")
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"Results file must be .jsonl or .csv, got '{path}'")
+    return fmt
+
+
+def append_result(path: Path, record: Dict) -> None:
+    """Append one result (written after every case, so an interrupted run keeps what it measured)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if result_format(str(path)) == "jsonl":
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        return
+    new = not path.exists() or path.stat().st_size == 0
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if new:
+            w.writeheader()
+        w.writerow({**record, "stages": json.dumps(record["stages"]) if record["stages"] else ""})
+
+
+def print_summary(records: List[Dict]) -> None:
+    if not records:
+        return
+    best = {}
+    for r in records:
+        key = (r["rows"], r["case"])
+        if key not in best or (r["status"] == "ok" and (best[key]["status"] != "ok" or r["seconds"] < best[key]["seconds"])):
+            best[key] = r
+    print(f"\n{'size':>6}  {'case':<14} {'status':<8} {'seconds':>9} {'Mrows/s':>8} {'MB/s':>8} {'peak MB':>9} {'out MB':>8}")
+    for _, r in sorted(best.items(), key=lambda kv: (kv[0][0], kv[1]["kind"], kv[1]["seconds"])):
+        mrows = f"{r['rows_per_s'] / 1e6:.2f}" if r["status"] == "ok" and r["rows_per_s"] else "-"
+        mbps = f"{r['mb_per_s']:.1f}" if r["status"] == "ok" and r["mb_per_s"] is not None else "-"
+        print(f"{r['size']:>6}  {r['case']:<14} {r['status']:<8} {r['seconds']:>9.2f} {mrows:>8} {mbps:>8} "
+              f"{r['peak_rss_mb']:>9.1f} {r['output_mb']:>8.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the taxi_kpi engines and the Parquet/CSV scripts on synthetic TLC data.")
+    ap.add_argument("--sizes", nargs="+", default=["1M"], help="Row counts to test, e.g. 1M 10M 100M 500M (default: 1M)")
+    ap.add_argument("--engines", nargs="*", default=list(ENGINES), choices=list(ENGINES),
+                    help="Engines to run (default: all; pass the flag alone for none)")
+    ap.add_argument("--scripts", nargs="*", default=list(SCRIPT_CASES), choices=list(SCRIPT_CASES),
+                    help="Scripts to run (default: all; pass the flag alone for none)")
+    ap.add_argument("--months", type=int, default=2, help="Monthly files per size (default: 2, Jan-Feb 2024)")
+    ap.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0)")
+    ap.add_argument("--chunk-rows", type=int, default=1_000_000, help="Generator chunk = Parquet row group size (default: 1,000,000)")
+    ap.add_argument("--data-dir", default="bench_data", help="Generated data cache, one folder per size (default: bench_data)")
+    ap.add_argument("--work-dir", default="bench_work", help="Case outputs and logs, cleared before every run (default: bench_work)")
+    ap.add_argument("--results", default="bench_results.jsonl", help="Append results here (.jsonl or .csv; default: bench_results.jsonl)")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per case (default: 1)")
+    ap.add_argument("--timeout", type=float, default=None, help="Kill a case after this many seconds (recorded as timeout)")
+    ap.add_argument("--threads", type=int, default=None, help="Threads for the engines and DuckDB scripts (default: all cores)")
+    ap.add_argument("--output-format", default="parquet", choices=["parquet", "csv"], help="Engine output format (default: parquet)")
+    ap.add_argument("--direct", action="store_true", help="Engines write with build --direct (no pandas frame)")
+    ap.add_argument("--stages", action="store_true", help="Record per-stage seconds of the engine cases (build --instrument)")
+    ap.add_argument("--split-parts", type=int, default=4, help="split case: number of parts (default: 4)")
+    ap.add_argument("--level", type=int, default=9, help="csv2parquet case: ZSTD level (default: 9)")
+    ap.add_argument("--zones", default=str(REPO_DIR / "datasets" / "taxi_zone_lookup.parquet"), help="Zone lookup for the engines")
+    ap.add_argument("--weather", default=str(REPO_DIR / "datasets" / "weather_data.parquet"), help="Hourly weather for the engines")
+    args = ap.parse_args()
+
+    try:
+        result_format(args.results)
+        sizes = [parse_count(s) for s in args.sizes]
+        if args.repeat < 1:
+            raise ValueError("--repeat must be >= 1")
+    except ValueError as e:
+        raise SystemExit(f"✖ {e}")
+
+    data_root = Path(args.data_dir).expanduser().resolve()
+    work_root = Path(args.work_dir).expanduser().resolve()
+    results = Path(args.results).expanduser().resolve()
+    fmt = "both" if "csv2parquet" in args.scripts else "parquet"
+    host = {"cpus": os.cpu_count(), "versions": f"python={platform.python_version()} {versions()}"}
+
+    records = []
+    for rows in sizes:
+        size = format_count(rows)
+        data_dir = data_root / size
+        data = generate_data(args, data_dir, rows, fmt)
+        work = work_root / size
+        work.mkdir(parents=True, exist_ok=True)
+
+        for case in build_cases(args, rows, data, data_dir, work):
+            for run in range(1, args.repeat + 1):
+                print(f"→ {size} {case.name} (run {run}/{args.repeat})")
+                log = work / "logs" / f"{case.name}-{run}.log"
+                record = {
+                    "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "size": size, "rows": rows, "case": case.name, "kind": case.kind, "run": run,
+                    "threads": args.threads, **host, "log": str(log),
+                }
+                record.update(run_case(case, log, args.timeout))
+                record = {k: record.get(k) for k in RESULT_FIELDS}
+                append_result(results, record)
+                records.append(record)
+                if record["status"] == "ok":
+                    print(f"✔ {record['seconds']:.2f}s  |  {record['rows_per_s']:,} rows/s  |  "
+                          f"{record['mb_per_s']} MB/s  |  peak {record['peak_rss_mb']} MB")
+                else:
+                    print(f"✖ {record['status']} (exit {record['returncode']}) after {record['seconds']:.1f}s  |  see {log}")
+            clear_output(case.output)
+
+    print_summary(records)
+    print(f"\nResults appended to {results}")
+    # Peak of the harness itself (the generator runs in its own process)
+    print(f"Harness peak RSS: {max_rss_bytes() / MB:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,19 @@ Stack many Parquet files into one single Parquet file, safely handling schema di
 
 Key features:
 - Streams row groups, not entire files (handles 10s–100s of GB without huge RAM)
-- Unifies schema across files (adds missing columns as nulls, consistent order)
+- Unifies schema across files (adds missing columns as nulls, consistent order); footers are
+  read in parallel and cached per directory in .parquet_catalog.json (parquet_catalog.py), so
+  reruns over thousands of parts only re-read the files that changed
 - Optional timestamp unit coercion (s, ms, us, ns)
 - Optional column subset selection
+- Pipelined: reader threads prefetch + align upcoming row groups (across files) while the
+  main thread encodes/writes the current one. Output order == input order, and in-flight
+  row groups are capped by --max-inflight-mb so memory stays bounded.
+- Optional fast path (--fast-copy): inputs whose schema and codec already match the output
+  have their row groups copied byte-for-byte (no decode/encode), only the footer is rewritten.
+- Optional coalescing (--coalesce) of small row groups into ~--row-group-size groups.
+- Optional --autotune write|size: codec, level and dictionary encoding picked by measuring a
+  sample of the inputs (see parquet_autotune.py), instead of a fixed zstd default.
 
 IMPORTANT: 
 * Make sure the output directory is different from input ones. 
@@ -60,20 +70,62 @@ Here you go—sorted into your two buckets:
     --compression zstd
   ```
 
+* Tune the read/align/write pipeline (readers prefetch while the writer encodes):
+
+  ```bash
+  python3 concat_parquet.py \
+    --input "data/" \
+    --output "out/merged.parquet" \
+    --readers 6 \
+    --max-inflight-mb 2048
+  ```
+  `--readers 0` falls back to the fully serial read → align → write loop.
+
+* Let a sample of the data pick the codec (smallest output that still reads at ≥ 400 MB/s):
+
+  ```bash
+  python3 concat_parquet.py \
+    --input "data/" \
+    --output "out/merged.parquet" \
+    --autotune size --min-read-mbps 400 --autotune-save out/tuned.json
+  ```
+  Later runs can reuse the choice without measuring again: `--autotune out/tuned.json`.
+
+* Copy already-compatible row groups verbatim and pack tiny ones together:
+
+  ```bash
+  python3 concat_parquet.py \
+    --input "data/" \
+    --output "out/merged.parquet" \
+    --compression zstd \
+    --fast-copy --coalesce --row-group-size 1000000
+  ```
+  Inputs that differ in schema or codec are re-encoded as usual. Copied column chunks keep
+  their statistics but drop page indexes and bloom filters (they live outside the row group).
+
 * Only the **directory** form (`--input "data/"`) recurses into subfolders in the provided script. The `*.parquet` / `part-*.parquet` globs match files in the top level of `data/` only.
 
 """
 
 import argparse
+import copy
 import glob
+import io
 import os
 import sys
-from typing import Iterable, List, Optional, Sequence
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import pyarrow as pa
 import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 
+import parquet_autotune
+import parquet_catalog
+
+DEFAULT_COALESCE_ROWS = 1_000_000
+
 
 def discover_inputs(input_glob: str) -> List[str]:
     # Accept directory or glob. If directory, recurse and pick *.parquet
@@ -86,19 +138,22 @@ def discover_inputs(input_glob: str) -> List[str]:
     return files
 
 
-def arrow_schema_from_file(path: str) -> pa.Schema:
-    pf = pq.ParquetFile(path)
-    return pf.schema_arrow
+def scan_inputs(files: Sequence[str]) -> Dict[str, parquet_catalog.FileInfo]:
+    """Footer facts of every input, read in parallel or from the directory's catalog sidecar."""
+    infos, errors = parquet_catalog.scan_with_errors(files)
+    for f, e in errors.items():
+        print(f"Warning: skipping {f} due to schema read error: {e}", file=sys.stderr)
+    return {info.path: info for info in infos}
 
 
-def unify_all_schemas(files: Sequence[str], keep_columns: Optional[Sequence[str]] = None) -> pa.Schema:
+def unify_all_schemas(
+    files: Sequence[str],
+    keep_columns: Optional[Sequence[str]] = None,
+    infos: Optional[Dict[str, parquet_catalog.FileInfo]] = None,
+) -> pa.Schema:
     # Gather schemas from all files
-    schemas = []
-    for f in files:
-        try:
-            schemas.append(arrow_schema_from_file(f))
-        except Exception as e:
-            print(f"Warning: skipping {f} due to schema read error: {e}", file=sys.stderr)
+    infos = scan_inputs(files) if infos is None else infos
+    schemas = [infos[f].schema for f in files if f in infos]
 
     if not schemas:
         raise RuntimeError("No readable Parquet schemas found in inputs.")
@@ -178,6 +233,453 @@ def iter_row_groups(path: str, columns: Optional[Sequence[str]] = None) -> Itera
         yield pf.read_row_group(i, columns=columns)
 
 
+def _read_aligned(path: str, metadata, rg_index: int, columns: Sequence[str], target: pa.Schema) -> pa.Table:
+    # Runs on a reader thread; Arrow releases the GIL while decoding and casting.
+    # Reusing the parsed footer avoids re-reading it for every row group.
+    pf = pq.ParquetFile(path, metadata=metadata)
+    try:
+        return ensure_table_matches_schema(pf.read_row_group(rg_index, columns=columns), target)
+    finally:
+        pf.close()
+
+
+def iter_row_group_plan(files: Sequence[str]) -> Iterator[Tuple[str, object, int, int]]:
+    """Yield (path, metadata, row group index, estimated bytes) in input order."""
+    for path in files:
+        try:
+            md = pq.ParquetFile(path).metadata
+        except Exception as e:
+            print(f"Warning: failed to append {path}: {e}", file=sys.stderr)
+            continue
+        for i in range(md.num_row_groups):
+            yield path, md, i, max(1, md.row_group(i).total_byte_size)
+
+
+# (path, row group index, aligned table, error). Row groups selected by `copy_filter`
+# are not read at all and come back as (path, index, None, None): copy them verbatim.
+RowGroupItem = Tuple[str, int, Optional[pa.Table], Optional[Exception]]
+CopyFilter = Optional[Callable[[str, object, int], bool]]
+
+
+def iter_aligned_row_groups(
+    files: Sequence[str],
+    target: pa.Schema,
+    readers: int,
+    max_inflight_bytes: int,
+    copy_filter: CopyFilter = None,
+) -> Iterator[RowGroupItem]:
+    """
+    Bounded producer/consumer: up to `readers` threads read + align row groups ahead of the
+    writer. Results are yielded strictly in input order. A new read is only scheduled while
+    the estimated (uncompressed) size of everything in flight stays under max_inflight_bytes;
+    one row group is always allowed so oversized groups still make progress.
+    """
+    columns = [f.name for f in target]
+    plan = iter_row_group_plan(files)
+    inflight = deque()
+    inflight_bytes = 0
+    failed_paths = set()
+    pending_item = None
+
+    with ThreadPoolExecutor(max_workers=readers, thread_name_prefix="pq-reader") as pool:
+        while True:
+            # Fill the pipeline up to the memory cap
+            while True:
+                if pending_item is None:
+                    pending_item = next(plan, None)
+                    if pending_item is None:
+                        break
+                path, md, rg_index, est = pending_item
+                if copy_filter is not None and copy_filter(path, md, rg_index):
+                    inflight.append((path, rg_index, 0, None))
+                    pending_item = None
+                    continue
+                if inflight_bytes and inflight_bytes + est > max_inflight_bytes:
+                    break
+                fut = pool.submit(_read_aligned, path, md, rg_index, columns, target)
+                inflight.append((path, rg_index, est, fut))
+                inflight_bytes += est
+                pending_item = None
+
+            if not inflight:
+                return
+
+            path, rg_index, est, fut = inflight.popleft()
+            tbl, err = None, None
+            if fut is not None:
+                try:
+                    tbl = fut.result()
+                except Exception as e:
+                    err = e
+                inflight_bytes -= est
+
+            # Mirror the serial behaviour: the first failing row group drops the rest of that file
+            if path in failed_paths:
+                continue
+            if err is not None:
+                failed_paths.add(path)
+            yield path, rg_index, tbl, err
+
+
+def iter_row_groups_serial(
+    files: Sequence[str],
+    target: pa.Schema,
+    copy_filter: CopyFilter = None,
+) -> Iterator[RowGroupItem]:
+    """Same items as iter_aligned_row_groups, read → align on the calling thread (--readers 0)."""
+    columns = [f.name for f in target]
+    for path in files:
+        try:
+            pf = pq.ParquetFile(path)
+            for i in range(pf.num_row_groups):
+                if copy_filter is not None and copy_filter(path, pf.metadata, i):
+                    yield path, i, None, None
+                    continue
+                # Align the rg table to the unified schema (order, types, missing columns)
+                yield path, i, ensure_table_matches_schema(pf.read_row_group(i, columns=columns), target), None
+        except Exception as e:
+            yield path, -1, None, e
+
+
+# --- Verbatim row-group copy ---------------------------------------------------------------
+# PyArrow cannot append already-encoded row groups to a writer, so the fast path splices the
+# column-chunk bytes itself and rewrites the footer. Parquet footers are Thrift compact
+# protocol; the minimal codec below decodes them into nested [field_id, type, value] lists,
+# which round-trip byte-for-byte and let us shift page offsets.
+
+_CT_STOP, _CT_TRUE, _CT_FALSE, _CT_BYTE, _CT_I16, _CT_I32, _CT_I64 = 0, 1, 2, 3, 4, 5, 6
+_CT_DOUBLE, _CT_BINARY, _CT_LIST, _CT_SET, _CT_MAP, _CT_STRUCT = 7, 8, 9, 10, 11, 12
+
+
+class _ThriftReader:
+    def __init__(self, buf: bytes):
+        self.buf = buf
+        self.pos = 0
+
+    def byte(self) -> int:
+        b = self.buf[self.pos]
+        self.pos += 1
+        return b
+
+    def varint(self) -> int:
+        shift = result = 0
+        while True:
+            b = self.byte()
+            result |= (b & 0x7F) << shift
+            if not b & 0x80:
+                return result
+            shift += 7
+
+    def zigzag(self) -> int:
+        n = self.varint()
+        return (n >> 1) ^ -(n & 1)
+
+    def value(self, ctype: int):
+        if ctype in (_CT_TRUE, _CT_FALSE, _CT_BYTE):
+            return self.byte()  # bools inside collections are one raw byte
+        if ctype in (_CT_I16, _CT_I32, _CT_I64):
+            return self.zigzag()
+        if ctype == _CT_DOUBLE:
+            self.pos += 8
+            return self.buf[self.pos - 8:self.pos]
+        if ctype == _CT_BINARY:
+            n = self.varint()
+            self.pos += n
+            return self.buf[self.pos - n:self.pos]
+        if ctype in (_CT_LIST, _CT_SET):
+            header = self.byte()
+            size, etype = header >> 4, header & 0x0F
+            if size == 15:
+                size = self.varint()
+            return [etype, [self.value(etype) for _ in range(size)]]
+        if ctype == _CT_MAP:
+            size = self.varint()
+            if size == 0:
+                return [0, 0, []]
+            kv = self.byte()
+            ktype, vtype = kv >> 4, kv & 0x0F
+            return [ktype, vtype, [[self.value(ktype), self.value(vtype)] for _ in range(size)]]
+        if ctype == _CT_STRUCT:
+            return self.struct()
+        raise ValueError(f"Unsupported thrift type {ctype}")
+
+    def struct(self) -> list:
+        fields, last = [], 0
+        while True:
+            header = self.byte()
+            if header == _CT_STOP:
+                return fields
+            delta, ctype = header >> 4, header & 0x0F
+            fid = last + delta if delta else self.zigzag()
+            if ctype in (_CT_TRUE, _CT_FALSE):
+                val = ctype == _CT_TRUE
+            else:
+                val = self.value(ctype)
+            fields.append([fid, ctype, val])
+            last = fid
+
+
+class _ThriftWriter:
+    def __init__(self):
+        self.out = bytearray()
+
+    def varint(self, n: int):
+        while True:
+            b = n & 0x7F
+            n >>= 7
+            if n:
+                self.out.append(b | 0x80)
+            else:
+                self.out.append(b)
+                return
+
+    def zigzag(self, n: int):
+        self.varint((n << 1) ^ (n >> 63))
+
+    def value(self, ctype: int, v):
+        if ctype in (_CT_TRUE, _CT_FALSE, _CT_BYTE):
+            self.out.append(v & 0xFF)
+        elif ctype in (_CT_I16, _CT_I32, _CT_I64):
+            self.zigzag(v)
+        elif ctype == _CT_DOUBLE:
+            self.out += v
+        elif ctype == _CT_BINARY:
+            self.varint(len(v))
+            self.out += v
+        elif ctype in (_CT_LIST, _CT_SET):
+            etype, items = v
+            if len(items) < 15:
+                self.out.append((len(items) << 4) | etype)
+            else:
+                self.out.append(0xF0 | etype)
+                self.varint(len(items))
+            for item in items:
+                self.value(etype, item)
+        elif ctype == _CT_MAP:
+            ktype, vtype, items = v
+            self.varint(len(items))
+            if items:
+                self.out.append((ktype << 4) | vtype)
+            for k, val in items:
+                self.value(ktype, k)
+                self.value(vtype, val)
+        elif ctype == _CT_STRUCT:
+            self.struct(v)
+        else:
+            raise ValueError(f"Unsupported thrift type {ctype}")
+
+    def struct(self, fields: list):
+        last = 0
+        for fid, ctype, val in fields:
+            if ctype in (_CT_TRUE, _CT_FALSE):
+                ctype = _CT_TRUE if val else _CT_FALSE
+            delta = fid - last
+            if 0 < delta <= 15:
+                self.out.append((delta << 4) | ctype)
+            else:
+                self.out.append(ctype)
+                self.zigzag(fid)
+            if ctype not in (_CT_TRUE, _CT_FALSE):
+                self.value(ctype, val)
+            last = fid
+        self.out.append(_CT_STOP)
+
+
+def _field(fields: list, fid: int):
+    for f in fields:
+        if f[0] == fid:
+            return f
+    return None
+
+
+def read_footer(f: BinaryIO) -> list:
+    """Decoded FileMetaData of an open Parquet file."""
+    f.seek(-8, os.SEEK_END)
+    tail = f.read(8)
+    if tail[4:] != b"PAR1":
+        raise ValueError("not a plain (unencrypted) Parquet file")
+    length = int.from_bytes(tail[:4], "little")
+    f.seek(-8 - length, os.SEEK_END)
+    return _ThriftReader(f.read(length)).struct()
+
+
+# FileMetaData / RowGroup / ColumnChunk / ColumnMetaData field ids (parquet.thrift)
+_FMD_NUM_ROWS, _FMD_ROW_GROUPS, _FMD_SCHEMA = 3, 4, 2
+_RG_COLUMNS, _RG_NUM_ROWS, _RG_FILE_OFFSET, _RG_ORDINAL = 1, 3, 5, 7
+_CC_FILE_OFFSET, _CC_META = 2, 3
+_CC_PAGE_INDEX = (4, 5, 6, 7)       # offset/column index live outside the row group: dropped
+_CMD_COMPRESSED_SIZE, _CMD_DATA_PAGE, _CMD_INDEX_PAGE, _CMD_DICT_PAGE = 7, 9, 10, 11
+_CMD_BLOOM = (14, 15)               # bloom filters live outside the row group: dropped
+
+
+def row_group_byte_range(rg: list) -> Tuple[int, int]:
+    start, end = None, 0
+    for cc in _field(rg, _RG_COLUMNS)[2][1]:
+        cmd = _field(cc, _CC_META)[2]
+        chunk_start = _field(cmd, _CMD_DATA_PAGE)[2]
+        dict_page = _field(cmd, _CMD_DICT_PAGE)
+        if dict_page is not None and 0 < dict_page[2] < chunk_start:
+            chunk_start = dict_page[2]
+        chunk_end = chunk_start + _field(cmd, _CMD_COMPRESSED_SIZE)[2]
+        start = chunk_start if start is None else min(start, chunk_start)
+        end = max(end, chunk_end)
+    return start, end
+
+
+def shift_row_group(rg: list, delta: int, ordinal: int) -> list:
+    rg = copy.deepcopy(rg)
+    for f in rg:
+        if f[0] == _RG_COLUMNS:
+            for cc in f[2][1]:
+                cc[:] = [x for x in cc if x[0] not in _CC_PAGE_INDEX]
+                for x in cc:
+                    if x[0] == _CC_FILE_OFFSET and x[2] > 0:
+                        x[2] += delta
+                    elif x[0] == _CC_META:
+                        x[2][:] = [y for y in x[2] if y[0] not in _CMD_BLOOM]
+                        for y in x[2]:
+                            if y[0] in (_CMD_DATA_PAGE, _CMD_INDEX_PAGE, _CMD_DICT_PAGE) and y[2] > 0:
+                                y[2] += delta
+        elif f[0] == _RG_FILE_OFFSET and f[2] > 0:
+            f[2] += delta
+        elif f[0] == _RG_ORDINAL:
+            f[2] = ordinal
+    return rg
+
+
+def writer_options(compression: str, level: Optional[int] = None, dictionary: bool = True) -> dict:
+    return dict(
+        compression=None if compression.lower() in {"none", "uncompressed"} else compression,
+        compression_level=level,
+        use_dictionary=dictionary,
+        write_statistics=True,
+    )
+
+
+class RowGroupAssembler:
+    """
+    Writes the output file by splicing encoded row groups: verbatim from eligible inputs,
+    or from small in-memory Parquet files for row groups that had to be re-encoded.
+    The footer template (schema, Arrow metadata) comes from an empty file written with the
+    unified schema, so inputs are only copied when their Parquet schema matches it exactly.
+    """
+
+    COPY_BUFFER = 8 * 1024 * 1024
+
+    def __init__(self, path: str, schema: pa.Schema, compression: str, row_group_size: Optional[int],
+                 level: Optional[int] = None, dictionary: bool = True):
+        self.options = writer_options(compression, level, dictionary)
+        self.row_group_size = row_group_size
+        self.template = self._encode_footer(schema.empty_table())
+        self.row_groups: List[list] = []
+        self.num_rows = 0
+        self.footers = {}
+        self.out = open(path, "wb")
+        self.out.write(b"PAR1")
+        self.pos = 4
+
+    def _encode_footer(self, tbl: pa.Table) -> list:
+        sink = pa.BufferOutputStream()
+        pq.write_table(tbl, sink, **self.options)
+        return read_footer(io.BytesIO(sink.getvalue().to_pybytes()))
+
+    def schema_matches(self, path: str) -> bool:
+        return _field(self._footer(path), _FMD_SCHEMA) == _field(self.template, _FMD_SCHEMA)
+
+    def _footer(self, path: str) -> list:
+        if path not in self.footers:
+            with open(path, "rb") as f:
+                self.footers[path] = read_footer(f)
+        return self.footers[path]
+
+    def _splice(self, src: BinaryIO, rg: list) -> int:
+        start, end = row_group_byte_range(rg)
+        src.seek(start)
+        remaining = end - start
+        try:
+            while remaining > 0:
+                chunk = src.read(min(self.COPY_BUFFER, remaining))
+                if not chunk:
+                    raise IOError("unexpected end of file while copying row group")
+                self.out.write(chunk)
+                remaining -= len(chunk)
+        except BaseException:
+            # Drop the partial copy so the caller can skip this group and keep a valid file
+            self.out.seek(self.pos)
+            self.out.truncate()
+            raise
+        self.row_groups.append(shift_row_group(rg, self.pos - start, len(self.row_groups)))
+        self.pos += end - start
+        rows = _field(rg, _RG_NUM_ROWS)[2]
+        self.num_rows += rows
+        return rows
+
+    def copy_row_group(self, path: str, rg_index: int) -> int:
+        rg = _field(self._footer(path), _FMD_ROW_GROUPS)[2][1][rg_index]
+        with open(path, "rb") as src:
+            return self._splice(src, rg)
+
+    def write_table(self, tbl: pa.Table) -> Tuple[int, int]:
+        """Encode tbl (split by row_group_size) and splice it in; returns (row groups, rows)."""
+        sink = pa.BufferOutputStream()
+        pq.write_table(tbl, sink, row_group_size=self.row_group_size or max(1, tbl.num_rows), **self.options)
+        src = io.BytesIO(sink.getvalue().to_pybytes())
+        groups = rows = 0
+        for rg in _field(read_footer(src), _FMD_ROW_GROUPS)[2][1]:
+            rows += self._splice(src, rg)
+            groups += 1
+        return groups, rows
+
+    def close(self):
+        footer = copy.deepcopy(self.template)
+        _field(footer, _FMD_NUM_ROWS)[2] = self.num_rows
+        _field(footer, _FMD_ROW_GROUPS)[2] = [_CT_STRUCT, self.row_groups]
+        w = _ThriftWriter()
+        w.struct(footer)
+        self.out.write(w.out)
+        self.out.write(len(w.out).to_bytes(4, "little"))
+        self.out.write(b"PAR1")
+        self.out.close()
+
+
+def codec_matches(codecs: Sequence[str], compression: str) -> bool:
+    """Every column chunk of a file (its catalog codecs) uses `compression`."""
+    want = "UNCOMPRESSED" if compression.lower() in {"none", "uncompressed"} else compression.upper()
+    return all(c == want for c in codecs)
+
+
+def autotune_sample(files: Sequence[str], schema: pa.Schema) -> pa.Table:
+    """Row-group sample of the inputs, restricted to the output columns (for --autotune)."""
+    tbl = parquet_autotune.sample_parquet(files)
+    return tbl.select([c for c in schema.names if c in tbl.column_names])
+
+
+class CoalescingBuffer:
+    """Packs consecutive small tables into row groups of ~target rows before emitting them."""
+
+    def __init__(self, target_rows: int, emit: Callable[[pa.Table], None]):
+        self.target_rows = target_rows
+        self.emit = emit
+        self.tables: List[pa.Table] = []
+        self.rows = 0
+
+    def add(self, tbl: pa.Table):
+        self.tables.append(tbl)
+        self.rows += tbl.num_rows
+        if self.rows >= self.target_rows:
+            merged = pa.concat_tables(self.tables).combine_chunks()
+            full = (merged.num_rows // self.target_rows) * self.target_rows
+            self.emit(merged.slice(0, full))
+            rest = merged.slice(full)
+            self.tables = [rest] if rest.num_rows else []
+            self.rows = rest.num_rows
+
+    def flush(self):
+        if self.rows:
+            self.emit(pa.concat_tables(self.tables).combine_chunks())
+        self.tables, self.rows = [], 0
+
+
 def main():
     ap = argparse.ArgumentParser(
         description="Concatenate many Parquet files into one (row-wise) with schema unification."
@@ -207,12 +709,41 @@ def main():
         default="zstd",
         help="Parquet compression (zstd, snappy, gzip, brotli, lz4, none). Default: zstd",
     )
+    ap.add_argument(
+        "--level",
+        type=int,
+        default=None,
+        help="Compression level for --compression (zstd 1-22, gzip 1-9, brotli 0-11). Default: the codec's default",
+    )
     ap.add_argument(
         "--row-group-size",
         type=int,
         default=None,
         help="Optional target row group size when writing (rows). If unset, keep source RGs.",
     )
+    ap.add_argument(
+        "--readers",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="Reader threads that prefetch + align row groups while the writer encodes (0 = serial). Default: min(4, CPUs)",
+    )
+    ap.add_argument(
+        "--max-inflight-mb",
+        type=int,
+        default=1024,
+        help="Memory cap for prefetched row groups (uncompressed MB, estimated from footers). Default: 1024",
+    )
+    ap.add_argument(
+        "--fast-copy",
+        action="store_true",
+        help="Copy row groups verbatim (no decode/encode) from inputs whose schema and codec already match the output",
+    )
+    ap.add_argument(
+        "--coalesce",
+        action="store_true",
+        help=f"Pack small row groups together up to --row-group-size (default {DEFAULT_COALESCE_ROWS:,} rows)",
+    )
+    parquet_autotune.add_arguments(ap)
     args = ap.parse_args()
 
     files = discover_inputs(args.input)
@@ -228,66 +759,133 @@ def main():
         sys.exit(1)
 
     # Build unified schema (optionally restricted to requested columns)
-    unified = unify_all_schemas(files, keep_columns=args.columns)
+    infos = scan_inputs(files)
+    unified = unify_all_schemas(files, keep_columns=args.columns, infos=infos)
     unified = coerce_timestamp_units(unified, args.coerce_timestamps)
 
+    dictionary = True
+    try:
+        choice = parquet_autotune.from_args(args, lambda: autotune_sample(files, unified))
+    except ValueError as e:
+        print(f"Autotune failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    if choice is not None:
+        args.compression, args.level, dictionary = choice
+
     # Ensure output directory exists
     out_dir = os.path.dirname(os.path.abspath(args.output))
     if out_dir:
         os.makedirs(out_dir, exist_ok=True)
 
-    # Prepare constants for fast membership checks
-    unified_names = [f.name for f in unified]
-
-    # Create writer with unified schema
-    writer = pq.ParquetWriter(
-        where=args.output,
-        schema=unified,
-        compression=None if args.compression.lower() in {"none", "uncompressed"} else args.compression,
-        use_dictionary=True,
-        write_statistics=True,
-    )
+    coalesce_rows = (args.row_group_size or DEFAULT_COALESCE_ROWS) if args.coalesce else None
 
     files_written = 0
     rowgroups_written = 0
+    rowgroups_copied = 0
     total_rows = 0
+    written_paths = set()
 
-    try:
+    if args.fast_copy:
+        sink = RowGroupAssembler(args.output, unified, args.compression, args.row_group_size, args.level, dictionary)
+        eligible = set()
         for path in files:
             try:
-                wrote_any_rg = False
-                for rg_tbl in iter_row_groups(path, columns=unified_names):
-                    # Align the rg table to the unified schema (order, types, missing columns)
-                    rg_tbl = ensure_table_matches_schema(rg_tbl, unified)
-
-                    # Optionally re-chunk into a target RG size for the output
-                    if args.row_group_size and rg_tbl.num_rows > args.row_group_size:
-                        # Split into multiple row groups
-                        offset = 0
-                        while offset < rg_tbl.num_rows:
-                            end = min(offset + args.row_group_size, rg_tbl.num_rows)
-                            writer.write_table(rg_tbl.slice(offset, end - offset))
-                            rowgroups_written += 1
-                            total_rows += (end - offset)
-                            offset = end
-                        wrote_any_rg = True
-                    else:
-                        writer.write_table(rg_tbl)
-                        rowgroups_written += 1
-                        total_rows += rg_tbl.num_rows
-                        wrote_any_rg = True
-
-                if wrote_any_rg:
-                    files_written += 1
+                info = infos.get(path)
+                if info is None:
+                    reason = "footer could not be read"
+                elif not info.schema.equals(unified):
+                    reason = "schema differs from the unified schema"
+                elif not codec_matches(info.codecs, args.compression):
+                    reason = f"codec differs from {args.compression}"
+                elif not sink.schema_matches(path):
+                    reason = "Parquet physical schema differs"
+                else:
+                    eligible.add(path)
+                    continue
+            except Exception as e:
+                reason = str(e)
+            print(f"Fast-copy: re-encoding {path} ({reason})", file=sys.stderr)
+        print(f"Fast-copy: {len(eligible)}/{len(files)} files eligible for verbatim row-group copy.")
+
+        def copy_eligible(path, md, rg_index):
+            if path not in eligible:
+                return False
+            rows = md.row_group(rg_index).num_rows
+            # Small groups go through the coalescing buffer; oversized ones get split
+            if coalesce_rows and rows < coalesce_rows // 2:
+                return False
+            if args.row_group_size and rows > args.row_group_size:
+                return False
+            return True
+
+        copy_filter = copy_eligible
+
+        def emit(rg_tbl: pa.Table):
+            nonlocal rowgroups_written, total_rows
+            groups, rows = sink.write_table(rg_tbl)
+            rowgroups_written += groups
+            total_rows += rows
+    else:
+        copy_filter = None
+        # Create writer with unified schema
+        sink = pq.ParquetWriter(where=args.output, schema=unified, **writer_options(args.compression, args.level, dictionary))
+
+        def emit(rg_tbl: pa.Table):
+            nonlocal rowgroups_written, total_rows
+            # Optionally re-chunk into a target RG size for the output
+            if args.row_group_size and rg_tbl.num_rows > args.row_group_size:
+                # Split into multiple row groups
+                offset = 0
+                while offset < rg_tbl.num_rows:
+                    end = min(offset + args.row_group_size, rg_tbl.num_rows)
+                    sink.write_table(rg_tbl.slice(offset, end - offset))
+                    rowgroups_written += 1
+                    total_rows += (end - offset)
+                    offset = end
+            else:
+                sink.write_table(rg_tbl)
+                rowgroups_written += 1
+                total_rows += rg_tbl.num_rows
+
+    buffer = CoalescingBuffer(coalesce_rows, emit) if coalesce_rows else None
+
+    try:
+        if args.readers <= 0:
+            stream = iter_row_groups_serial(files, unified, copy_filter)
+        else:
+            stream = iter_aligned_row_groups(
+                files, unified, args.readers, max(1, args.max_inflight_mb) * 1024 * 1024, copy_filter
+            )
+        for path, rg_index, rg_tbl, err in stream:
+            if err is not None:
+                print(f"Warning: failed to append {path}: {err}", file=sys.stderr)
+                continue
+            try:
+                if rg_tbl is None:
+                    # Keep output order: anything buffered before this group is written first
+                    if buffer is not None:
+                        buffer.flush()
+                    total_rows += sink.copy_row_group(path, rg_index)
+                    rowgroups_written += 1
+                    rowgroups_copied += 1
+                elif buffer is not None:
+                    buffer.add(rg_tbl)
+                else:
+                    emit(rg_tbl)
+                written_paths.add(path)
             except Exception as e:
                 print(f"Warning: failed to append {path}: {e}", file=sys.stderr)
+        if buffer is not None:
+            buffer.flush()
+        files_written = len(written_paths)
 
     finally:
-        writer.close()
+        sink.close()
 
+    copied = f", {rowgroups_copied} copied verbatim" if args.fast_copy else ""
     print(
         f"Wrote {args.output} "
-        f"(from {files_written}/{len(files)} files, {rowgroups_written} row-groups, {total_rows} rows)."
+        f"(from {files_written}/{len(files)} files, {rowgroups_written} row-groups{copied}, {total_rows} rows)."
     )
 
 
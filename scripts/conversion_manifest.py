@@ -0,0 +1,112 @@
+"""
+Crash-safe outputs + resumable batches for the DuckDB converters.
+
+- Outputs are written to a hidden temp path next to the destination and renamed into place
+  only after DuckDB finishes, so a killed run never leaves a truncated file that looks done.
+- <out-dir>/manifest.json records, per source file: size, mtime, content hash, output rows,
+  the conversion settings and whether it succeeded. A rerun redoes only files that are
+  missing, stale (source or settings changed) or failed last time.
+
+Used by duckdb_csv_to_parquet.py and duckdb_parquet_to_csv.py (import as a sibling module).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK = 8 * 1024 * 1024
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def temp_path(dst: Path) -> Path:
+    """Hidden sibling of dst (same filesystem, so the final rename is atomic)."""
+    return dst.parent / f".{dst.name}.tmp-{os.getpid()}"
+
+
+def clear(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def publish(tmp: Path, dst: Path) -> None:
+    """Move a finished temp file (or shard folder) over dst."""
+    if tmp.is_dir() and dst.exists():
+        # Folders can't be replaced in one rename: park the old one, swap, then drop it
+        old = dst.parent / f".{dst.name}.old-{os.getpid()}"
+        os.replace(dst, old)
+        os.replace(tmp, dst)
+        clear(old)
+    else:
+        os.replace(tmp, dst)
+
+
+class Manifest:
+    def __init__(self, out_dir: Path):
+        self.path = out_dir / MANIFEST_NAME
+        self.entries = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data.get("files", {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def status(self, key: str, src: Path, dst: Path, settings: dict) -> Tuple[bool, str]:
+        """(up to date?, reason) for one source file."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, "new"
+        if entry.get("status") != "ok":
+            return False, "failed last run"
+        if not dst.exists():
+            return False, "output missing"
+        if entry.get("settings") != settings:
+            return False, "settings changed"
+        st = src.stat()
+        if entry.get("src_size") != st.st_size:
+            return False, "source changed"
+        if entry.get("src_mtime_ns") != st.st_mtime_ns:
+            # Touched or copied: only the content hash decides
+            if entry.get("src_hash") != file_hash(src):
+                return False, "source changed"
+            entry["src_mtime_ns"] = st.st_mtime_ns
+        return True, "up to date"
+
+    def record(self, key: str, src: Path, dst: Path, settings: dict, secs: float,
+               rows: Optional[int] = None, src_hash: Optional[str] = None, error: Optional[str] = None) -> None:
+        st = src.stat()
+        entry = {
+            "src_size": st.st_size,
+            "src_mtime_ns": st.st_mtime_ns,
+            "src_hash": src_hash,
+            "output": str(dst),
+            "rows": rows,
+            "settings": settings,
+            "seconds": round(secs, 3),
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "status": "ok" if error is None else "failed",
+        }
+        if error is not None:
+            entry["error"] = error
+        self.entries[key] = entry
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "files": self.entries}, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
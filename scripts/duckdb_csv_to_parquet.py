@@ -3,7 +3,8 @@ DuckDB (Python) CSV -> Parquet batch converter
 
 - Recursively walks an input directory for *.csv
 - Writes Parquet files to a mirrored path under the output directory
-- Uses DuckDB's COPY with ZSTD compression (level configurable)
+- Uses DuckDB's COPY with ZSTD compression (level configurable), or --autotune write|size to pick
+  codec/level by measuring DuckDB's writer on a sample of the CSVs (parquet_autotune.py)
 - Safe on 16 GB RAM; DuckDB streams CSV -> Parquet
 - Used caffeinate so the Mac doesn’t sleep.
 - Compression range: 1 to 22. Max is 22 and takes long. Typically 9 is balanced with ~4–6× faster writes with only a small size penalty (a few % to ~10%).
@@ -11,6 +12,17 @@ DuckDB (Python) CSV -> Parquet batch converter
 - DuckDB streams CSV → Parquet; typical memory is sub-GB to a few GB, depending on columns.
 - DuckDB & PyArrow stream data in chunks; they don’t need to load a 90 GB CSV into RAM. With sensible settings, memory stays well under a few GB.
 - 90GB compression at level 22 can take upto 10 hours.
+- --jobs N converts N files at once in a process pool. The --threads budget is split across
+  workers (e.g. --threads 8 --jobs 4 -> 2 DuckDB threads each) and every worker spills into its
+  own subfolder of the shared --temp-directory. Ends with an aggregate MB/s + per-file timing summary.
+- Crash-safe + resumable: each Parquet file is written to a hidden temp file and renamed into
+  place when complete; <out-dir>/manifest.json records source size/mtime/hash, output rows and
+  settings, so a rerun only redoes files that are missing, stale or failed (see conversion_manifest.py).
+- Explicit schemas instead of sniffing: TLC files (yellow/green/fhv_tripdata_YYYY-MM.csv) are read
+  with the column types of the matching tlc_schemas.py version (auto_detect off), so every month
+  gets the same Parquet schema and no sniffing pass. Other files, or files whose header doesn't
+  match, fall back to read_csv_auto; --schema yellow|green|fhv makes a mismatch an error instead,
+  --schema sniff always sniffs.
 
 Install:
   python3 -m pip install duckdb
@@ -23,51 +35,187 @@ Usage examples:
 
   # Faster writes, nearly same size:
   python3 duckdb_csv_to_parquet.py --level 9
+
+  # Let the data decide: smallest files that still encode at >= 100 MB/s
+  python3 duckdb_csv_to_parquet.py --in-dir csv --out-dir parquet --autotune size --min-write-mbps 100
+
+  # Non-TLC file names: force the yellow 2019+ schema
+  python3 duckdb_csv_to_parquet.py --in-dir exports --out-dir parquet --schema yellow --schema-version 2019-01
+
+  # Many monthly CSVs: 4 files at a time sharing 8 threads and one spill location
+  python3 duckdb_csv_to_parquet.py \
+    --in-dir "/Volumes/alienHD/csv_output" \
+    --out-dir "/Volumes/alienHD/parquet_output" \
+    --jobs 4 --threads 8 --level 9 \
+    --temp-directory "/Volumes/alienHD/duckdb_tmp"
 """
 
 import os
 import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import List, Optional, Tuple
 import duckdb
 
+import pyarrow as pa
+
+import parquet_autotune
+from conversion_manifest import Manifest, clear, file_hash, publish, temp_path
+from tlc_schemas import DATASETS, REGISTRY_VERSION, TlcSchema, detect, duckdb_columns, schema_for
+
+SCHEMA_MODES = ("auto", "sniff", *DATASETS)
+
 def sql_quote(path: str) -> str:
     # Minimal SQL string literal escaping for file paths
     return path.replace("'", "''")
 
+def csv_reader_sql(src_q: str, schema: Optional[TlcSchema], ignore: str) -> str:
+    if schema is None:
+        return f"read_csv_auto('{src_q}', ignore_errors={ignore})"
+    # Registry types, no sniffing; `columns` also renames header spellings to the canonical names
+    return (f"read_csv('{src_q}', header=TRUE, auto_detect=FALSE, "
+            f"columns={duckdb_columns(schema)}, ignore_errors={ignore})")
+
+def resolve_schema(src: Path, mode: str, version: Optional[str]) -> Tuple[Optional[TlcSchema], Optional[str]]:
+    """(schema or None to sniff, why it's sniffed); raises ValueError for a forced schema that doesn't fit."""
+    if mode == "sniff":
+        return None, None
+    if mode != "auto":
+        return schema_for(src, mode, version), None
+    if detect(src) is None:
+        return None, None   # not a TLC file name: nothing to look up, sniff quietly
+    try:
+        return schema_for(src, None, version), None
+    except ValueError as e:
+        return None, str(e)
+
 def convert_one(conn: duckdb.DuckDBPyConnection, src: Path, dst: Path,
-                compression: str, level: int, ignore_errors: bool):
+                compression: str, level: Optional[int], ignore_errors: bool,
+                schema: Optional[TlcSchema] = None) -> int:
+    """COPY src into a temp file, rename it over dst when done. Returns rows written."""
     dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(dst)
+    clear(tmp)
 
     src_q = sql_quote(str(src))
-    dst_q = sql_quote(str(dst))
+    dst_q = sql_quote(str(tmp))
 
-    # read_csv_auto options we commonly toggle
+    # read_csv options we commonly toggle
     ignore = "TRUE" if ignore_errors else "FALSE"
 
+    # DuckDB only takes a level for ZSTD (any other codec with COMPRESSION_LEVEL is an error)
+    level_sql = f",\n      COMPRESSION_LEVEL {level}" if compression.lower() == "zstd" and level is not None else ""
     sql = f"""
     COPY (
-      SELECT * FROM read_csv_auto('{src_q}', ignore_errors={ignore})
+      SELECT * FROM {csv_reader_sql(src_q, schema, ignore)}
     )
     TO '{dst_q}' (
       FORMAT PARQUET,
-      COMPRESSION {compression.upper()},
-      COMPRESSION_LEVEL {level}
+      COMPRESSION {compression.upper()}{level_sql}
     );
     """
-    conn.execute(sql)
+    try:
+        rows = conn.execute(sql).fetchone()[0]
+        publish(tmp, dst)
+    finally:
+        clear(tmp)
+    return rows
+
+def autotune_sample(conn: duckdb.DuckDBPyConnection, tasks: List[Tuple[Path, Path, Optional[TlcSchema]]],
+                    rows: int = parquet_autotune.SAMPLE_ROWS,
+                    files: int = parquet_autotune.SAMPLE_ROW_GROUPS) -> pa.Table:
+    """Leading rows of up to `files` CSVs spread over the batch, parsed like convert_one would (for --autotune)."""
+    step = max(1, len(tasks) // files)
+    picks = tasks[::step][:files]
+    parts = []
+    for src, _, schema in picks:
+        reader = csv_reader_sql(sql_quote(str(src)), schema, "TRUE")
+        parts.append(conn.execute(f"SELECT * FROM {reader} LIMIT {max(1, rows // len(picks))}").fetch_arrow_table())
+    return pa.concat_tables(parts, promote_options="permissive")
+
+def open_connection(threads: int, temp_directory: Optional[str]) -> duckdb.DuckDBPyConnection:
+    # Single in-memory DuckDB connection (no DB file needed)
+    conn = duckdb.connect(database=':memory:')
+    conn.execute(f"PRAGMA threads={threads};")
+    if temp_directory:
+        td = sql_quote(str(Path(temp_directory).expanduser().resolve()))
+        conn.execute(f"PRAGMA temp_directory='{td}';")
+    return conn
+
+
+# --- Process pool workers (--jobs > 1) ---
+_worker_conn = None
+
+
+def _init_worker(threads: int, temp_directory: Optional[str]):
+    # One connection per worker process, reused for every file it converts.
+    # Each worker spills into its own subfolder so DuckDB temp files never collide.
+    global _worker_conn
+    spill = None
+    if temp_directory:
+        spill = Path(temp_directory).expanduser().resolve() / f"worker-{os.getpid()}"
+        spill.mkdir(parents=True, exist_ok=True)
+    _worker_conn = open_connection(threads, str(spill) if spill else None)
+
+
+def _convert_in_worker(src: Path, dst: Path, compression: str, level: int, ignore_errors: bool,
+                       schema: Optional[TlcSchema]) -> Tuple[Path, Path, float, Optional[int], Optional[str], Optional[str]]:
+    t0 = time.time()
+    try:
+        rows = convert_one(_worker_conn, src, dst, compression, level, ignore_errors, schema)
+        secs = time.time() - t0
+        return src, dst, secs, rows, file_hash(src), None
+    except Exception as e:
+        return src, dst, time.time() - t0, None, None, str(e)
+
+
+def report_one(src: Path, dst: Path, secs: float, error: Optional[str]) -> bool:
+    if error is not None:
+        print(f"✖ Failed: {src}  |  Reason: {error}")
+        return False
+    # Throughput estimate (best-effort; uses CSV size on disk)
+    try:
+        size_bytes = src.stat().st_size
+        mbps = (size_bytes / (1024 * 1024)) / secs if secs > 0 else 0.0
+        print(f"✔ Wrote: {dst}  |  {secs:.1f}s  |  ~{mbps:.1f} MB/s (from CSV size)")
+    except Exception:
+        print(f"✔ Wrote: {dst}  |  {secs:.1f}s")
+    return True
+
+
+def print_summary(timings: List[Tuple[Path, float, int]], wall_secs: float, top: int = 20):
+    if not timings:
+        return
+    total_mb = sum(size for _, _, size in timings) / (1024 * 1024)
+    busy = sum(secs for _, secs, _ in timings)
+    agg_mbps = total_mb / wall_secs if wall_secs > 0 else 0.0
+    print(f"\nThroughput: {total_mb:,.1f} MB of CSV in {wall_secs:.1f}s wall  |  ~{agg_mbps:.1f} MB/s aggregate  "
+          f"|  {busy:.1f}s summed per-file time ({busy / wall_secs if wall_secs > 0 else 0:.1f}x parallelism)")
+    print(f"Per-file timings (slowest {min(top, len(timings))} of {len(timings)}):")
+    for src, secs, size in sorted(timings, key=lambda t: t[1], reverse=True)[:top]:
+        mbps = (size / (1024 * 1024)) / secs if secs > 0 else 0.0
+        print(f"  {secs:8.1f}s  {mbps:8.1f} MB/s  {src}")
+
 
 def main():
     ap = argparse.ArgumentParser(description="Convert CSV files to Parquet using DuckDB (Python).")
     ap.add_argument("--in-dir",  required=True, help="Input root directory containing CSV files")
     ap.add_argument("--out-dir", required=True, help="Output root directory for Parquet files")
-    ap.add_argument("--threads", type=int, default=4, help="DuckDB PRAGMA threads (tune for your CPU/thermals)")
+    ap.add_argument("--threads", type=int, default=4, help="DuckDB PRAGMA threads (tune for your CPU/thermals). With --jobs this is the total budget")
+    ap.add_argument("--jobs", type=int, default=1, help="Convert this many files at once in a process pool (default: 1)")
     ap.add_argument("--compression", default="zstd", choices=["zstd", "snappy", "gzip", "brotli", "lz4", "uncompressed"],
                     help="Parquet compression codec (DuckDB supports these)")
-    ap.add_argument("--level", type=int, default=22, help="Compression level (ZSTD supports 1–22)")
-    ap.add_argument("--overwrite", action="store_true", help="Overwrite existing .parquet files")
+    ap.add_argument("--level", type=int, default=22, help="Compression level (ZSTD only, 1–22; ignored for other codecs)")
+    ap.add_argument("--overwrite", action="store_true", help="Reconvert every file, even if the manifest says it is up to date")
     ap.add_argument("--ignore-errors", action="store_true", help="Skip malformed CSV rows instead of failing")
     ap.add_argument("--temp-directory", default=None, help="Optional temp dir for DuckDB spills (e.g., on the SSD)")
+    ap.add_argument("--schema", default="auto", choices=SCHEMA_MODES,
+                    help="Column types: auto = TLC registry from the file name, else sniff (default); "
+                         "yellow|green|fhv = always that registry schema; sniff = read_csv_auto")
+    ap.add_argument("--schema-version", default=None, metavar="YYYY-MM",
+                    help="Pin the registry schema version instead of picking it from the file's month")
+    parquet_autotune.add_arguments(ap)
     args = ap.parse_args()
 
     in_dir  = Path(args.in_dir).expanduser().resolve()
@@ -76,48 +224,115 @@ def main():
 
     if not in_dir.exists():
         raise SystemExit(f"Input directory not found: {in_dir}")
+    if args.jobs < 1:
+        raise SystemExit("--jobs must be >= 1")
 
-    # Single in-memory DuckDB connection (no DB file needed)
-    conn = duckdb.connect(database=':memory:')
-    conn.execute(f"PRAGMA threads={args.threads};")
-    if args.temp_directory:
-        td = sql_quote(str(Path(args.temp_directory).expanduser().resolve()))
-        conn.execute(f"PRAGMA temp_directory='{td}';")
-
-    # Walk and convert
+    # Walk and plan
     total = 0
     converted = 0
     skipped = 0
+    failed = 0
     t0_all = time.time()
 
+    manifest = Manifest(out_dir)
+    # With --autotune GOAL the codec is only measured if something needs converting; record the goal
+    tuned = parquet_autotune.setting(args)
+    settings = {
+        "compression": tuned or args.compression, "level": None if tuned else args.level,
+        "ignore_errors": args.ignore_errors,
+        "schema": args.schema, "schema_version": args.schema_version, "schema_registry": REGISTRY_VERSION,
+    }
+
+    tasks: List[Tuple[Path, Path, Optional[TlcSchema]]] = []
+    rejected: List[Tuple[Path, Path, str]] = []
     for src in in_dir.rglob("*.csv"):
         rel = src.relative_to(in_dir)
         dst = out_dir / rel.with_suffix(".parquet")
 
         total += 1
-        if dst.exists() and not args.overwrite:
-            print(f"↷ Skipping (exists): {dst}")
+        current, reason = manifest.status(rel.as_posix(), src, dst, settings)
+        if current and not args.overwrite:
+            print(f"↷ Skipping (up to date): {dst}")
             skipped += 1
             continue
+        if not args.overwrite and reason != "new":
+            print(f"↻ Redoing ({reason}): {src}")
+        try:
+            schema, sniffed = resolve_schema(src, args.schema, args.schema_version)
+        except ValueError as e:
+            rejected.append((src, dst, str(e)))
+            continue
+        if sniffed:
+            print(f"↷ Sniffing types (read_csv_auto) for {src}: {sniffed}")
+        tasks.append((src, dst, schema))
+    manifest.save()
+
+    timings: List[Tuple[Path, float, int]] = []
+
+    def record(src: Path, dst: Path, secs: float, rows: Optional[int], src_hash: Optional[str],
+               error: Optional[str]):
+        nonlocal converted, failed
+        # Persist after every file so a killed batch resumes where it stopped
+        manifest.record(src.relative_to(in_dir).as_posix(), src, dst, settings, secs, rows, src_hash, error)
+        manifest.save()
+        if report_one(src, dst, secs, error):
+            converted += 1
+            try:
+                timings.append((src, secs, src.stat().st_size))
+            except OSError:
+                pass
+        else:
+            failed += 1
+
+    for src, dst, error in rejected:
+        record(src, dst, 0.0, None, None, error)
 
-        print(f"→ Converting: {src}")
-        t0 = time.time()
+    if tasks and args.autotune:
+        conn = open_connection(args.threads, args.temp_directory)
         try:
-            convert_one(conn, src, dst, args.compression, args.level, args.ignore_errors)
-            secs = time.time() - t0
-            # Throughput estimate (best-effort; uses CSV size on disk)
+            choice = parquet_autotune.from_args(args, lambda: autotune_sample(conn, tasks), writer="duckdb")
+        except ValueError as e:
+            raise SystemExit(f"Autotune failed: {e}")
+        finally:
+            conn.close()
+        args.compression, args.level = choice.codec, choice.level
+        print(f"→ Writing with {choice.label}")
+
+    jobs = min(args.jobs, len(tasks)) if tasks else 1
+    if jobs <= 1:
+        conn = open_connection(args.threads, args.temp_directory)
+        for src, dst, schema in tasks:
+            print(f"→ Converting: {src}  |  {schema.name if schema else 'read_csv_auto'}")
+            t0 = time.time()
             try:
-                size_bytes = src.stat().st_size
-                mbps = (size_bytes / (1024 * 1024)) / secs if secs > 0 else 0.0
-                print(f"✔ Wrote: {dst}  |  {secs:.1f}s  |  ~{mbps:.1f} MB/s (from CSV size)")
-            except Exception:
-                print(f"✔ Wrote: {dst}  |  {secs:.1f}s")
-            converted += 1
-        except Exception as e:
-            print(f"✖ Failed: {src}  |  Reason: {e}")
+                rows = convert_one(conn, src, dst, args.compression, args.level, args.ignore_errors, schema)
+                secs = time.time() - t0
+                record(src, dst, secs, rows, file_hash(src), None)
+            except Exception as e:
+                record(src, dst, time.time() - t0, None, None, str(e))
+    else:
+        # Split the thread budget so N workers don't oversubscribe the CPU
+        threads_per_worker = max(1, args.threads // jobs)
+        print(f"→ Converting {len(tasks)} files with {jobs} workers × {threads_per_worker} DuckDB threads")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(threads_per_worker, args.temp_directory)) as pool:
+            futures = [
+                pool.submit(_convert_in_worker, src, dst, args.compression, args.level, args.ignore_errors, schema)
+                for src, dst, schema in tasks
+            ]
+            for fut in as_completed(futures):
+                record(*fut.result())
+        if args.temp_directory:
+            # DuckDB deletes its spill files; drop the now-empty per-worker folders
+            for d in Path(args.temp_directory).expanduser().resolve().glob("worker-*"):
+                try:
+                    d.rmdir()
+                except OSError:
+                    pass
 
     secs_all = time.time() - t0_all
-    print(f"\nDone. Total: {total}, Converted: {converted}, Skipped: {skipped}, Elapsed: {secs_all/3600:.2f} h")
+    print_summary(timings, secs_all)
+    print(f"\nDone. Total: {total}, Converted: {converted}, Skipped: {skipped}, Failed: {failed}, Elapsed: {secs_all/3600:.2f} h")
 
 if __name__ == "__main__":
     main()
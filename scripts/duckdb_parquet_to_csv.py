@@ -1,10 +1,18 @@
 """
-DuckDB (Python) Parquet -> CSV batch converter (CSV only, minimal)
+DuckDB (Python) Parquet -> CSV batch converter
 
 - Recursively scans an input directory for *.parquet files
 - Writes CSVs to a mirrored path under the output directory
-- No gzip, no extra CSV knobs—just plain CSV with header and comma delimiter
-- Overwrite control and basic progress logs
+- Plain CSV with header and comma delimiter; optionally gzip/zstd-compressed as it streams
+- Optional sharding: cap every CSV at N rows (exact) or ~N bytes; shards of one Parquet file go
+  into a folder named after it (<stem>/<stem>-0.csv, <stem>-1.csv, ...). Row counts for the caps
+  come from Parquet footers (parquet_catalog.py; read in parallel, not cached: the export never
+  writes into the input directory)
+- --jobs N converts N files at once in a process pool (the --threads budget is split across workers)
+- Crash-safe + resumable: output is written to a hidden temp file/folder and renamed into place
+  when complete; <out-dir>/manifest.json records source size/mtime/hash, output rows and settings,
+  so a rerun only redoes files that are missing, stale or failed (see conversion_manifest.py)
+- Per-file progress logs and a whole-run throughput summary
 - Configurable DuckDB threads
 
 Install:
@@ -15,45 +23,182 @@ Usage:
     --in-dir "/Volumes/alienHD/parquet_output" \
     --out-dir "/Volumes/alienHD/csv_from_parquet" \
     --threads 4
+
+  # Tableau extracts: gzip CSV shards of at most 5M rows, 4 files at a time
+  python3 duckdb_parquet_to_csv.py \
+    --in-dir "/Volumes/alienHD/parquet_output" \
+    --out-dir "/Volumes/alienHD/csv_from_parquet" \
+    --compression gzip --max-rows 5000000 \
+    --jobs 4 --threads 8
 """
 
 import sys
 import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import List, Optional, Tuple
 import duckdb
 
+import parquet_catalog
+from conversion_manifest import Manifest, clear, file_hash, publish, temp_path
+
+CSV_EXTENSIONS = {"none": ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+
 
 def sql_quote(s: str) -> str:
     return s.replace("'", "''")
 
 
-def ensure_parent(path: Path) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
+def dest_csv_path(out_dir: Path, in_dir: Path, src: Path, compression: str = "none", sharded: bool = False) -> Path:
+    """Output file, or the folder holding the shards when a size cap is set."""
+    rel = src.relative_to(in_dir)
+    if sharded:
+        return out_dir / rel.with_suffix("")
+    return out_dir / rel.with_suffix(CSV_EXTENSIONS[compression])
 
 
-def dest_csv_path(out_dir: Path, in_dir: Path, src: Path) -> Path:
-    rel = src.relative_to(in_dir)
-    return out_dir / rel.with_suffix(".csv")
+def csv_options(compression: str) -> str:
+    # Plain CSV: header, comma delimiter
+    opts = "FORMAT CSV, HEADER TRUE, DELIMITER ','"
+    if compression != "none":
+        opts += f", COMPRESSION {compression}"
+    return opts
 
 
-def parquet_to_csv(con: duckdb.DuckDBPyConnection, src: Path, dst: Path) -> None:
-    ensure_parent(dst)
+def parquet_to_csv(
+    con: duckdb.DuckDBPyConnection,
+    src: Path,
+    dst: Path,
+    compression: str = "none",
+    max_rows: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    total_rows: Optional[int] = None,
+) -> Tuple[List[Path], int]:
+    """
+    Stream src to CSV (DuckDB COPY, nothing materialized in Python) into a temp file or shard
+    folder, then rename it over dst. Returns (files written, rows written).
+    """
     src_q = sql_quote(str(src))
-    dst_q = sql_quote(str(dst))
-    # Plain CSV: header, comma delimiter
-    con.execute(
-        f"COPY (SELECT * FROM read_parquet('{src_q}')) "
-        f"TO '{dst_q}' (FORMAT CSV, HEADER TRUE, DELIMITER ',');"
-    )
+    ext = CSV_EXTENSIONS[compression]
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(dst)
+    clear(tmp)
+
+    try:
+        if max_rows is None and max_bytes is None:
+            rows = con.execute(
+                f"COPY (SELECT * FROM read_parquet('{src_q}')) "
+                f"TO '{sql_quote(str(tmp))}' ({csv_options(compression)});"
+            ).fetchone()[0]
+            publish(tmp, dst)
+            return [dst], rows
+
+        # Sharded: build the whole folder aside so a rerun never mixes old and new shards
+        tmp.mkdir()
+        if max_bytes is not None:
+            # DuckDB rotates files itself once a shard passes ~max_bytes
+            rows = con.execute(
+                f"COPY (SELECT * FROM read_parquet('{src_q}')) "
+                f"TO '{sql_quote(str(tmp))}' ({csv_options(compression)}, "
+                f"FILE_SIZE_BYTES {int(max_bytes)}, FILENAME_PATTERN '{sql_quote(src.stem)}-{{i}}', OVERWRITE_OR_IGNORE TRUE);"
+            ).fetchone()[0]
+        else:
+            # Exact row caps: slice on file_row_number, which DuckDB prunes to the matching row groups
+            total = total_rows
+            if total is None:
+                total = con.execute(f"SELECT COUNT(*) FROM read_parquet('{src_q}')").fetchone()[0]
+            rows = 0
+            start = 0
+            i = 0
+            while start < total or i == 0:
+                shard = tmp / f"{src.stem}-{i}{ext}"
+                rows += con.execute(
+                    f"COPY (SELECT * EXCLUDE (file_row_number) FROM read_parquet('{src_q}', file_row_number=true) "
+                    f"WHERE file_row_number >= {start} AND file_row_number < {start + max_rows}) "
+                    f"TO '{sql_quote(str(shard))}' ({csv_options(compression)});"
+                ).fetchone()[0]
+                start += max_rows
+                i += 1
+        publish(tmp, dst)
+    finally:
+        clear(tmp)
+
+    files = sorted(dst.glob(f"{src.stem}-*{ext}"), key=lambda p: int(p.name[len(src.stem) + 1:-len(ext)]))
+    return files, rows
+
+
+def open_connection(threads: int) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect(database=":memory:")
+    con.execute(f"PRAGMA threads={threads};")
+    return con
+
+
+# --- Process pool workers (--jobs > 1) ---
+_worker_conn = None
+
+
+def _init_worker(threads: int):
+    # One connection per worker process, reused for every file it converts
+    global _worker_conn
+    _worker_conn = open_connection(threads)
+
+
+def _convert_in_worker(src: Path, dst: Path, compression: str, max_rows: Optional[int], max_bytes: Optional[int],
+                       total_rows: Optional[int] = None
+                       ) -> Tuple[Path, Path, float, int, Optional[int], Optional[str], Optional[str]]:
+    t0 = time.time()
+    try:
+        written, rows = parquet_to_csv(_worker_conn, src, dst, compression, max_rows, max_bytes, total_rows)
+        secs = time.time() - t0
+        return src, dst, secs, sum(p.stat().st_size for p in written), rows, file_hash(src), None
+    except Exception as e:
+        return src, dst, time.time() - t0, 0, None, None, str(e)
+
+
+def report_one(src: Path, dst: Path, secs: float, out_bytes: int, error: Optional[str]) -> bool:
+    if error is not None:
+        print(f"✖ Failed: {src}  |  Reason: {error}")
+        return False
+    # rough throughput using Parquet size on disk
+    try:
+        size_mb = src.stat().st_size / (1024 * 1024)
+        mbps = size_mb / secs if secs > 0 else 0.0
+        print(f"✔ Wrote: {dst}  |  {secs:.1f}s  |  ~{mbps:.1f} MB/s (from Parquet size)  |  {out_bytes / (1024 * 1024):,.1f} MB CSV")
+    except Exception:
+        print(f"✔ Wrote: {dst}  |  {secs:.1f}s")
+    return True
+
+
+def print_summary(timings: List[Tuple[Path, float, int, int]], wall_secs: float, top: int = 20):
+    if not timings:
+        return
+    in_mb = sum(t[2] for t in timings) / (1024 * 1024)
+    out_mb = sum(t[3] for t in timings) / (1024 * 1024)
+    busy = sum(t[1] for t in timings)
+    agg_mbps = in_mb / wall_secs if wall_secs > 0 else 0.0
+    out_mbps = out_mb / wall_secs if wall_secs > 0 else 0.0
+    print(f"\nThroughput: {in_mb:,.1f} MB of Parquet -> {out_mb:,.1f} MB of CSV in {wall_secs:.1f}s wall  "
+          f"|  ~{agg_mbps:.1f} MB/s read, ~{out_mbps:.1f} MB/s written  "
+          f"|  {busy:.1f}s summed per-file time ({busy / wall_secs if wall_secs > 0 else 0:.1f}x parallelism)")
+    print(f"Per-file timings (slowest {min(top, len(timings))} of {len(timings)}):")
+    for src, secs, size, _ in sorted(timings, key=lambda t: t[1], reverse=True)[:top]:
+        mbps = (size / (1024 * 1024)) / secs if secs > 0 else 0.0
+        print(f"  {secs:8.1f}s  {mbps:8.1f} MB/s  {src}")
 
 
 def main():
     ap = argparse.ArgumentParser(description="Convert Parquet files to CSV using DuckDB (CSV only).")
     ap.add_argument("--in-dir",  required=True, help="Input root directory containing Parquet files")
     ap.add_argument("--out-dir", required=True, help="Output root directory for CSV files")
-    ap.add_argument("--threads", type=int, default=4, help="DuckDB PRAGMA threads")
-    ap.add_argument("--overwrite", action="store_true", help="Overwrite existing CSV files")
+    ap.add_argument("--threads", type=int, default=4, help="DuckDB PRAGMA threads. With --jobs this is the total budget")
+    ap.add_argument("--jobs", type=int, default=1, help="Convert this many files at once in a process pool (default: 1)")
+    ap.add_argument("--compression", default="none", choices=sorted(CSV_EXTENSIONS),
+                    help="Compress CSV output while streaming; zstd is far faster than gzip (default: none)")
+    shard = ap.add_mutually_exclusive_group()
+    shard.add_argument("--max-rows", type=int, default=None, help="Cap every CSV shard at this many rows")
+    shard.add_argument("--max-bytes", type=int, default=None, help="Start a new CSV shard after ~this many bytes")
+    ap.add_argument("--overwrite", action="store_true", help="Reconvert every file, even if the manifest says it is up to date")
     args = ap.parse_args()
 
     in_dir  = Path(args.in_dir).expanduser().resolve()
@@ -63,43 +208,91 @@ def main():
     if not in_dir.exists():
         print(f"Input directory not found: {in_dir}", file=sys.stderr)
         sys.exit(1)
-
-    con = duckdb.connect(database=":memory:")
-    con.execute(f"PRAGMA threads={args.threads};")
+    if args.jobs < 1:
+        raise SystemExit("--jobs must be >= 1")
+    for cap in ("max_rows", "max_bytes"):
+        if getattr(args, cap) is not None and getattr(args, cap) <= 0:
+            raise SystemExit(f"--{cap.replace('_', '-')} must be >= 1")
+    sharded = args.max_rows is not None or args.max_bytes is not None
 
     total = 0
     converted = 0
     skipped = 0
+    failed = 0
     t0_all = time.time()
 
-    parquet_files = list(in_dir.rglob("*.parquet"))
-    for src in parquet_files:
+    manifest = Manifest(out_dir)
+    settings = {"compression": args.compression, "max_rows": args.max_rows, "max_bytes": args.max_bytes}
+
+    tasks: List[Tuple[Path, Path]] = []
+    for src in in_dir.rglob("*.parquet"):
         total += 1
-        dst = dest_csv_path(out_dir, in_dir, src)
+        dst = dest_csv_path(out_dir, in_dir, src, args.compression, sharded)
 
-        if dst.exists() and not args.overwrite:
-            print(f"↷ Skipping (exists): {dst}")
+        current, reason = manifest.status(src.relative_to(in_dir).as_posix(), src, dst, settings)
+        if current and not args.overwrite:
+            print(f"↷ Skipping (up to date): {dst}")
             skipped += 1
             continue
+        if not args.overwrite and reason != "new":
+            print(f"↻ Redoing ({reason}): {src}")
+        tasks.append((src, dst))
+    manifest.save()
 
-        print(f"→ Converting: {src}")
-        t0 = time.time()
-        try:
-            parquet_to_csv(con, src, dst)
-            secs = time.time() - t0
-            # rough throughput using Parquet size on disk
-            try:
-                size_mb = src.stat().st_size / (1024 * 1024)
-                mbps = size_mb / secs if secs > 0 else 0.0
-                print(f"✔ Wrote: {dst}  |  {secs:.1f}s  |  ~{mbps:.1f} MB/s (from Parquet size)")
-            except Exception:
-                print(f"✔ Wrote: {dst}  |  {secs:.1f}s")
+    # Row caps need each file's row count: footers in parallel, not a COUNT(*) each. The input
+    # directory is read-only to this script, so no catalog sidecar is written there.
+    counts = {}
+    if args.max_rows is not None and tasks:
+        infos, _ = parquet_catalog.scan_with_errors([str(src) for src, _ in tasks], cache=False)
+        counts = {info.path: info.num_rows for info in infos}
+
+    timings: List[Tuple[Path, float, int, int]] = []
+
+    def record(src: Path, dst: Path, secs: float, out_bytes: int, rows: Optional[int],
+               src_hash: Optional[str], error: Optional[str]):
+        nonlocal converted, failed
+        # Persist after every file so a killed batch resumes where it stopped
+        manifest.record(src.relative_to(in_dir).as_posix(), src, dst, settings, secs, rows, src_hash, error)
+        manifest.save()
+        if report_one(src, dst, secs, out_bytes, error):
             converted += 1
-        except Exception as e:
-            print(f"✖ Failed: {src}  |  Reason: {e}")
+            try:
+                timings.append((src, secs, src.stat().st_size, out_bytes))
+            except OSError:
+                pass
+        else:
+            failed += 1
+
+    jobs = min(args.jobs, len(tasks)) if tasks else 1
+    if jobs <= 1:
+        con = open_connection(args.threads)
+        for src, dst in tasks:
+            print(f"→ Converting: {src}")
+            t0 = time.time()
+            try:
+                written, rows = parquet_to_csv(con, src, dst, args.compression, args.max_rows, args.max_bytes,
+                                               counts.get(str(src)))
+                secs = time.time() - t0
+                record(src, dst, secs, sum(p.stat().st_size for p in written), rows, file_hash(src), None)
+            except Exception as e:
+                record(src, dst, time.time() - t0, 0, None, None, str(e))
+    else:
+        # Split the thread budget so N workers don't oversubscribe the CPU
+        threads_per_worker = max(1, args.threads // jobs)
+        print(f"→ Converting {len(tasks)} files with {jobs} workers × {threads_per_worker} DuckDB threads")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(threads_per_worker,)) as pool:
+            futures = [
+                pool.submit(_convert_in_worker, src, dst, args.compression, args.max_rows, args.max_bytes,
+                            counts.get(str(src)))
+                for src, dst in tasks
+            ]
+            for fut in as_completed(futures):
+                record(*fut.result())
 
     secs_all = time.time() - t0_all
-    print(f"\nDone. Total: {total}, Converted: {converted}, Skipped: {skipped}, Elapsed: {secs_all/3600:.2f} h")
+    print_summary(timings, secs_all)
+    print(f"\nDone. Total: {total}, Converted: {converted}, Skipped: {skipped}, Failed: {failed}, Elapsed: {secs_all/3600:.2f} h")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,345 @@
+"""
+Synthetic NYC TLC yellow-taxi trip generator (offline, seeded, streaming)
+
+- Writes yellow_tripdata_YYYY-MM.parquet / .csv with the real TLC yellow schema and dtypes,
+  so every engine and script in this repo runs on it unchanged
+- Any scale from a few rows to 500M+: rows are generated and written in --chunk-rows chunks
+  (one Parquet row group or CSV block at a time), so memory stays flat whatever the size
+- Realistic skew instead of uniform noise:
+    zones     a few hot zones (Midtown, Upper East Side, JFK, LGA) carry most pickups, Zipf-like
+              tail over the rest; ~1-2% go to 264/265 (Unknown / Outside of NYC) like the real feed
+    time      diurnal hour-of-day profile (quiet 3-5am, evening peak) and busier Thu-Sat
+    trips     log-normal distances and speeds, airport trips longer; a few zero/negative durations
+    money     fares from distance and time, card tips, cash trips without tips
+    nulls     the TLC "missing block": passenger_count, RatecodeID, store_and_fwd_flag,
+              congestion_surcharge and Airport_fee null together (payment_type 0), --null-rate
+- Deterministic: the same arguments give the same data (every month/chunk has its own seeded stream)
+
+Usage examples:
+  # 1M rows over Jan-Feb 2024 (matches the bundled weather data), Parquet + CSV
+  python3 generate_tlc_data.py --out-dir bench_data/1M --rows 1M --start 2024-01 --months 2 --format both
+
+  # 500M rows over a year, Parquet only, TLC-sized row groups
+  python3 generate_tlc_data.py --out-dir /Volumes/alienHD/synthetic --rows 500M --months 12 --chunk-rows 1000000
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+MB = 1024 * 1024
+FORMATS = ("parquet", "csv", "both")
+PARAMS_FILE = "generated.json"
+COUNT_SUFFIXES = {"k": 10**3, "m": 10**6, "b": 10**9}
+
+SCHEMA = pa.schema([
+    ("VendorID", pa.int32()),
+    ("tpep_pickup_datetime", pa.timestamp("us")),
+    ("tpep_dropoff_datetime", pa.timestamp("us")),
+    ("passenger_count", pa.int64()),
+    ("trip_distance", pa.float64()),
+    ("RatecodeID", pa.int64()),
+    ("store_and_fwd_flag", pa.string()),
+    ("PULocationID", pa.int32()),
+    ("DOLocationID", pa.int32()),
+    ("payment_type", pa.int64()),
+    ("fare_amount", pa.float64()),
+    ("extra", pa.float64()),
+    ("mta_tax", pa.float64()),
+    ("tip_amount", pa.float64()),
+    ("tolls_amount", pa.float64()),
+    ("improvement_surcharge", pa.float64()),
+    ("total_amount", pa.float64()),
+    ("congestion_surcharge", pa.float64()),
+    ("Airport_fee", pa.float64()),
+])
+
+N_ZONES = 263                      # 1..263 are real zones; 264/265 are Unknown / Outside of NYC
+UNKNOWN_ZONES = (264, 265)
+UNKNOWN_ZONE_RATE = 0.015
+AIRPORT_ZONES = (1, 132, 138)      # EWR, JFK, LaGuardia
+# Busiest yellow-taxi pickup zones, most trips first (Midtown/UES/airports)
+HOT_ZONES = (
+    161, 237, 236, 132, 162, 230, 186, 142, 138, 170, 163, 239, 48, 68, 234,
+    141, 79, 140, 107, 164, 249, 263, 238, 43, 100, 90, 229, 246, 113, 137,
+)
+ZIPF_EXPONENT = 0.8
+
+# Relative trip volume per hour of day (0..23) and per weekday (Monday..Sunday)
+HOUR_WEIGHTS = (
+    2.6, 1.7, 1.1, 0.7, 0.6, 0.8, 2.0, 3.6, 4.6, 4.8, 4.9, 5.1,
+    5.4, 5.5, 5.9, 6.1, 6.2, 6.6, 7.1, 6.6, 5.9, 5.7, 5.2, 3.9,
+)
+WEEKDAY_WEIGHTS = (0.90, 0.97, 1.03, 1.10, 1.12, 1.08, 0.86)
+
+
+def parse_count(text: str) -> int:
+    """'500M' -> 500_000_000; also '250k', '1.5M', '1e6' and plain integers."""
+    t = str(text).strip().replace("_", "").replace(",", "").lower()
+    scale = COUNT_SUFFIXES.get(t[-1:], 1)
+    if scale != 1:
+        t = t[:-1]
+    try:
+        n = int(float(t) * scale)
+    except ValueError:
+        raise ValueError(f"Not a row count: '{text}'") from None
+    if n < 0:
+        raise ValueError(f"Row count must be >= 0, got '{text}'")
+    return n
+
+
+def format_count(n: int) -> str:
+    """Inverse of parse_count for round numbers (1000000 -> '1M'), used for folder names."""
+    for suffix, scale in (("B", 10**9), ("M", 10**6), ("k", 10**3)):
+        if n >= scale and n % scale == 0:
+            return f"{n // scale}{suffix}"
+    return str(n)
+
+
+def month_range(start: str, months: int) -> List[Tuple[int, int]]:
+    year, month = (int(p) for p in start.split("-"))
+    out = []
+    for i in range(months):
+        y, m = divmod(month - 1 + i, 12)
+        out.append((year + y, m + 1))
+    return out
+
+
+def split_rows(rows: int, parts: int) -> List[int]:
+    base, extra = divmod(rows, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def zone_weights(seed: int) -> np.ndarray:
+    """P(zone) for zones 1..263: HOT_ZONES in order, then the rest in a seeded order, Zipf-like."""
+    rest = np.setdiff1d(np.arange(1, N_ZONES + 1), HOT_ZONES)
+    order = np.concatenate([HOT_ZONES, np.random.default_rng(seed).permutation(rest)])
+    weights = np.empty(N_ZONES)
+    weights[order - 1] = 1.0 / np.arange(1, N_ZONES + 1) ** ZIPF_EXPONENT
+    return weights / weights.sum()
+
+
+def day_weights(year: int, month: int) -> np.ndarray:
+    days = np.arange(np.datetime64(f"{year}-{month:02d}"), np.datetime64(f"{year}-{month:02d}") + 1, dtype="datetime64[D]")
+    # 1970-01-01 was a Thursday: (days + 3) % 7 is 0 for Monday
+    weekday = (days.astype(np.int64) + 3) % 7
+    w = np.asarray(WEEKDAY_WEIGHTS)[weekday]
+    return w / w.sum()
+
+
+def _zones(rng: np.random.Generator, p: np.ndarray, n: int) -> np.ndarray:
+    z = rng.choice(np.arange(1, N_ZONES + 1, dtype=np.int32), size=n, p=p)
+    unknown = rng.random(n) < UNKNOWN_ZONE_RATE
+    z[unknown] = rng.choice(np.asarray(UNKNOWN_ZONES, dtype=np.int32), size=int(unknown.sum()))
+    return z
+
+
+def generate_chunk(
+    rng: np.random.Generator,
+    n: int,
+    year: int,
+    month: int,
+    zone_p: np.ndarray,
+    null_rate: float,
+) -> pa.Table:
+    """n synthetic trips picked up in year-month, as a TLC-schema Arrow table."""
+    month_start = np.datetime64(f"{year}-{month:02d}-01T00:00:00", "us")
+    hour_p = np.asarray(HOUR_WEIGHTS) / sum(HOUR_WEIGHTS)
+    day = rng.choice(len(day_weights(year, month)), size=n, p=day_weights(year, month))
+    hour = rng.choice(24, size=n, p=hour_p)
+    second = (day * 86400 + hour * 3600 + rng.integers(0, 3600, n)).astype(np.int64)
+    pickup = month_start + (second * 1_000_000 + rng.integers(0, 1_000_000, n)).astype("timedelta64[us]")
+
+    pu = _zones(rng, zone_p, n)
+    do = _zones(rng, zone_p, n)
+    airport = np.isin(pu, AIRPORT_ZONES) | np.isin(do, AIRPORT_ZONES)
+
+    # Distance (miles) and speed (mph): log-normal, airport runs longer and faster
+    distance = rng.lognormal(np.where(airport, 2.5, 0.4), 0.65)
+    mph = np.clip(rng.lognormal(np.where(airport, 3.0, 2.35), 0.35), 2.0, 60.0)
+    seconds = distance / mph * 3600.0 + rng.exponential(60.0, n)
+    # The real feed has a sprinkle of zero and negative durations (clock/meter errors)
+    broken = rng.random(n) < 0.001
+    seconds[broken] = -rng.integers(0, 600, int(broken.sum()))
+    dropoff = pickup + (seconds * 1_000_000).astype(np.int64).astype("timedelta64[us]")
+    distance = np.round(distance, 2)
+
+    missing = rng.random(n) < null_rate
+    payment = np.where(missing, 0, rng.choice([1, 2, 3, 4], size=n, p=[0.76, 0.21, 0.02, 0.01])).astype(np.int64)
+    ratecode = np.where(np.isin(pu, AIRPORT_ZONES[1:2]) | np.isin(do, AIRPORT_ZONES[1:2]), 2, 1).astype(np.int64)
+    ratecode[np.isin(do, AIRPORT_ZONES[:1])] = 3
+
+    fare = np.round(3.0 + 1.75 * distance + 0.7 * seconds.clip(0) / 60.0, 2)
+    fare[ratecode == 2] = 70.0
+    extra = np.where((hour >= 20) | (hour < 6), 1.0, 0.0) + np.where((hour >= 16) & (hour < 20), 2.5, 0.0)
+    tolls = np.where(airport & (rng.random(n) < 0.4), 6.94, 0.0)
+    tip = np.where(payment == 1, np.round(fare * rng.choice([0.0, 0.15, 0.2, 0.25, 0.3], size=n), 2), 0.0)
+    congestion = np.where(np.isin(pu, HOT_ZONES[1:]) | np.isin(do, HOT_ZONES[1:]), 2.5, 0.0)
+    airport_fee = np.where(np.isin(pu, AIRPORT_ZONES[1:]), 1.75, 0.0)
+    total = np.round(fare + extra + 0.5 + tip + tolls + 1.0 + congestion + airport_fee, 2)
+
+    return pa.table({
+        "VendorID": pa.array(rng.choice(np.asarray([1, 2, 6], dtype=np.int32), size=n, p=[0.25, 0.74, 0.01])),
+        "tpep_pickup_datetime": pa.array(pickup),
+        "tpep_dropoff_datetime": pa.array(dropoff),
+        "passenger_count": pa.array(rng.choice(np.arange(0, 7), size=n, p=[0.02, 0.74, 0.14, 0.04, 0.02, 0.02, 0.02]), mask=missing),
+        "trip_distance": pa.array(distance),
+        "RatecodeID": pa.array(ratecode, mask=missing),
+        "store_and_fwd_flag": pa.array(np.where(rng.random(n) < 0.005, "Y", "N"), mask=missing, type=pa.string()),
+        "PULocationID": pa.array(pu),
+        "DOLocationID": pa.array(do),
+        "payment_type": pa.array(payment),
+        "fare_amount": pa.array(fare),
+        "extra": pa.array(extra),
+        "mta_tax": pa.array(np.full(n, 0.5)),
+        "tip_amount": pa.array(tip),
+        "tolls_amount": pa.array(tolls),
+        "improvement_surcharge": pa.array(np.full(n, 1.0)),
+        "total_amount": pa.array(total),
+        "congestion_surcharge": pa.array(congestion, mask=missing),
+        "Airport_fee": pa.array(airport_fee, mask=missing),
+    }, schema=SCHEMA)
+
+
+def month_chunks(rows: int, year: int, month: int, seed: int, chunk_rows: int, null_rate: float) -> Iterator[pa.Table]:
+    zone_p = zone_weights(seed)
+    for i, start in enumerate(range(0, rows, chunk_rows)):
+        # Seeded per (month, chunk), so files don't depend on what else is generated
+        rng = np.random.default_rng([seed, year, month, i])
+        yield generate_chunk(rng, min(chunk_rows, rows - start), year, month, zone_p, null_rate)
+
+
+def csv_table(tbl: pa.Table) -> pa.Table:
+    # TLC CSV exports carry whole-second timestamps ("2024-01-01 00:12:34")
+    for name in ("tpep_pickup_datetime", "tpep_dropoff_datetime"):
+        i = tbl.schema.get_field_index(name)
+        tbl = tbl.set_column(i, name, tbl.column(i).cast(pa.timestamp("s"), safe=False))
+    return tbl
+
+
+def write_month(
+    out_dir: Path,
+    rows: int,
+    year: int,
+    month: int,
+    fmt: str,
+    seed: int,
+    chunk_rows: int,
+    null_rate: float,
+    compression: str,
+) -> List[Path]:
+    """Stream one month to Parquet and/or CSV; returns the files written."""
+    stem = f"yellow_tripdata_{year}-{month:02d}"
+    paths = {}
+    if fmt in ("parquet", "both"):
+        paths["parquet"] = out_dir / "parquet" / f"{stem}.parquet"
+    if fmt in ("csv", "both"):
+        paths["csv"] = out_dir / "csv" / f"{stem}.csv"
+    tmp = {k: p.with_name(f".{p.name}.tmp") for k, p in paths.items()}
+    for p in tmp.values():
+        p.parent.mkdir(parents=True, exist_ok=True)
+
+    writers = {}
+    try:
+        if "parquet" in tmp:
+            writers["parquet"] = pq.ParquetWriter(str(tmp["parquet"]), SCHEMA, compression=compression)
+        if "csv" in tmp:
+            writers["csv"] = pcsv.CSVWriter(str(tmp["csv"]), csv_table(SCHEMA.empty_table()).schema)
+        for chunk in month_chunks(rows, year, month, seed, chunk_rows, null_rate):
+            if "parquet" in writers:
+                writers["parquet"].write_table(chunk, row_group_size=chunk_rows)
+            if "csv" in writers:
+                writers["csv"].write_table(csv_table(chunk))
+    finally:
+        for w in writers.values():
+            w.close()
+    for k, p in paths.items():
+        tmp[k].replace(p)
+    return list(paths.values())
+
+
+def generate(
+    out_dir: str,
+    rows: int,
+    start: str = "2024-01",
+    months: int = 1,
+    fmt: str = "parquet",
+    seed: int = 0,
+    chunk_rows: int = 1_000_000,
+    null_rate: float = 0.04,
+    compression: str = "zstd",
+    overwrite: bool = False,
+) -> Dict:
+    """
+    Write `rows` trips split evenly over `months` months into out_dir/parquet and/or out_dir/csv.
+    Skips the work when out_dir/generated.json records the same parameters (unless overwrite).
+    Returns the parameters plus the files and their sizes.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"--format must be one of {', '.join(FORMATS)}, got '{fmt}'")
+    if months < 1 or chunk_rows < 1:
+        raise ValueError("--months and --chunk-rows must be >= 1")
+    if not 0.0 <= null_rate <= 1.0:
+        raise ValueError(f"--null-rate must be between 0 and 1, got {null_rate}")
+
+    out = Path(out_dir)
+    params = {
+        "rows": rows, "start": start, "months": months, "format": fmt, "seed": seed,
+        "chunk_rows": chunk_rows, "null_rate": null_rate, "compression": compression,
+    }
+    marker = out / PARAMS_FILE
+    if marker.exists() and not overwrite:
+        done = json.loads(marker.read_text(encoding="utf-8"))
+        if {k: done.get(k) for k in params} == params and all(Path(f["path"]).exists() for f in done["files"]):
+            print(f"↷ Skipping (already generated): {out}")
+            return done
+
+    files = []
+    t0 = time.time()
+    for (year, month), n in zip(month_range(start, months), split_rows(rows, months)):
+        print(f"→ Generating {n:,} rows for {year}-{month:02d}")
+        for p in write_month(out, n, year, month, fmt, seed, chunk_rows, null_rate, compression):
+            files.append({"path": str(p), "rows": n, "bytes": p.stat().st_size})
+            print(f"✔ Wrote: {p}  |  {p.stat().st_size / MB:,.1f} MB")
+    secs = time.time() - t0
+    done = {**params, "seconds": round(secs, 3), "files": files}
+    out.mkdir(parents=True, exist_ok=True)
+    marker.write_text(json.dumps(done, indent=2) + "\n", encoding="utf-8")
+    print(f"\nDone. {rows:,} rows in {secs:.1f}s  |  ~{rows / secs if secs > 0 else 0:,.0f} rows/s")
+    return done
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic NYC yellow-taxi trip files (TLC schema).")
+    ap.add_argument("--out-dir", required=True, help="Output directory (files go to <out-dir>/parquet and <out-dir>/csv)")
+    ap.add_argument("--rows", required=True, help="Total rows, e.g. 1M, 50M, 500M or 250000")
+    ap.add_argument("--start", default="2024-01", help="First month, YYYY-MM (default: 2024-01, matches the bundled weather)")
+    ap.add_argument("--months", type=int, default=1, help="Spread the rows evenly over this many monthly files (default: 1)")
+    ap.add_argument("--format", default="parquet", choices=FORMATS, help="Output format (default: parquet)")
+    ap.add_argument("--seed", type=int, default=0, help="Random seed; same seed, same files (default: 0)")
+    ap.add_argument("--chunk-rows", type=int, default=1_000_000,
+                    help="Rows generated at a time = Parquet row group size; bounds memory (default: 1,000,000)")
+    ap.add_argument("--null-rate", type=float, default=0.04,
+                    help="Share of trips with the TLC missing block (passenger_count, RatecodeID, ... null; default: 0.04)")
+    ap.add_argument("--compression", default="zstd", help="Parquet compression codec (default: zstd)")
+    ap.add_argument("--overwrite", action="store_true", help="Regenerate even if <out-dir>/generated.json matches")
+    args = ap.parse_args()
+
+    try:
+        generate(
+            args.out_dir, parse_count(args.rows), args.start, args.months, args.format, args.seed,
+            args.chunk_rows, args.null_rate, args.compression, args.overwrite,
+        )
+    except ValueError as e:
+        raise SystemExit(f"✖ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Parquet codec / level / dictionary autotuner (shared by concat, split and CSV -> Parquet)
+
+- Samples a few row groups spread over the inputs (contiguous slices, so runs and
+  dictionaries look like the real data) instead of guessing from file names or habits
+- Encodes the sample once per candidate of a small grid (snappy, lz4, gzip, brotli and a
+  ladder of zstd levels; the fast codecs also without dictionary encoding) and decodes it back,
+  measuring output size, write MB/s and read MB/s (both against the in-memory Arrow size)
+- Picks for a goal:
+    write   fastest encode
+    size    smallest file
+  optionally under floors: --min-read-mbps (readers must stay fast) and --min-write-mbps
+  (the batch must finish tonight). Ties go to the smaller file.
+- --writer duckdb measures with DuckDB's own COPY writer (used by duckdb_csv_to_parquet.py):
+  DuckDB decides dictionary encoding per column itself, so only codec and level are tuned there.
+
+The three scripts accept `--autotune GOAL` (tune on their own inputs, then write) or
+`--autotune tuned.json` (reuse a result saved with --autotune-save / this script's --save).
+
+Usage examples:
+  # What would it cost? Print the grid for a month of trips
+  python3 parquet_autotune.py --input "data/*.parquet" --goal size
+
+  # Smallest files that still read at >= 400 MB/s, saved for the nightly jobs
+  python3 parquet_autotune.py --input data/ --goal size --min-read-mbps 400 --save tuned.json
+  python3 concat_parquet.py --input "data/*.parquet" -o all.parquet --autotune tuned.json
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import parquet_catalog
+
+MB = 1024 * 1024
+GOALS = ("write", "size")
+WRITERS = ("pyarrow", "duckdb")
+SAMPLE_ROWS = 262_144
+SAMPLE_ROW_GROUPS = 4
+READ_REPEATS = 2
+
+# (codec, level); None = the codec's default / no level
+CODECS: Tuple[Tuple[str, Optional[int]], ...] = (
+    ("snappy", None),
+    ("lz4", None),
+    ("zstd", 1),
+    ("zstd", 3),
+    ("zstd", 6),
+    ("zstd", 9),
+    ("zstd", 12),
+    ("zstd", 19),
+    ("gzip", 6),
+    ("brotli", 5),
+)
+# Plain encoding only pays off (faster reads/writes) with light codecs; heavy ones just get slower
+NO_DICTIONARY_CODECS = {("snappy", None), ("lz4", None), ("zstd", 1), ("zstd", 3)}
+
+
+class Choice(NamedTuple):
+    codec: str
+    level: Optional[int] = None
+    dictionary: bool = True
+
+    @property
+    def label(self) -> str:
+        level = f"-{self.level}" if self.level is not None else ""
+        return f"{self.codec}{level}{'' if self.dictionary else ' (no dict)'}"
+
+    def writer_options(self) -> dict:
+        """pyarrow ParquetWriter / write_table keyword arguments."""
+        return dict(compression=self.codec, compression_level=self.level, use_dictionary=self.dictionary)
+
+
+class Trial(NamedTuple):
+    choice: Choice
+    bytes: int
+    write_mbps: float
+    read_mbps: float
+    ratio: float              # in-memory Arrow size / encoded size
+
+
+def grid(writer: str = "pyarrow") -> List[Choice]:
+    if writer == "duckdb":
+        # COPY takes a level for ZSTD only; DuckDB's brotli runs at its top level (~2 MB/s), never worth it
+        return [Choice(codec, level if codec == "zstd" else None) for codec, level in CODECS if codec != "brotli"]
+    choices = [Choice(codec, level) for codec, level in CODECS]
+    return choices + [Choice(codec, level, False) for codec, level in CODECS if (codec, level) in NO_DICTIONARY_CODECS]
+
+
+def discover(inputs: Sequence[str], suffix: str = ".parquet") -> List[str]:
+    """Files from globs, directories (recursive) or plain paths, sorted."""
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            files.update(str(p) for p in Path(item).rglob(f"*{suffix}"))
+        else:
+            files.update(p for p in glob.glob(item) if p.endswith(suffix))
+    return sorted(files)
+
+
+def sample_parquet(paths: Sequence[str], rows: int = SAMPLE_ROWS, row_groups: int = SAMPLE_ROW_GROUPS,
+                   columns: Optional[Sequence[str]] = None) -> pa.Table:
+    """Up to `rows` rows: the head of `row_groups` row groups spaced evenly across all inputs."""
+    index = []
+    # Sampling only reads; don't leave a catalog sidecar in the input directories
+    for info in parquet_catalog.scan(paths, cache=False):
+        index.extend((info.path, i) for i, n in enumerate(info.row_group_rows) if n)
+    if not index:
+        raise ValueError("no rows to sample")
+    picks = sorted({index[round(i * (len(index) - 1) / max(1, row_groups - 1))] for i in range(row_groups)})
+    per_group = max(1, rows // len(picks))
+    parts = []
+    for path, i in picks:
+        tbl = pq.ParquetFile(path).read_row_group(i, columns=columns)
+        parts.append(tbl.slice(0, per_group))
+    return pa.concat_tables(parts, promote_options="permissive").combine_chunks()
+
+
+def _read_mbps(data, nbytes: int) -> float:
+    best = float("inf")
+    for _ in range(READ_REPEATS):
+        t0 = time.perf_counter()
+        pq.read_table(data)
+        best = min(best, time.perf_counter() - t0)
+    return nbytes / MB / best if best > 0 else float("inf")
+
+
+def measure_pyarrow(tbl: pa.Table, choice: Choice) -> Trial:
+    sink = io.BytesIO()
+    t0 = time.perf_counter()
+    pq.write_table(tbl, sink, row_group_size=max(1, tbl.num_rows), **choice.writer_options())
+    secs = time.perf_counter() - t0
+    size = sink.tell()
+    return Trial(choice, size, tbl.nbytes / MB / secs if secs > 0 else float("inf"),
+                 _read_mbps(pa.BufferReader(sink.getvalue()), tbl.nbytes), tbl.nbytes / size)
+
+
+def measure_duckdb(tbl: pa.Table, choice: Choice, con=None) -> Trial:
+    import duckdb
+
+    con = con or duckdb.connect(database=":memory:")
+    con.register("autotune_sample", tbl)
+    level = f", COMPRESSION_LEVEL {choice.level}" if choice.level is not None else ""
+    with tempfile.TemporaryDirectory(prefix="autotune-") as tmp:
+        path = os.path.join(tmp, "sample.parquet")
+        t0 = time.perf_counter()
+        con.execute(f"COPY autotune_sample TO '{path}' (FORMAT PARQUET, COMPRESSION {choice.codec.upper()}{level});")
+        secs = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            data = pa.BufferReader(f.read())
+    con.unregister("autotune_sample")
+    return Trial(choice, size, tbl.nbytes / MB / secs if secs > 0 else float("inf"),
+                 _read_mbps(data, tbl.nbytes), tbl.nbytes / size)
+
+
+def pick(trials: Sequence[Trial], goal: str, min_read_mbps: Optional[float] = None,
+         min_write_mbps: Optional[float] = None) -> Trial:
+    """Best trial for the goal among those meeting the floors; ValueError when none does."""
+    if goal not in GOALS:
+        raise ValueError(f"Unknown autotune goal '{goal}' (known: {', '.join(GOALS)})")
+    ok = [t for t in trials
+          if (min_read_mbps is None or t.read_mbps >= min_read_mbps)
+          and (min_write_mbps is None or t.write_mbps >= min_write_mbps)]
+    if not ok:
+        raise ValueError("no codec meets the read/write MB/s floors on this sample; lower them")
+    if goal == "write":
+        return max(ok, key=lambda t: (t.write_mbps, -t.bytes))
+    return min(ok, key=lambda t: (t.bytes, -t.write_mbps))
+
+
+def tune(tbl: pa.Table, goal: str, min_read_mbps: Optional[float] = None, min_write_mbps: Optional[float] = None,
+         writer: str = "pyarrow", choices: Optional[Sequence[Choice]] = None) -> Tuple[Trial, List[Trial]]:
+    """Measure every candidate on the sample; returns (best trial, all trials)."""
+    if goal not in GOALS:
+        raise ValueError(f"Unknown autotune goal '{goal}' (known: {', '.join(GOALS)})")
+    if writer == "duckdb":
+        import duckdb
+
+        con = duckdb.connect(database=":memory:")
+        measure: Callable[[pa.Table, Choice], Trial] = lambda t, c: measure_duckdb(t, c, con)
+    else:
+        measure = measure_pyarrow
+    trials = [measure(tbl, c) for c in (choices or grid(writer))]
+    return pick(trials, goal, min_read_mbps, min_write_mbps), trials
+
+
+def print_trials(trials: Sequence[Trial], best: Trial, sample_rows: int, sample_bytes: int) -> None:
+    print(f"Autotune on a {sample_rows:,}-row sample ({sample_bytes / MB:,.1f} MB in memory):")
+    print(f"  {'codec':<22} {'MB':>8} {'ratio':>7} {'write MB/s':>11} {'read MB/s':>10}")
+    for t in sorted(trials, key=lambda t: t.bytes):
+        mark = "✔" if t is best else " "
+        print(f"{mark} {t.choice.label:<22} {t.bytes / MB:>8.2f} {t.ratio:>7.2f} {t.write_mbps:>11.1f} {t.read_mbps:>10.1f}")
+
+
+def save(trial: Trial, path: str, **context) -> None:
+    out = {
+        **trial.choice._asdict(),
+        "bytes": trial.bytes,
+        "ratio": round(trial.ratio, 3),
+        "write_mbps": round(trial.write_mbps, 1),
+        "read_mbps": round(trial.read_mbps, 1),
+        **context,
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(out, indent=2) + "\n", encoding="utf-8")
+
+
+def load(path: str) -> Choice:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return Choice(data["codec"], data.get("level"), data.get("dictionary", True))
+
+
+# --- Script integration ---
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--autotune", default=None, metavar="GOAL|FILE",
+                    help="Pick codec/level/dictionary from a sample of the input: 'write' (fastest) or 'size' "
+                         "(smallest), or a JSON file saved by parquet_autotune.py. Overrides --compression")
+    ap.add_argument("--min-read-mbps", type=float, default=None, help="With --autotune GOAL: only codecs reading at least this fast")
+    ap.add_argument("--min-write-mbps", type=float, default=None, help="With --autotune GOAL: only codecs writing at least this fast")
+    ap.add_argument("--autotune-save", default=None, metavar="FILE", help="With --autotune GOAL: save the choice for later runs")
+
+
+def setting(args) -> Optional[str]:
+    """What to record as the codec setting (e.g. in a manifest) before the sample is measured."""
+    if args.autotune is None:
+        return None
+    if args.autotune.endswith(".json"):
+        return load(args.autotune).label
+    floors = "".join(f",{k}>={v:g}" for k, v in (("read", args.min_read_mbps), ("write", args.min_write_mbps)) if v)
+    return f"autotune:{args.autotune}{floors}"
+
+
+def from_args(args, sample: Callable[[], pa.Table], writer: str = "pyarrow") -> Optional[Choice]:
+    """The scripts' --autotune: None when not requested, else the loaded or freshly tuned Choice."""
+    if args.autotune is None:
+        return None
+    if args.autotune.endswith(".json"):
+        choice = load(args.autotune)
+        print(f"Autotune: using {choice.label} from {args.autotune}")
+        return choice
+    tbl = sample()
+    best, trials = tune(tbl, args.autotune, args.min_read_mbps, args.min_write_mbps, writer)
+    print_trials(trials, best, tbl.num_rows, tbl.nbytes)
+    if args.autotune_save:
+        save(best, args.autotune_save, goal=args.autotune, writer=writer,
+             min_read_mbps=args.min_read_mbps, min_write_mbps=args.min_write_mbps)
+    return best.choice
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Measure Parquet codecs/levels on a sample of the data and pick one for a goal.")
+    ap.add_argument("--input", required=True, nargs="+", help="Parquet files, globs or directories")
+    ap.add_argument("--goal", default="size", choices=GOALS, help="write = fastest encode, size = smallest file (default: size)")
+    ap.add_argument("--min-read-mbps", type=float, default=None, help="Only consider codecs that read at least this fast")
+    ap.add_argument("--min-write-mbps", type=float, default=None, help="Only consider codecs that write at least this fast")
+    ap.add_argument("--writer", default="pyarrow", choices=WRITERS,
+                    help="Encoder to measure: pyarrow (concat/split) or duckdb (CSV -> Parquet). Default: pyarrow")
+    ap.add_argument("--sample-rows", type=int, default=SAMPLE_ROWS, help=f"Rows sampled (default: {SAMPLE_ROWS:,})")
+    ap.add_argument("--sample-row-groups", type=int, default=SAMPLE_ROW_GROUPS,
+                    help=f"Row groups the sample is spread over (default: {SAMPLE_ROW_GROUPS})")
+    ap.add_argument("--save", default=None, metavar="FILE", help="Write the choice as JSON (for the scripts' --autotune FILE)")
+    args = ap.parse_args()
+
+    files = discover(args.input)
+    if not files:
+        raise SystemExit("✖ No Parquet files matched.")
+    try:
+        tbl = sample_parquet(files, args.sample_rows, args.sample_row_groups)
+        best, trials = tune(tbl, args.goal, args.min_read_mbps, args.min_write_mbps, args.writer)
+    except ValueError as e:
+        raise SystemExit(f"✖ {e}")
+    print_trials(trials, best, tbl.num_rows, tbl.nbytes)
+    print(f"\nBest for '{args.goal}': {best.choice.label}")
+    if args.save:
+        save(best, args.save, goal=args.goal, writer=args.writer,
+             min_read_mbps=args.min_read_mbps, min_write_mbps=args.min_write_mbps)
+        print(f"✔ Saved: {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Parallel Parquet footer scan + cached metadata catalog (shared by the Parquet scripts)
+
+- Reads footers on a thread pool (footer reads are small random I/O; parsing runs outside
+  the GIL), instead of one file after another
+- Keeps what the scripts ask footers for: Arrow schema, row count, per-row-group rows and
+  byte sizes, codecs, and per-row-group column statistics (min / max / null count)
+- Caches it in a hidden sidecar per directory, <dir>/.parquet_catalog.json, keyed by file
+  name and validated by size + mtime, so a rerun over thousands of parts only re-reads the
+  footers of files that changed. Hidden files are skipped by pyarrow datasets and by the
+  scripts' *.parquet globs; read-only directories simply aren't cached.
+
+    infos = scan(files)                  # FileInfo per path, input order
+    schema = pa.unify_schemas([i.schema for i in infos])
+    rows = sum(i.num_rows for i in infos)
+
+Used by concat_parquet.py, split_parquet.py, duckdb_parquet_to_csv.py and parquet_autotune.py
+(import as a sibling module). Delete the sidecar (or pass cache=False) to force
+a fresh read.
+"""
+
+import base64
+import datetime
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CATALOG_NAME = ".parquet_catalog.json"
+CATALOG_VERSION = 1
+DEFAULT_THREADS = 16
+
+
+def _stat_value(v):
+    # JSON-safe statistics: numbers/strings as-is, temporal values as ISO text, the rest as str
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    if isinstance(v, (datetime.datetime, datetime.date, datetime.time)):
+        return v.isoformat()
+    if isinstance(v, bytes):
+        return v.hex()
+    return str(v)
+
+
+class FileInfo:
+    """Footer facts of one Parquet file, from a fresh read or the sidecar cache."""
+
+    def __init__(self, path: str, entry: dict):
+        self.path = path
+        self.entry = entry
+        self._schema: Optional[pa.Schema] = None
+
+    @property
+    def size(self) -> int:
+        return self.entry["size"]
+
+    @property
+    def num_rows(self) -> int:
+        return self.entry["num_rows"]
+
+    @property
+    def num_row_groups(self) -> int:
+        return len(self.entry["row_groups"])
+
+    @property
+    def row_group_rows(self) -> List[int]:
+        return [rg["num_rows"] for rg in self.entry["row_groups"]]
+
+    @property
+    def row_group_bytes(self) -> List[int]:
+        """Uncompressed size of every row group (the footer's total_byte_size)."""
+        return [rg["total_byte_size"] for rg in self.entry["row_groups"]]
+
+    @property
+    def codecs(self) -> List[str]:
+        """Distinct column-chunk codecs, upper case (e.g. ["ZSTD"])."""
+        return self.entry["codecs"]
+
+    @property
+    def first_codec(self) -> Optional[str]:
+        """Codec of the first column chunk of the first row group (None for an empty file)."""
+        return self.entry["first_codec"]
+
+    @property
+    def schema(self) -> pa.Schema:
+        if self._schema is None:
+            self._schema = pa.ipc.read_schema(pa.py_buffer(base64.b64decode(self.entry["schema"])))
+        return self._schema
+
+    def column_stats(self, rg_index: int) -> Dict[str, dict]:
+        """{column path: {"min", "max", "null_count"}} of one row group (columns without stats omitted)."""
+        return self.entry["row_groups"][rg_index]["columns"]
+
+
+def read_entry(path: str) -> dict:
+    """One footer read -> the catalog entry (size/mtime are taken before the read)."""
+    st = os.stat(path)
+    md = pq.read_metadata(path)
+    schema = md.schema.to_arrow_schema()
+    codecs = set()
+    row_groups = []
+    for i in range(md.num_row_groups):
+        rg = md.row_group(i)
+        columns = {}
+        for j in range(rg.num_columns):
+            col = rg.column(j)
+            codecs.add(str(col.compression).upper())
+            stats = col.statistics
+            if stats is None:
+                continue
+            columns[col.path_in_schema] = {
+                "min": _stat_value(stats.min) if stats.has_min_max else None,
+                "max": _stat_value(stats.max) if stats.has_min_max else None,
+                "null_count": stats.null_count if stats.has_null_count else None,
+            }
+        row_groups.append({"num_rows": rg.num_rows, "total_byte_size": rg.total_byte_size, "columns": columns})
+    first = None
+    if md.num_row_groups and md.num_columns:
+        first = str(md.row_group(0).column(0).compression).upper()
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "num_rows": md.num_rows,
+        "codecs": sorted(codecs),
+        "first_codec": first,
+        "schema": base64.b64encode(schema.serialize().to_pybytes()).decode("ascii"),
+        "row_groups": row_groups,
+    }
+
+
+def _load_sidecar(directory: str) -> Dict[str, dict]:
+    try:
+        data = json.loads(Path(directory, CATALOG_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CATALOG_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def _save_sidecar(directory: str, entries: Dict[str, dict]) -> None:
+    # Merge with what another process may have written meanwhile, drop files that are gone
+    files = {**_load_sidecar(directory), **entries}
+    files = {name: e for name, e in files.items() if os.path.exists(os.path.join(directory, name))}
+    path = Path(directory, CATALOG_NAME)
+    tmp = path.with_name(f"{CATALOG_NAME}.tmp-{os.getpid()}")
+    try:
+        tmp.write_text(json.dumps({"version": CATALOG_VERSION, "files": files}), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _fresh(entry: Optional[dict], st: os.stat_result) -> bool:
+    return entry is not None and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns
+
+
+def scan_with_errors(
+    paths: Sequence[str],
+    threads: Optional[int] = None,
+    cache: bool = True,
+) -> Tuple[List[FileInfo], Dict[str, str]]:
+    """
+    FileInfo for every readable path (input order) and {path: error} for the rest. Cached
+    entries whose size and mtime still match are reused; the others are read in parallel.
+    """
+    by_dir: Dict[str, Dict[str, dict]] = {}
+    entries: Dict[str, dict] = {}
+    todo = []
+    errors: Dict[str, str] = {}
+    for path in paths:
+        directory, name = os.path.split(os.path.abspath(path))
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            errors[path] = str(e)
+            continue
+        if cache:
+            if directory not in by_dir:
+                by_dir[directory] = _load_sidecar(directory)
+            cached = by_dir[directory].get(name)
+            if _fresh(cached, st):
+                entries[path] = cached
+                continue
+        todo.append(path)
+
+    if todo:
+        workers = max(1, min(threads or DEFAULT_THREADS, len(todo)))
+
+        def read(path: str):
+            try:
+                return path, read_entry(path), None
+            except Exception as e:
+                return path, None, str(e)
+
+        updated: Dict[str, Dict[str, dict]] = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, entry, error in pool.map(read, todo):
+                if error is not None:
+                    errors[path] = error
+                    continue
+                entries[path] = entry
+                directory, name = os.path.split(os.path.abspath(path))
+                updated.setdefault(directory, {})[name] = entry
+        if cache:
+            for directory, changed in updated.items():
+                _save_sidecar(directory, changed)
+
+    return [FileInfo(p, entries[p]) for p in paths if p in entries], errors
+
+
+def scan(paths: Sequence[str], threads: Optional[int] = None, cache: bool = True) -> List[FileInfo]:
+    """scan_with_errors() that raises on the first unreadable file."""
+    infos, errors = scan_with_errors(paths, threads, cache)
+    if errors:
+        path, error = next(iter(errors.items()))
+        raise OSError(f"Failed to read Parquet footer of {path}: {error}")
+    return infos
+
+
+def scan_one(path: str, cache: bool = True) -> FileInfo:
+    return scan([path], threads=1, cache=cache)[0]
@@ -18,44 +18,72 @@ Usage examples:
     --rows-per-file 1000000 \
     --compression zstd \
     --verify
+
+  # Write all parts at once: boundaries are planned from row-group metadata and each
+  # worker reads only the row groups (and slices) that fall into its part
+  python split_parquet.py \
+    --input your_big.parquet \
+    --output-dir out_dir \
+    --parts 8 \
+    --jobs 4 \
+    --verify
+
+  # Partition by key instead of by position, so each part can be aggregated on its own:
+  # one file per pickup day ...
+  python split_parquet.py \
+    --input your_big.parquet \
+    --output-dir out_dir \
+    --range-by tpep_pickup_datetime --range-unit day
+
+  # ... or 16 hash buckets of pickup zone
+  python split_parquet.py \
+    --input your_big.parquet \
+    --output-dir out_dir \
+    --hash-by PULocationID --buckets 16
 """
 
 """
 Parquet splitter (equal by rows, streaming, codec-aware, PyArrow 21+)
 
-- Auto-detects the input Parquet compression codec and uses it unless overridden.
+- Row counts, row-group layout and codec come from the footer catalog (parquet_catalog.py:
+  parallel footer reads, cached in <dir>/.parquet_catalog.json by size/mtime). The cache is
+  deliberately written next to the *input* so repeated splits of a large dataset skip its
+  footers (it is skipped when that directory is read-only); --verify reads without caching.
+- Auto-detects the input Parquet compression codec and uses it unless overridden, or with
+  --autotune write|size measures a grid of codecs/levels on a sample and picks one (parquet_autotune.py).
 - Streams record batches via dataset.scanner(...).to_batches() (low memory).
 - Buffers batches to form sensible row groups to avoid compression inefficiency.
 - Ensures each row is written exactly once to exactly one output part.
+- With --jobs N, plans part boundaries up front from row-group row counts and writes the
+  parts in parallel (same parts, same row counts as the streaming mode).
+- With --hash-by / --range-by, routes every row to the part owning its key (one writer per
+  part, buffers bounded by --max-buffered-rows), so all rows of a key land in one part. At most
+  --max-open-files writers are open at once; a part whose writer was closed continues in
+  <prefix>-<label>.N.parquet.
 """
 
 import argparse
 import math
-from typing import Optional, List
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+from typing import Optional, List, Tuple
 from pathlib import Path
+import numpy as np
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 
+import parquet_autotune
+import parquet_catalog
 
-# Map pyarrow parquet metadata compression enum to readable string if needed
-_COMPRESSION_NAME_MAP = {
-    0: "UNCOMPRESSED", 1: "SNAPPY", 2: "GZIP", 3: "BROTLI", 4: "LZ4",
-    5: "ZSTD", 6: "LZ4_RAW"
-}
 
 def detect_input_codec(parquet_path: str) -> Optional[str]:
     """Best-effort detection of input file codec from metadata of first row group/column."""
     try:
-        pf = pq.ParquetFile(parquet_path)
-        if pf.num_row_groups == 0 or pf.metadata.num_columns == 0:
-            return None
-        comp_enum = pf.metadata.row_group(0).column(0).compression
-        # comp_enum can already be a string in newer pyarrow, handle both
-        if isinstance(comp_enum, str):
-            name = comp_enum.upper()
-        else:
-            name = _COMPRESSION_NAME_MAP.get(int(comp_enum), None)
+        name = parquet_catalog.scan_one(parquet_path).first_codec
         if not name:
             return None
         # Normalize to pyarrow values
@@ -67,8 +95,154 @@ def detect_input_codec(parquet_path: str) -> Optional[str]:
         return None
 
 
-def _open_writer(path: Path, schema: pa.Schema, compression: Optional[str]) -> pq.ParquetWriter:
-    return pq.ParquetWriter(path.as_posix(), schema=schema, compression=compression)
+def _open_writer(path: Path, schema: pa.Schema, compression: Optional[str],
+                 level: Optional[int] = None, dictionary: bool = True) -> pq.ParquetWriter:
+    return pq.ParquetWriter(path.as_posix(), schema=schema, compression=compression,
+                            compression_level=level, use_dictionary=dictionary)
+
+
+def _target_rows(total_rows: int, parts: Optional[int], rows_per_file: Optional[int]) -> Tuple[int, Optional[int]]:
+    """Rows per output file and the optional cap on the number of files."""
+    if (parts is None) == (rows_per_file is None):
+        raise ValueError("Specify exactly one of --parts or --rows-per-file.")
+    if parts is not None:
+        if parts <= 0:
+            raise ValueError("--parts must be >= 1")
+        return max(1, math.ceil(total_rows / parts)), parts
+    if rows_per_file is None or rows_per_file <= 0:
+        raise ValueError("--rows-per-file must be >= 1")
+    return int(rows_per_file), None
+
+
+def plan_part_ranges(total_rows: int, target_rows: int, max_files: Optional[int]) -> List[Tuple[int, int]]:
+    """
+    Global [start, stop) row range of every output part, matching the streaming splitter:
+    it rolls to a new file as soon as one fills (so an exact multiple ends with an empty
+    part) and, when the number of files is capped, the last file takes the remainder.
+    """
+    n_files = total_rows // target_rows + 1
+    if max_files is not None:
+        n_files = min(n_files, max_files)
+    ranges = []
+    for i in range(n_files):
+        start = min(i * target_rows, total_rows)
+        stop = total_rows if i == n_files - 1 else min(start + target_rows, total_rows)
+        ranges.append((start, stop))
+    return ranges
+
+
+def row_group_index(files: List[str]) -> List[Tuple[str, int, int, int]]:
+    """(path, row group, first global row, num rows) for every row group, in scan order."""
+    out = []
+    offset = 0
+    for info in parquet_catalog.scan(files):
+        for i, n in enumerate(info.row_group_rows):
+            out.append((info.path, i, offset, n))
+            offset += n
+    return out
+
+
+def _write_part(
+    path: Path,
+    schema: pa.Schema,
+    compression: Optional[str],
+    level: Optional[int],
+    dictionary: bool,
+    row_groups: List[Tuple[str, int, int, int]],
+    start: int,
+    stop: int,
+    buffer_target_rows: int,
+) -> int:
+    """Write rows [start, stop) by reading only the overlapping row groups (runs on a worker)."""
+    buffer: List[pa.Table] = []
+    buffered = 0
+    written = 0
+    handles = {}
+    writer = _open_writer(path, schema, compression, level, dictionary)
+    try:
+        for src, rg, first, n in row_groups:
+            lo, hi = max(start, first), min(stop, first + n)
+            if lo >= hi:
+                continue
+            pf = handles.get(src)
+            if pf is None:
+                pf = handles[src] = pq.ParquetFile(src)
+            tbl = pf.read_row_group(rg, columns=schema.names)
+            if not tbl.schema.equals(schema):
+                tbl = tbl.cast(schema)
+            buffer.append(tbl.slice(lo - first, hi - lo))
+            buffered += hi - lo
+            if buffered >= buffer_target_rows:
+                writer.write_table(pa.concat_tables(buffer), row_group_size=buffer_target_rows)
+                written += buffered
+                buffer, buffered = [], 0
+        if buffered:
+            writer.write_table(pa.concat_tables(buffer), row_group_size=buffer_target_rows)
+            written += buffered
+    finally:
+        writer.close()
+        for pf in handles.values():
+            pf.close()
+    return written
+
+
+def split_parquet_parallel(
+    input_path: str,
+    output_dir: str,
+    *,
+    parts: Optional[int] = None,
+    rows_per_file: Optional[int] = None,
+    prefix: str = "part",
+    compression: Optional[str] = None,
+    compression_level: Optional[int] = None,
+    use_dictionary: bool = True,
+    jobs: int = 4,
+    buffer_target_rows: int = 1_000_000,
+) -> int:
+    """
+    Same output parts as split_parquet_equal_rows, but planned from footer row counts and
+    written concurrently. Parquet decode/encode runs outside the GIL, so threads scale.
+    """
+    dataset = ds.dataset(input_path, format="parquet")
+    schema = dataset.schema
+    row_groups = row_group_index(list(dataset.files))
+    total_rows = sum(n for _, _, _, n in row_groups)
+    target_rows, max_files = _target_rows(total_rows, parts, rows_per_file)
+    ranges = plan_part_ranges(total_rows, target_rows, max_files)
+
+    autodetected = detect_input_codec(dataset.files[0]) if dataset.files else None
+    codec_to_use = compression or autodetected
+
+    outdir = Path(output_dir)
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(ranges)))) as pool:
+        futures = {
+            pool.submit(
+                _write_part,
+                outdir / f"{prefix}-{i:05d}.parquet",
+                schema,
+                codec_to_use,
+                compression_level,
+                use_dictionary,
+                row_groups,
+                start,
+                stop,
+                buffer_target_rows,
+            ): (i, stop - start)
+            for i, (start, stop) in enumerate(ranges)
+        }
+        for fut in as_completed(futures):
+            i, expected = futures[fut]
+            written = fut.result()
+            if written != expected:
+                raise RuntimeError(f"Part {i} wrote {written:,} rows, expected {expected:,}.")
+
+    print(
+        "Split done. Input rows: {:,}. Target per part: {:,}. Files written: {}. Codec: {} (auto: {}). Jobs: {}."
+        .format(total_rows, target_rows, len(ranges), codec_to_use or "uncompressed", autodetected, jobs)
+    )
+    return len(ranges)
 
 
 def split_parquet_equal_rows(
@@ -79,6 +253,8 @@ def split_parquet_equal_rows(
     rows_per_file: Optional[int] = None,
     prefix: str = "part",
     compression: Optional[str] = None,
+    compression_level: Optional[int] = None,
+    use_dictionary: bool = True,
     buffer_target_rows: int = 1_000_000,  # accumulate up to ~1M rows per write for better row groups
 ) -> int:
     # Validate options
@@ -88,22 +264,13 @@ def split_parquet_equal_rows(
     # Discover schema & total rows
     dataset = ds.dataset(input_path, format="parquet")
     schema = dataset.schema
-    total_rows = dataset.count_rows()
+    total_rows = sum(info.num_rows for info in parquet_catalog.scan(list(dataset.files)))
 
     # Determine target rows per output file
-    if parts is not None:
-        if parts <= 0:
-            raise ValueError("--parts must be >= 1")
-        target_rows = max(1, math.ceil(total_rows / parts))
-        max_files = parts
-    else:
-        if rows_per_file is None or rows_per_file <= 0:
-            raise ValueError("--rows-per-file must be >= 1")
-        target_rows = int(rows_per_file)
-        max_files = None
+    target_rows, max_files = _target_rows(total_rows, parts, rows_per_file)
 
     # Choose compression: override > autodetect > default(None)
-    autodetected = detect_input_codec(input_path)
+    autodetected = detect_input_codec(dataset.files[0]) if dataset.files else None
     codec_to_use = compression or autodetected
 
     outdir = Path(output_dir)
@@ -142,7 +309,7 @@ def split_parquet_equal_rows(
             flush_buffer(row_group_size=buffer_target_rows)
             writer.close()
         path = outdir / f"{prefix}-{file_index:05d}.parquet"
-        writer = _open_writer(path, schema, codec_to_use)
+        writer = _open_writer(path, schema, codec_to_use, compression_level, use_dictionary)
         file_index += 1
         produced += 1
         rows_in_current = 0
@@ -201,17 +368,210 @@ def split_parquet_equal_rows(
     return produced
 
 
+RANGE_UNIT_FORMATS = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d", "month": "%Y-%m"}
+NULL_PARTITION = "null"
+# Default cap on simultaneously open part writers (well under the usual 1024 fd limit)
+DEFAULT_MAX_OPEN_FILES = 256
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads sequential ids evenly over buckets."""
+    x = x.astype(np.uint64, copy=True)
+    with np.errstate(over="ignore"):
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return x
+
+
+def hash_partition_ids(arr: pa.Array, buckets: int) -> Tuple[np.ndarray, List[str]]:
+    """Stable (run-to-run) bucket per row; nulls go to bucket 0."""
+    t = arr.type
+    if pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_binary(t) or pa.types.is_large_binary(t):
+        # Hash each distinct value once, then broadcast through the dictionary indices
+        enc = arr.dictionary_encode()
+        values = enc.dictionary.to_pylist()
+        codes = np.array(
+            [zlib.crc32(v.encode() if isinstance(v, str) else v) % buckets for v in values] or [0],
+            dtype=np.int64,
+        )
+        idx = pc.fill_null(enc.indices, -1).to_numpy()
+        ids = np.where(idx < 0, 0, codes[np.maximum(idx, 0)])
+    else:
+        if pa.types.is_floating(t):
+            raw = pc.fill_null(arr.cast(pa.float64()), 0.0).to_numpy(zero_copy_only=False).view(np.uint64)
+        else:
+            raw = pc.fill_null(arr.cast(pa.int64()), 0).to_numpy(zero_copy_only=False).view(np.uint64)
+        ids = (_mix64(raw) % np.uint64(buckets)).astype(np.int64)
+        if arr.null_count:
+            ids[pc.is_null(arr).to_numpy(zero_copy_only=False)] = 0
+    return ids, [f"{b:05d}" for b in range(buckets)]
+
+
+def range_label(index: int, width: float) -> str:
+    """Lower bound of range `index` with as many decimals as `width` has (1.0 -> "3", 0.25 -> "0.75")."""
+    decimals = max(0, -Decimal(repr(float(width))).normalize().as_tuple().exponent)
+    if decimals == 0:
+        return str(index * int(width))
+    return f"{index * width:.{decimals}f}"
+
+
+def range_partition_ids(arr: pa.Array, unit: Optional[str], width: Optional[float]) -> Tuple[np.ndarray, List[str]]:
+    """Floor every value to its range (time unit or numeric width); one id per distinct range."""
+    t = arr.type
+    if pa.types.is_timestamp(t) or pa.types.is_date(t):
+        if unit is None:
+            raise ValueError("--range-unit is required to range-partition a timestamp/date column")
+        if pa.types.is_date(t):
+            arr = arr.cast(pa.timestamp("s"))
+        floored = pc.floor_temporal(arr, unit=unit)
+        enc = floored.dictionary_encode()
+        labels = pc.strftime(enc.dictionary, format=RANGE_UNIT_FORMATS[unit]).to_pylist()
+    else:
+        if width is None:
+            raise ValueError("--range-width is required to range-partition a numeric column")
+        if width <= 0:
+            raise ValueError("--range-width must be > 0")
+        values = pc.fill_null(arr, 0).to_numpy(zero_copy_only=False)
+        # Label by the integer range index: distinct ranges always get distinct, plain-decimal labels
+        index = np.floor_divide(values, width).astype(np.int64)
+        mask = pc.is_null(arr).to_numpy(zero_copy_only=False) if arr.null_count else None
+        enc = pa.array(index, mask=mask).dictionary_encode()
+        labels = [range_label(k, width) for k in enc.dictionary.to_pylist()]
+    idx = pc.fill_null(enc.indices, len(labels)).to_numpy().astype(np.int64)
+    return idx, labels + [NULL_PARTITION]
+
+
+def split_parquet_by_key(
+    input_path: str,
+    output_dir: str,
+    *,
+    column: str,
+    mode: str,
+    buckets: Optional[int] = None,
+    range_unit: Optional[str] = None,
+    range_width: Optional[float] = None,
+    prefix: str = "part",
+    compression: Optional[str] = None,
+    compression_level: Optional[int] = None,
+    use_dictionary: bool = True,
+    buffer_target_rows: int = 1_000_000,
+    max_buffered_rows: int = 4_000_000,
+    max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+) -> int:
+    """
+    Stream the input once and route each row to the part that owns its key: a hash bucket
+    (mode="hash") or a floored range (mode="range"). Every part has its own writer; a part is
+    flushed once it buffers buffer_target_rows, and when all buffers together exceed
+    max_buffered_rows the largest ones are flushed until the total is back under half.
+
+    At most max_open_files writers are open at once: opening another closes the least recently
+    used one, and a part flushed again after that continues in a numbered file
+    (<prefix>-<label>.1.parquet, .2, ...). Returns the number of files written.
+    """
+    if mode == "hash" and (buckets is None or buckets <= 0):
+        raise ValueError("--buckets must be >= 1")
+    if max_open_files < 1:
+        raise ValueError("--max-open-files must be >= 1")
+
+    dataset = ds.dataset(input_path, format="parquet")
+    schema = dataset.schema
+    if column not in schema.names:
+        raise ValueError(f"Column {column!r} not found in input schema")
+
+    autodetected = detect_input_codec(dataset.files[0]) if dataset.files else None
+    codec_to_use = compression or autodetected
+
+    outdir = Path(output_dir)
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    writers = OrderedDict()   # open writers, least recently used first
+    files_per_label = {}
+    buffers = {}
+    buffered_rows = {}
+    total_buffered = 0
+    total_rows = 0
+
+    def writer_for(label: str):
+        writer = writers.get(label)
+        if writer is not None:
+            writers.move_to_end(label)
+            return writer
+        if len(writers) >= max_open_files:
+            _, lru = writers.popitem(last=False)
+            lru.close()
+        n = files_per_label.get(label, 0)
+        files_per_label[label] = n + 1
+        name = f"{prefix}-{label}.parquet" if n == 0 else f"{prefix}-{label}.{n}.parquet"
+        writer = writers[label] = _open_writer(outdir / name, schema, codec_to_use, compression_level, use_dictionary)
+        return writer
+
+    def flush(label: str):
+        nonlocal total_buffered
+        if not buffered_rows.get(label):
+            return
+        writer = writer_for(label)
+        writer.write_table(pa.Table.from_batches(buffers[label], schema=schema), row_group_size=buffer_target_rows)
+        total_buffered -= buffered_rows[label]
+        buffers[label], buffered_rows[label] = [], 0
+
+    try:
+        for batch in dataset.scanner(use_threads=True).to_batches():
+            if batch.num_rows == 0:
+                continue
+            key = batch.column(schema.get_field_index(column))
+            if mode == "hash":
+                ids, labels = hash_partition_ids(key, buckets)
+            else:
+                ids, labels = range_partition_ids(key, range_unit, range_width)
+
+            # Group rows by partition with one stable sort, keeping input order inside a part
+            order = np.argsort(ids, kind="stable")
+            part_ids, starts = np.unique(ids[order], return_index=True)
+            ordered = batch.take(pa.array(order))
+            ends = list(starts[1:]) + [len(order)]
+            for pid, lo, hi in zip(part_ids, starts, ends):
+                label = labels[pid]
+                buffers.setdefault(label, []).append(ordered.slice(lo, hi - lo))
+                buffered_rows[label] = buffered_rows.get(label, 0) + int(hi - lo)
+                total_buffered += int(hi - lo)
+                if buffered_rows[label] >= buffer_target_rows:
+                    flush(label)
+            total_rows += batch.num_rows
+
+            if total_buffered > max_buffered_rows:
+                for label in sorted(buffered_rows, key=buffered_rows.get, reverse=True):
+                    if total_buffered <= max_buffered_rows // 2:
+                        break
+                    flush(label)
+
+        for label in list(buffers):
+            flush(label)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    files = sum(files_per_label.values())
+    print(
+        "Split done. Input rows: {:,}. Partitioned by {} ({}). Files written: {}. Codec: {} (auto: {})."
+        .format(total_rows, column, mode, files, codec_to_use or "uncompressed", autodetected)
+    )
+    return files
+
+
 def verify_outputs(output_dir: str, prefix: str = "part") -> None:
     """Optional: verify row counts and on-disk sizes."""
     outdir = Path(output_dir)
     files = sorted(outdir.glob(f"{prefix}-*.parquet"))
     total = 0
     print("\nVerification:")
-    for p in files:
-        rows = ds.dataset(p.as_posix(), format="parquet").count_rows()
-        size_gb = p.stat().st_size / (1024.0 ** 3)
-        total += rows
-        print(f"  {p.name}: rows={rows:,}  size={size_gb:.2f} GB")
+    # Footers only (read in parallel); a read-only check, so no catalog sidecar is written
+    for info in parquet_catalog.scan([p.as_posix() for p in files], cache=False):
+        size_gb = info.size / (1024.0 ** 3)
+        total += info.num_rows
+        print(f"  {Path(info.path).name}: rows={info.num_rows:,}  size={size_gb:.2f} GB")
     print(f"  TOTAL rows across parts: {total:,}")
 
 
@@ -222,22 +582,92 @@ def parse_args() -> argparse.Namespace:
     group = ap.add_mutually_exclusive_group(required=True)
     group.add_argument("--parts", type=int, help="Number of equal parts (by rows)")
     group.add_argument("--rows-per-file", type=int, help="Approx. rows per output file")
+    group.add_argument("--hash-by", metavar="COLUMN", help="Hash-partition rows on COLUMN into --buckets parts")
+    group.add_argument("--range-by", metavar="COLUMN", help="Range-partition rows on COLUMN (--range-unit or --range-width)")
+    ap.add_argument("--buckets", type=int, default=16, help="Number of hash buckets for --hash-by (default: 16)")
+    ap.add_argument("--range-unit", choices=sorted(RANGE_UNIT_FORMATS), help="Range size for timestamp/date --range-by columns")
+    ap.add_argument("--range-width", type=float, help="Range width for numeric --range-by columns")
+    ap.add_argument(
+        "--max-buffered-rows",
+        type=int,
+        default=4_000_000,
+        help="Cap on rows buffered across all key partitions before the largest are flushed (default: 4,000,000)",
+    )
+    ap.add_argument(
+        "--max-open-files",
+        type=int,
+        default=DEFAULT_MAX_OPEN_FILES,
+        help="Cap on key-partition files open at once; a part reopened after being closed continues in "
+             f"<prefix>-<label>.N.parquet (default: {DEFAULT_MAX_OPEN_FILES})",
+    )
     ap.add_argument("--compression", default=None, help='Override codec: snappy | zstd | gzip (default: auto-detect input)')
+    ap.add_argument("--level", type=int, default=None, help="Compression level for --compression (default: the codec's default)")
     ap.add_argument("--prefix", default="part", help="Output filename prefix (default: part)")
     ap.add_argument("--verify", action="store_true", help="After splitting, verify counts & sizes")
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Write this many parts in parallel, planned from row-group metadata (default: 1 = streaming)",
+    )
+    parquet_autotune.add_arguments(ap)
     return ap.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    split_parquet_equal_rows(
-        input_path=args.input,
-        output_dir=args.output_dir,
-        parts=args.parts,
-        rows_per_file=args.rows_per_file,
-        prefix=args.prefix,
-        compression=args.compression,
-    )
+    if args.jobs < 1:
+        raise SystemExit("--jobs must be >= 1")
+    dictionary = True
+    try:
+        choice = parquet_autotune.from_args(
+            args, lambda: parquet_autotune.sample_parquet(list(ds.dataset(args.input, format="parquet").files))
+        )
+    except ValueError as e:
+        raise SystemExit(f"Autotune failed: {e}")
+    if choice is not None:
+        args.compression, args.level, dictionary = choice
+    if args.hash_by or args.range_by:
+        if args.jobs > 1:
+            raise SystemExit("--jobs applies to --parts / --rows-per-file splits only")
+        split_parquet_by_key(
+            input_path=args.input,
+            output_dir=args.output_dir,
+            column=args.hash_by or args.range_by,
+            mode="hash" if args.hash_by else "range",
+            buckets=args.buckets,
+            range_unit=args.range_unit,
+            range_width=args.range_width,
+            prefix=args.prefix,
+            compression=args.compression,
+            compression_level=args.level,
+            use_dictionary=dictionary,
+            max_buffered_rows=args.max_buffered_rows,
+            max_open_files=args.max_open_files,
+        )
+    elif args.jobs > 1:
+        split_parquet_parallel(
+            input_path=args.input,
+            output_dir=args.output_dir,
+            parts=args.parts,
+            rows_per_file=args.rows_per_file,
+            prefix=args.prefix,
+            compression=args.compression,
+            compression_level=args.level,
+            use_dictionary=dictionary,
+            jobs=args.jobs,
+        )
+    else:
+        split_parquet_equal_rows(
+            input_path=args.input,
+            output_dir=args.output_dir,
+            parts=args.parts,
+            rows_per_file=args.rows_per_file,
+            prefix=args.prefix,
+            compression=args.compression,
+            compression_level=args.level,
+            use_dictionary=dictionary,
+        )
     if args.verify:
         verify_outputs(args.output_dir, args.prefix)
 
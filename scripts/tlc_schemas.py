@@ -0,0 +1,234 @@
+"""
+Versioned registry of NYC TLC trip-record schemas (yellow, green, FHV) for CSV ingest.
+
+read_csv_auto sniffs every file on its own: a month where VendorID or passenger_count has
+a blank or a "1.0" comes out DOUBLE, the next month BIGINT, and the sniffing itself costs a
+pass over a sample of each large CSV. The Parquet files then disagree and concat_parquet.py
+has to unify the schemas and cast row groups. With the registry the converter hands DuckDB
+the column names and types up front (auto_detect off), so every month of a dataset comes out
+with the same schema and the same column spelling (the CSV header's case doesn't matter).
+
+Each dataset has schema versions keyed by the first month they apply to; a file's month
+(from the TLC file name, e.g. yellow_tripdata_2019-03.csv) picks the latest version at or
+before it:
+
+  yellow  2015-01  pickup/dropoff coordinates
+          2016-07  PULocationID / DOLocationID replace coordinates
+          2019-01  + congestion_surcharge
+          2022-01  + Airport_fee
+          2025-01  + cbd_congestion_fee
+  green   2016-07  location IDs
+          2019-01  + congestion_surcharge
+          2025-01  + cbd_congestion_fee
+  fhv     2019-01  dispatching base, location IDs, SR_Flag
+
+Types follow the TLC Parquet releases (INTEGER ids, BIGINT counts/codes, DOUBLE amounts),
+so converted CSVs line up with downloaded Parquet months. Bump REGISTRY_VERSION whenever a
+type changes, so the conversion manifest redoes the affected files.
+
+Used by duckdb_csv_to_parquet.py (import as a sibling module).
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+REGISTRY_VERSION = 1
+DATASETS = ("yellow", "green", "fhv")
+FILE_NAME = re.compile(r"(yellow|green|fhv)_tripdata_(\d{4})-(\d{2})", re.IGNORECASE)
+
+INT = "INTEGER"
+BIGINT = "BIGINT"
+DOUBLE = "DOUBLE"
+TEXT = "VARCHAR"
+TIMESTAMP = "TIMESTAMP"
+
+_AMOUNTS = [
+    ("fare_amount", DOUBLE),
+    ("extra", DOUBLE),
+    ("mta_tax", DOUBLE),
+    ("tip_amount", DOUBLE),
+    ("tolls_amount", DOUBLE),
+]
+
+_YELLOW_2015 = [
+    ("VendorID", INT),
+    ("tpep_pickup_datetime", TIMESTAMP),
+    ("tpep_dropoff_datetime", TIMESTAMP),
+    ("passenger_count", BIGINT),
+    ("trip_distance", DOUBLE),
+    ("pickup_longitude", DOUBLE),
+    ("pickup_latitude", DOUBLE),
+    ("RatecodeID", BIGINT),
+    ("store_and_fwd_flag", TEXT),
+    ("dropoff_longitude", DOUBLE),
+    ("dropoff_latitude", DOUBLE),
+    ("payment_type", BIGINT),
+    *_AMOUNTS,
+    ("improvement_surcharge", DOUBLE),
+    ("total_amount", DOUBLE),
+]
+
+_YELLOW_2016 = [
+    ("VendorID", INT),
+    ("tpep_pickup_datetime", TIMESTAMP),
+    ("tpep_dropoff_datetime", TIMESTAMP),
+    ("passenger_count", BIGINT),
+    ("trip_distance", DOUBLE),
+    ("RatecodeID", BIGINT),
+    ("store_and_fwd_flag", TEXT),
+    ("PULocationID", INT),
+    ("DOLocationID", INT),
+    ("payment_type", BIGINT),
+    *_AMOUNTS,
+    ("improvement_surcharge", DOUBLE),
+    ("total_amount", DOUBLE),
+]
+_YELLOW_2019 = [*_YELLOW_2016, ("congestion_surcharge", DOUBLE)]
+_YELLOW_2022 = [*_YELLOW_2019, ("Airport_fee", DOUBLE)]
+
+_GREEN_2016 = [
+    ("VendorID", INT),
+    ("lpep_pickup_datetime", TIMESTAMP),
+    ("lpep_dropoff_datetime", TIMESTAMP),
+    ("store_and_fwd_flag", TEXT),
+    ("RatecodeID", BIGINT),
+    ("PULocationID", INT),
+    ("DOLocationID", INT),
+    ("passenger_count", BIGINT),
+    ("trip_distance", DOUBLE),
+    *_AMOUNTS,
+    ("ehail_fee", DOUBLE),
+    ("improvement_surcharge", DOUBLE),
+    ("total_amount", DOUBLE),
+    ("payment_type", BIGINT),
+    ("trip_type", BIGINT),
+]
+_GREEN_2019 = [*_GREEN_2016, ("congestion_surcharge", DOUBLE)]
+
+_FHV_2019 = [
+    ("dispatching_base_num", TEXT),
+    ("pickup_datetime", TIMESTAMP),
+    ("dropOff_datetime", TIMESTAMP),
+    ("PUlocationID", INT),
+    ("DOlocationID", INT),
+    ("SR_Flag", INT),
+    ("Affiliated_base_number", TEXT),
+]
+
+# dataset -> [(first month "YYYY-MM", columns)], oldest first
+REGISTRY: Dict[str, List[Tuple[str, List[Tuple[str, str]]]]] = {
+    "yellow": [
+        ("2015-01", _YELLOW_2015),
+        ("2016-07", _YELLOW_2016),
+        ("2019-01", _YELLOW_2019),
+        ("2022-01", _YELLOW_2022),
+        ("2025-01", [*_YELLOW_2022, ("cbd_congestion_fee", DOUBLE)]),
+    ],
+    "green": [
+        ("2016-07", _GREEN_2016),
+        ("2019-01", _GREEN_2019),
+        ("2025-01", [*_GREEN_2019, ("cbd_congestion_fee", DOUBLE)]),
+    ],
+    "fhv": [
+        ("2019-01", _FHV_2019),
+    ],
+}
+
+
+class TlcSchema(NamedTuple):
+    dataset: str
+    version: str                      # first month this schema applies to
+    columns: Tuple[Tuple[str, str], ...]
+
+    @property
+    def name(self) -> str:
+        return f"{self.dataset}@{self.version}"
+
+
+def versions(dataset: str) -> List[str]:
+    if dataset not in REGISTRY:
+        raise ValueError(f"Unknown TLC dataset '{dataset}' (known: {', '.join(DATASETS)})")
+    return [v for v, _ in REGISTRY[dataset]]
+
+
+def get_schema(dataset: str, version: str) -> TlcSchema:
+    """The schema registered under exactly this version."""
+    versions(dataset)
+    for v, cols in REGISTRY[dataset]:
+        if v == version:
+            return TlcSchema(dataset, v, tuple(cols))
+    raise ValueError(f"No {dataset} schema version '{version}' (known: {', '.join(versions(dataset))})")
+
+
+def resolve(dataset: str, month: str) -> Optional[TlcSchema]:
+    """Latest schema of `dataset` in effect for `month` ("YYYY-MM"); None before the first version."""
+    versions(dataset)
+    found = None
+    for v, cols in REGISTRY[dataset]:
+        if v <= month:
+            found = TlcSchema(dataset, v, tuple(cols))
+    return found
+
+
+def detect(path: Path) -> Optional[Tuple[str, str]]:
+    """(dataset, "YYYY-MM") from a TLC file name, e.g. green_tripdata_2019-03.csv."""
+    m = FILE_NAME.search(Path(path).name)
+    if not m:
+        return None
+    return m.group(1).lower(), f"{m.group(2)}-{m.group(3)}"
+
+
+def read_header(path: Path, delimiter: str = ",") -> List[str]:
+    """Column names from the first line of a CSV (no data read)."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        line = f.readline().rstrip("\r\n")
+    return [c.strip().strip('"') for c in line.split(delimiter)] if line else []
+
+
+def header_mismatch(schema: TlcSchema, header: Sequence[str]) -> Optional[str]:
+    """None when the header has the schema's columns in order (case-insensitive), else why not."""
+    expected = [c for c, _ in schema.columns]
+    if [h.lower() for h in header] == [c.lower() for c in expected]:
+        return None
+    have = {h.lower() for h in header}
+    want = {c.lower() for c in expected}
+    missing = [c for c in expected if c.lower() not in have]
+    extra = [h for h in header if h.lower() not in want]
+    if not missing and not extra:
+        return f"columns out of order for {schema.name}"
+    parts = []
+    if missing:
+        parts.append(f"missing {', '.join(missing)}")
+    if extra:
+        parts.append(f"unexpected {', '.join(extra)}")
+    return f"header doesn't match {schema.name}: {'; '.join(parts)}"
+
+
+def schema_for(path: Path, dataset: Optional[str] = None, version: Optional[str] = None) -> TlcSchema:
+    """
+    Schema for one CSV: `version` pins it; otherwise the file name's month picks it. The
+    dataset comes from `dataset` or the file name. Raises ValueError when nothing applies or
+    the header doesn't match the schema.
+    """
+    found = detect(path)
+    dataset = dataset or (found[0] if found else None)
+    if dataset is None:
+        raise ValueError(f"not a TLC file name (<dataset>_tripdata_YYYY-MM.csv): {Path(path).name}")
+    if version is not None:
+        schema = get_schema(dataset, version)
+    elif found is None:
+        raise ValueError(f"no month in file name {Path(path).name}; pass --schema-version")
+    else:
+        schema = resolve(dataset, found[1])
+        if schema is None:
+            raise ValueError(f"no {dataset} schema for {found[1]} (first: {versions(dataset)[0]})")
+    problem = header_mismatch(schema, read_header(path))
+    if problem:
+        raise ValueError(problem)
+    return schema
+
+
+def duckdb_columns(schema: TlcSchema) -> str:
+    """The read_csv(columns = {...}) struct literal for a schema."""
+    return "{" + ", ".join(f"'{name}': '{sql_type}'" for name, sql_type in schema.columns) + "}"
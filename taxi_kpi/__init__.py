@@ -0,0 +1,37 @@
+"""
+NYC taxi hour×zone KPI pipeline.
+
+The notebook (clean.ipynb) logic as an importable package: the KPIs are defined once in
+`taxi_kpi.spec` and compiled to DuckDB, Polars or Pandas.
+
+    from taxi_kpi import PipelineConfig, run_pipeline
+    df = run_pipeline(PipelineConfig(trips=["datasets/yellow_tripdata_2024-01.parquet"]), engine="duckdb")
+
+CLI:
+    python3 -m taxi_kpi build --trips datasets/yellow_tripdata_2024-01.parquet --output datasets/trips_complete.csv
+"""
+
+from .engines import ENGINES, get_engine
+from .incremental import run_incremental
+from .od import build_od, dense, load_od, write_od
+from .pipeline import PipelineConfig, run_pipeline, write_pipeline
+from .rollup import load_partials, rollup
+from .spec import AGGREGATES, COLUMN_ORDER, DERIVED
+
+__all__ = [
+    "AGGREGATES",
+    "COLUMN_ORDER",
+    "DERIVED",
+    "ENGINES",
+    "PipelineConfig",
+    "build_od",
+    "dense",
+    "get_engine",
+    "load_od",
+    "load_partials",
+    "rollup",
+    "run_incremental",
+    "run_pipeline",
+    "write_od",
+    "write_pipeline",
+]
@@ -0,0 +1,132 @@
+"""
+Vectorized cleanup of text-typed columns (the notebook's convert_to_numeric / norm).
+
+The notebook cleans one pandas column at a time: astype("string") and then five or six
+chained str.replace calls, each allocating a new column, even for columns that are
+already numeric. Here every column is handled in Arrow:
+
+  - the type is checked first: numeric, temporal and boolean columns are returned as-is
+  - one regex scan finds the values that contain anything to fix; only those values go
+    through the replacements and are scattered back, so clean columns cost one scan
+  - dictionary-encoded (categorical) columns clean their dictionary, not every row
+  - columns are processed in parallel threads (Arrow kernels release the GIL)
+
+Numeric columns: en/em dashes -> "-", thousands separators and "$" removed, whitespace
+(including non-breaking spaces) trimmed, anything that still isn't a number -> null
+(pd.to_numeric(errors="coerce")), then cast to float64.
+Text columns: en/em dashes -> "-", non-breaking spaces -> " ", literal "\\N" -> "N", trimmed.
+
+    from taxi_kpi.clean import clean_table
+    tbl = clean_table(pyarrow.csv.read_csv("export.csv"))
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from . import spec
+
+# Columns the notebook's convert_to_numeric coerces: every KPI, weather reading and derived measure
+NUMERIC_COLUMNS = (
+    *(a.name for a in spec.AGGREGATES),
+    *(out for _, out in spec.WEATHER_MEASURES),
+    *(d.name for d in spec.GRAIN_DERIVED),
+)
+
+DASHES = "[—–]"
+NBSP = "\u00a0"
+# Everything the numeric cleanup touches, and the shape of a number pd.to_numeric accepts
+NUMERIC_DIRT = f"{DASHES}|[,$]|^\\s|\\s$|{NBSP}"
+NUMBER = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$|^(?i:[+-]?(inf|infinity|nan))$"
+TEXT_DIRT = f"{DASHES}|{NBSP}|\\\\N|^\\s|\\s$"
+
+
+def _is_text(t: pa.DataType) -> bool:
+    return pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_string_view(t)
+
+
+def _fix_dirty(arr: pa.Array, dirt: str, fix) -> pa.Array:
+    # One scan for values that need work; the replacement chain only runs on those
+    mask = pc.fill_null(pc.match_substring_regex(arr, dirt), False)
+    if not pc.any(mask).as_py():
+        return arr
+    return pc.replace_with_mask(arr, mask, fix(pc.filter(arr, mask)))
+
+
+def _fix_numeric_text(arr: pa.Array) -> pa.Array:
+    arr = pc.replace_substring_regex(arr, DASHES, "-")
+    arr = pc.replace_substring_regex(arr, "[,$]", "")
+    return pc.utf8_trim(arr, f" \t\r\n\f\v{NBSP}")
+
+
+def _fix_text(arr: pa.Array) -> pa.Array:
+    arr = pc.replace_substring_regex(arr, DASHES, "-")
+    arr = pc.replace_substring(arr, NBSP, " ")
+    arr = pc.replace_substring(arr, "\\N", "N")
+    return pc.utf8_trim_whitespace(arr)
+
+
+def _map_chunks(col: pa.ChunkedArray, fn) -> pa.ChunkedArray:
+    chunks = []
+    for chunk in col.chunks:
+        if pa.types.is_dictionary(chunk.type):
+            chunk = pa.DictionaryArray.from_arrays(chunk.indices, fn(chunk.dictionary))
+        else:
+            chunk = fn(chunk)
+        chunks.append(chunk)
+    return pa.chunked_array(chunks) if chunks else col
+
+
+def _value_type(t: pa.DataType) -> pa.DataType:
+    return t.value_type if pa.types.is_dictionary(t) else t
+
+
+def to_numeric(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Text -> float64 (unparseable -> null); non-text columns are returned unchanged."""
+    if not _is_text(_value_type(col.type)):
+        return col
+    if pa.types.is_dictionary(col.type):
+        col = col.cast(col.type.value_type)
+    col = _map_chunks(col, lambda a: _fix_dirty(a, NUMERIC_DIRT, _fix_numeric_text))
+    try:
+        return pc.cast(col, pa.float64())
+    except pa.ArrowInvalid:
+        # Some values are not numbers: null them (errors="coerce") and cast the rest
+        valid = pc.match_substring_regex(col, NUMBER)
+        return pc.cast(pc.if_else(valid, col, pa.scalar(None, col.type)), pa.float64())
+
+
+def normalize_text(col: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Dashes, non-breaking spaces, "\\N" and surrounding whitespace; non-text columns unchanged."""
+    if not _is_text(_value_type(col.type)):
+        return col
+    return _map_chunks(col, lambda a: _fix_dirty(a, TEXT_DIRT, _fix_text))
+
+
+def clean_table(
+    tbl: pa.Table,
+    numeric: Optional[Iterable[str]] = None,
+    threads: Optional[int] = None,
+) -> pa.Table:
+    """
+    to_numeric() on the `numeric` columns (default NUMERIC_COLUMNS) and normalize_text() on
+    every other text column; columns run in parallel on up to `threads` threads.
+    """
+    numeric = set(NUMERIC_COLUMNS if numeric is None else numeric)
+    jobs = []
+    for i, name in enumerate(tbl.column_names):
+        if not _is_text(_value_type(tbl.schema.field(i).type)):
+            continue
+        jobs.append((i, name, to_numeric if name in numeric else normalize_text))
+    if not jobs:
+        return tbl
+
+    threads = threads or min(len(jobs), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        cleaned = list(pool.map(lambda job: job[2](tbl.column(job[0])), jobs))
+    for (i, name, _), col in zip(jobs, cleaned):
+        tbl = tbl.set_column(i, name, col)
+    return tbl
@@ -0,0 +1,384 @@
+"""
+Command line entry point for the KPI pipeline.
+
+Usage examples:
+  # One month with DuckDB (default engine) -> CSV for Tableau
+  python3 -m taxi_kpi build \
+    --trips datasets/yellow_tripdata_2024-01.parquet \
+    --output datasets/trips_complete.csv
+
+  # Several months with Polars -> Parquet
+  python3 -m taxi_kpi build \
+    --engine polars \
+    --trips "datasets/yellow_tripdata_2024-*.parquet" \
+    --output datasets/trips_complete.parquet
+
+  # Hive-partitioned, sorted Parquet dataset (year=/month=/Borough=) for pruned reads
+  python3 -m taxi_kpi build \
+    --trips datasets/ \
+    --partition-by year month Borough \
+    --output datasets/trips_complete/
+
+  # Pure pandas on a small worker: stream record batches, memory bounded by --batch-rows
+  python3 -m taxi_kpi build \
+    --engine pandas-stream --batch-rows 250000 \
+    --trips "datasets/yellow_tripdata_2024-*.parquet" \
+    --output datasets/trips_complete.csv
+
+  # Incremental: aggregate each month once, re-aggregate only new/changed months
+  python3 -m taxi_kpi build \
+    --trips datasets/ \
+    --state-dir datasets/kpi_state \
+    --output datasets/trips_complete.csv
+
+  # Fill weather for trip hours without an exact reading (nearest hour within 2h, or interpolated)
+  python3 -m taxi_kpi build \
+    --trips datasets/yellow_tripdata_2024-01.parquet \
+    --weather-join interpolate --weather-tolerance 2 \
+    --output datasets/trips_complete.csv
+
+  # Large outputs: stream straight from the engine to disk, no pandas DataFrame in between
+  python3 -m taxi_kpi build \
+    --trips datasets/ \
+    --direct \
+    --output datasets/trips_complete.csv
+
+  # Multi-year output on a small export box: categorical strings, float32 measures, narrow keys
+  python3 -m taxi_kpi build \
+    --trips datasets/ \
+    --compact \
+    --output datasets/trips_complete.parquet
+
+  # Where do time and memory go? Per-stage timings/RSS appended to a nightly history file
+  python3 -m taxi_kpi build \
+    --trips datasets/ \
+    --output datasets/trips_complete.csv \
+    --instrument reports/instrument.jsonl
+
+  # Dashboard extracts: totals by borough, trip_date, weekday×hour and overall from the same scan
+  python3 -m taxi_kpi build \
+    --trips datasets/ \
+    --output datasets/trips_complete.parquet \
+    --cube-dir datasets/cube/
+
+  # Keep mergeable partial state, then roll up to any coarser grain in milliseconds
+  python3 -m taxi_kpi build --trips datasets/ --with-partials --output datasets/trips_complete.parquet
+  python3 -m taxi_kpi rollup --input datasets/trips_complete.parquet --by Borough
+  python3 -m taxi_kpi rollup --input datasets/trips_complete.parquet --by day_of_week hour_of_day -o heatmap.csv
+
+  # One week of Manhattan pickups: row groups outside the window/zones are skipped via their stats
+  python3 -m taxi_kpi build \
+    --trips datasets/ \
+    --start 2024-01-08 --end 2024-01-15 --pickup-zones Manhattan \
+    --output datasets/trips_week2_manhattan.csv
+
+  # Origin-destination matrix (trips, revenue, distance, duration per hour×PU×DO), then slice it
+  python3 -m taxi_kpi od --trips datasets/ --grain hour --output datasets/od_hourly.parquet
+  python3 -m taxi_kpi od-slice --input datasets/od_hourly.parquet --origin 132 --destination Manhattan -o jfk_to_manhattan.csv
+
+  # Clean a text-typed export ("$1,234.50", en dashes, non-breaking spaces) back into numbers
+  python3 -m taxi_kpi clean --input export.csv --output export_clean.parquet
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from .clean import clean_table
+from .compact import report as compact_report
+from . import instrument
+from .engines import ENGINES
+from .filters import pruning_summary, resolve_zones, trip_filter
+from .incremental import run_incremental, run_incremental_cube, write_incremental
+from .inputs import resolve_inputs
+from .od import OD_GRAINS, build_od, load_od, write_od
+from .outputs import OUTPUT_FORMATS, PARTITION_KEYS, infer_format, write_cube, write_output, write_partitioned
+from .pipeline import DEFAULT_WEATHER, DEFAULT_ZONES, PipelineConfig, run_cube, run_pipeline, write_pipeline
+from .spec import CUBE_LEVELS, HOUR_ZONE_LEVEL
+from .rollup import ROLLUP_DIMENSIONS, load_partials, rollup
+from .weather import DEFAULT_WEATHER_TOLERANCE_HOURS, WEATHER_JOINS
+
+
+def add_common_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--engine", default="duckdb", choices=list(ENGINES), help="Execution engine (default: duckdb)")
+    ap.add_argument("--trips", required=True, nargs="+",
+                    help='Trip Parquet file(s), globs or directories, e.g. "datasets/yellow_tripdata_2024-*.parquet"')
+    ap.add_argument("--zones", default=DEFAULT_ZONES, help=f"Taxi zone lookup Parquet (default: {DEFAULT_ZONES})")
+    ap.add_argument("--weather", default=DEFAULT_WEATHER, help=f"Hourly weather Parquet (default: {DEFAULT_WEATHER})")
+    ap.add_argument("--weather-join", default="exact", choices=list(WEATHER_JOINS),
+                    help="Match trip hours to weather by exact hour, nearest hour (asof) or linear interpolation")
+    ap.add_argument("--weather-tolerance", type=float, default=DEFAULT_WEATHER_TOLERANCE_HOURS,
+                    help=f"asof/interpolate: max distance in hours to a weather reading (default: {DEFAULT_WEATHER_TOLERANCE_HOURS:g})")
+    ap.add_argument("--threads", type=int, default=None, help="DuckDB PRAGMA threads (default: all cores)")
+    ap.add_argument("--batch-rows", type=int, default=None,
+                    help="pandas-stream: rows per Parquet record batch (default: 1,000,000); lower = less memory")
+    add_filter_args(ap)
+
+
+def add_filter_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--start", default=None,
+                    help='Keep pickups at or after this local time, e.g. "2024-01-08" or "2024-01-08 06:00"')
+    ap.add_argument("--end", default=None, help="Keep pickups before this local time (exclusive)")
+    ap.add_argument("--pickup-zones", nargs="+", default=None, metavar="ZONE",
+                    help="Keep pickups in these PULocationIDs and/or boroughs from --zones, e.g. Manhattan 1 132")
+
+
+def config_from_args(args: argparse.Namespace) -> PipelineConfig:
+    return PipelineConfig(
+        trips=resolve_inputs(args.trips),
+        zones=args.zones,
+        weather=args.weather,
+        threads=args.threads,
+        with_partials=getattr(args, "with_partials", False),
+        compact=getattr(args, "compact", False),
+        profile=getattr(args, "profile", None),
+        batch_rows=args.batch_rows,
+        weather_join=args.weather_join,
+        weather_tolerance_hours=args.weather_tolerance,
+        start=args.start,
+        end=args.end,
+        pickup_zones=args.pickup_zones,
+    )
+
+
+def print_compact_report(report) -> None:
+    mb = 1024 * 1024
+    for r in report.itertuples(index=False):
+        print(f"  {r.column:<22} {r.default_type:>7} -> {r.compact_type:<8} "
+              f"{r.default_bytes / mb:9.2f} MB -> {r.compact_bytes / mb:8.2f} MB")
+    before, after = report["default_bytes"].sum(), report["compact_bytes"].sum()
+    print(f"✔ Compact schema saved {(before - after) / mb:.1f} MB of {before / mb:.1f} MB "
+          f"({(before - after) / max(before, 1):.0%}) in {len(report)} columns")
+
+
+def build_direct(args: argparse.Namespace, config: PipelineConfig) -> None:
+    fmt = infer_format(args.output, args.format)
+    t0 = time.time()
+    if args.state_dir:
+        rows = write_incremental(config, args.engine, args.state_dir, args.output, fmt, force=args.force)
+    else:
+        rows = write_pipeline(config, args.output, fmt, engine=args.engine)
+    mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"✔ Built and wrote {rows:,} rows: {args.output} ({mb:.1f} MB)  |  {time.time() - t0:.1f}s")
+
+
+def cmd_build(args: argparse.Namespace) -> None:
+    config = config_from_args(args)
+    print(f"→ Building with {args.engine}: {len(config.trips)} trip file(s)")
+    flt = trip_filter(config)
+    if flt:
+        kept, total = pruning_summary(config.trips, flt)
+        print(f"→ Filter: {flt.describe()}; {kept:,} of {total:,} row groups may match their statistics")
+    if not args.instrument:
+        run_build(args, config)
+        return
+    instrument.report_format(args.instrument)
+    options = {k: v for k, v in vars(args).items() if k not in ("func", "trips", "command")}
+    with instrument.recording(args.engine, trip_files=len(config.trips), cpu_count=os.cpu_count(),
+                              options=options) as rec:
+        run_build(args, config)
+    rec.write(args.instrument)
+    slowest = max(rec.stages, key=lambda st: st.seconds, default=None)
+    hint = f", slowest stage {slowest.name} {slowest.seconds:.1f}s" if slowest else ""
+    print(f"✔ Wrote instrumentation: {args.instrument} ({len(rec.stages)} stages{hint})")
+
+
+def run_build(args: argparse.Namespace, config: PipelineConfig) -> None:
+    if args.direct:
+        if args.partition_by or args.cube_dir:
+            raise ValueError("--direct writes one file; it cannot be combined with --partition-by or --cube-dir")
+        build_direct(args, config)
+        return
+    t0 = time.time()
+    tables = None
+    if args.cube_dir and args.state_dir:
+        tables = run_incremental_cube(config, args.engine, args.state_dir, force=args.force)
+    elif args.cube_dir:
+        tables = run_cube(config, engine=args.engine)
+    elif args.state_dir:
+        df = run_incremental(config, args.engine, args.state_dir, force=args.force)
+    else:
+        df = run_pipeline(config, engine=args.engine)
+    if tables is not None:
+        df = tables[HOUR_ZONE_LEVEL]
+    secs = time.time() - t0
+    print(f"✔ Built {len(df):,} rows × {df.shape[1]} cols  |  {secs:.1f}s")
+    if config.compact:
+        print_compact_report(compact_report(df))
+
+    t0 = time.time()
+    if args.partition_by:
+        with instrument.stage("write_partitioned", len(df)):
+            files = write_partitioned(df, args.output, args.partition_by, args.row_group_rows)
+        print(f"✔ Wrote: {args.output}/ ({files} partition files)  |  {time.time() - t0:.1f}s")
+    else:
+        with instrument.stage("write_output", len(df)):
+            write_output(df, args.output, args.format)
+        print(f"✔ Wrote: {args.output}  |  {time.time() - t0:.1f}s")
+
+    if tables is not None:
+        fmt = "parquet" if args.partition_by else infer_format(args.output, args.format)
+        with instrument.stage("write_cube"):
+            paths = write_cube(tables, args.cube_dir, fmt)
+        for name, path in paths.items():
+            print(f"✔ Wrote cube level: {path} ({len(tables[name]):,} rows)")
+
+
+def cmd_rollup(args: argparse.Namespace) -> None:
+    df = load_partials(args.input)
+    t0 = time.time()
+    out = rollup(df, args.by)
+    ms = (time.time() - t0) * 1000
+    print(f"✔ Rolled up {len(df):,} rows -> {len(out):,} by [{', '.join(args.by) or 'overall'}]  |  {ms:.0f} ms")
+    if args.output:
+        write_output(out, args.output, args.format)
+        print(f"✔ Wrote: {args.output}")
+    else:
+        print(out.to_string(index=False, max_rows=50))
+
+
+def cmd_od(args: argparse.Namespace) -> None:
+    config = PipelineConfig(
+        trips=resolve_inputs(args.trips),
+        zones=args.zones,
+        batch_rows=args.batch_rows,
+        start=args.start,
+        end=args.end,
+        pickup_zones=args.pickup_zones,
+    )
+    print(f"→ Building the OD matrix per {args.grain}: {len(config.trips)} trip file(s)")
+    t0 = time.time()
+    table = build_od(config, args.grain)
+    secs = time.time() - t0
+    write_od(table, args.output, args.row_group_rows)
+    mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"✔ Wrote {table.num_rows:,} OD cells: {args.output} ({mb:.1f} MB)  |  {secs:.1f}s")
+
+
+def cmd_od_slice(args: argparse.Namespace) -> None:
+    origins = resolve_zones(args.origin, args.zones) if args.origin else None
+    destinations = resolve_zones(args.destination, args.zones) if args.destination else None
+    t0 = time.time()
+    df = load_od(args.input, origins, destinations).to_pandas()
+    ms = (time.time() - t0) * 1000
+    print(f"✔ Sliced {len(df):,} OD cells  |  {ms:.0f} ms")
+    if args.output:
+        write_output(df, args.output, args.format)
+        print(f"✔ Wrote: {args.output}")
+    else:
+        print(df.to_string(index=False, max_rows=50))
+
+
+def cmd_clean(args: argparse.Namespace) -> None:
+    t0 = time.time()
+    if Path(args.input).suffix.lower() == ".csv":
+        tbl = pacsv.read_csv(args.input)
+    else:
+        tbl = pq.read_table(args.input)
+    out = clean_table(tbl, numeric=args.numeric, threads=args.threads)
+    changed = [f.name for f, g in zip(tbl.schema, out.schema) if f.type != g.type]
+    print(f"✔ Cleaned {out.num_rows:,} rows × {out.num_columns} cols  |  {time.time() - t0:.2f}s")
+    if changed:
+        print(f"  now numeric: {', '.join(changed)}")
+    write_output(out.to_pandas(), args.output, args.format)
+    print(f"✔ Wrote: {args.output}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="taxi_kpi", description="NYC taxi hour×zone KPI pipeline (DuckDB / Polars / Pandas).")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build the trips_complete KPI table")
+    add_common_args(build)
+    build.add_argument("-o", "--output", required=True,
+                       help="Output file (.csv or .parquet), or a directory with --partition-by")
+    build.add_argument("--format", choices=list(OUTPUT_FORMATS), default=None,
+                       help="Output format (default: inferred from --output suffix)")
+    build.add_argument("--partition-by", nargs="+", default=None, choices=list(PARTITION_KEYS),
+                       help="Write a Hive-partitioned Parquet dataset, e.g. --partition-by year month [Borough]")
+    build.add_argument("--row-group-rows", type=int, default=None,
+                       help="With --partition-by: rows per row group (default: 32768)")
+    build.add_argument("--state-dir", default=None,
+                       help="Incremental mode: keep per-month aggregates here and only recompute new/changed months")
+    build.add_argument("--force", action="store_true", help="With --state-dir: re-aggregate every month")
+    build.add_argument("--with-partials", action="store_true",
+                       help="Also write mergeable partial state (sums, counts, non-null counts) for `rollup`")
+    build.add_argument("--direct", action="store_true",
+                       help="Stream the result from the engine to --output (DuckDB COPY, Polars sink) without "
+                            "a pandas DataFrame; pandas engines fall back to the normal path")
+    build.add_argument("--compact", action="store_true",
+                       help="Categorical strings, float32 measures and int8/int16 keys (smaller frame and Parquet)")
+    build.add_argument("--profile", default=None, metavar="REPORT",
+                       help="Write a data-quality report of the result (.json or .parquet): duplicate "
+                            "hour_local/PULocationID keys, null rates, null clusters by hour and zone")
+    build.add_argument("--instrument", default=None, metavar="REPORT",
+                       help="Record wall time, rows in/out, peak RSS and the engine's own profile per stage "
+                            "(.json, or .jsonl to append one line per run)")
+    build.add_argument("--cube-dir", default=None,
+                       help=f"Also write small pre-aggregated tables ({', '.join(CUBE_LEVELS)}) here, from the same scan")
+    build.set_defaults(func=cmd_build)
+
+    roll = sub.add_parser("rollup", help="Re-aggregate a --with-partials output to a coarser grain")
+    roll.add_argument("--input", required=True, help="trips_complete file built with --with-partials")
+    roll.add_argument("--by", nargs="*", default=[], choices=list(ROLLUP_DIMENSIONS),
+                      help="Grouping columns (omit for overall totals)")
+    roll.add_argument("-o", "--output", default=None, help="Optional output file (.csv or .parquet); prints when omitted")
+    roll.add_argument("--format", choices=list(OUTPUT_FORMATS), default=None,
+                      help="Output format (default: inferred from --output suffix)")
+    roll.set_defaults(func=cmd_rollup)
+
+    od = sub.add_parser("od", help="Build the pickup×dropoff origin-destination matrix")
+    od.add_argument("--trips", required=True, nargs="+", help="Trip Parquet file(s), globs or directories")
+    od.add_argument("--zones", default=DEFAULT_ZONES,
+                    help=f"Taxi zone lookup Parquet, for borough names in --pickup-zones (default: {DEFAULT_ZONES})")
+    od.add_argument("--grain", default="hour", choices=list(OD_GRAINS), help="Time bucket of each cell (default: hour)")
+    od.add_argument("--batch-rows", type=int, default=None,
+                    help="Rows per Parquet record batch (default: 1,000,000); lower = less memory")
+    add_filter_args(od)
+    od.add_argument("-o", "--output", required=True, help="Output Parquet file")
+    od.add_argument("--row-group-rows", type=int, default=None,
+                    help="Rows per row group (default: 32768); smaller = finer origin slicing")
+    od.set_defaults(func=cmd_od)
+
+    od_slice = sub.add_parser("od-slice", help="Read the cells of some origin and/or destination zones from an OD file")
+    od_slice.add_argument("--input", required=True, help="OD Parquet file built with `od`")
+    od_slice.add_argument("--origin", nargs="+", default=None, metavar="ZONE",
+                          help="Pickup PULocationIDs and/or borough names")
+    od_slice.add_argument("--destination", nargs="+", default=None, metavar="ZONE",
+                          help="Dropoff DOLocationIDs and/or borough names")
+    od_slice.add_argument("--zones", default=DEFAULT_ZONES,
+                          help=f"Taxi zone lookup Parquet, for borough names (default: {DEFAULT_ZONES})")
+    od_slice.add_argument("-o", "--output", default=None,
+                          help="Optional output file (.csv or .parquet); prints when omitted")
+    od_slice.add_argument("--format", choices=list(OUTPUT_FORMATS), default=None,
+                          help="Output format (default: inferred from --output suffix)")
+    od_slice.set_defaults(func=cmd_od_slice)
+
+    clean = sub.add_parser("clean", help="Normalize text and coerce text-typed numeric columns of an export (notebook cleanup)")
+    clean.add_argument("--input", required=True, help="CSV or Parquet table, e.g. a hand-edited trips_complete export")
+    clean.add_argument("-o", "--output", required=True, help="Output file (.csv or .parquet)")
+    clean.add_argument("--format", choices=list(OUTPUT_FORMATS), default=None,
+                       help="Output format (default: inferred from --output suffix)")
+    clean.add_argument("--numeric", nargs="+", default=None,
+                       help="Columns to coerce to numbers (default: every KPI, weather and derived measure)")
+    clean.add_argument("--threads", type=int, default=None, help="Columns cleaned in parallel (default: all cores)")
+    clean.set_defaults(func=cmd_clean)
+    return ap
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"✖ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
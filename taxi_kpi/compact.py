@@ -0,0 +1,59 @@
+"""
+Compact output schema: what it costs and what it saves.
+
+With PipelineConfig(compact=True) (`build --compact`) every engine casts the columns in
+spec.COMPACT_TYPES before the frame is materialized, so the wide version never exists:
+
+  Borough, Zone, service_zone, day_of_week  -> categorical (Parquet: dictionary encoded)
+  PULocationID, hour_of_day                 -> int16, int8
+  trips                                     -> int32
+  means, ratios, weather readings           -> float32
+
+Categories are fixed (sorted zone lookup values, Monday..Sunday), so every engine returns
+the same categorical dtype. `report()` measures each compacted column against its default
+type, one column at a time.
+"""
+
+from typing import Iterable, List
+
+import pandas as pd
+
+from . import spec
+
+# Logical type name -> pandas dtype of the default (non-compact) engine output
+DEFAULT_PANDAS_DTYPES = {"string": "str"}
+
+
+def compact_types(columns: Iterable[str]) -> dict:
+    """{column: compact type} for the columns of `columns` that have one."""
+    return {c: spec.COMPACT_TYPES[c][1] for c in columns if c in spec.COMPACT_TYPES}
+
+
+def categories(values: Iterable) -> List[str]:
+    """Sorted distinct non-null values: the fixed category list of a string column."""
+    return sorted({v for v in values if isinstance(v, str)})
+
+
+def report(df: pd.DataFrame) -> pd.DataFrame:
+    """Bytes per compacted column of `df` in the default vs the compact schema."""
+    rows = []
+    for col, (default, compact) in spec.COMPACT_TYPES.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        compact_bytes = int(series.memory_usage(index=False, deep=True))
+        wide = series.astype(object) if isinstance(series.dtype, pd.CategoricalDtype) else series
+        if default.startswith("int") and series.hasnans:
+            default = "float64"   # what the engines return for an integer column with nulls
+        default_bytes = int(wide.astype(DEFAULT_PANDAS_DTYPES.get(default, default)).memory_usage(index=False, deep=True))
+        rows.append({
+            "column": col,
+            "default_type": default,
+            "compact_type": compact,
+            "default_bytes": default_bytes,
+            "compact_bytes": compact_bytes,
+            "saved_bytes": default_bytes - compact_bytes,
+        })
+    return pd.DataFrame(rows, columns=[
+        "column", "default_type", "compact_type", "default_bytes", "compact_bytes", "saved_bytes",
+    ])
@@ -0,0 +1,38 @@
+"""
+Engine registry.
+
+Each engine module exposes:
+  execute(config) -> pandas.DataFrame                     raw trips -> trips_complete
+  write_partials(config, trips, dst) -> None              raw trips -> hour×zone partials Parquet
+  execute_partials(config, partial_paths) -> DataFrame    merged partials -> trips_complete
+  execute_cube(config) / execute_partials_cube(...)       the above plus the spec.CUBE_LEVELS tables
+
+and optionally, when the engine can write its result without a pandas DataFrame:
+  write_result(config, path, fmt) -> int                  raw trips -> trips_complete file
+  write_result_partials(config, partial_paths, path, fmt) -> int
+
+Modules are imported lazily, so running with DuckDB does not require Polars to be
+installed (and vice versa).
+"""
+
+import importlib
+from types import ModuleType
+from typing import Callable
+
+ENGINES = {
+    "duckdb": "duckdb_engine",
+    "polars": "polars_engine",
+    "pandas": "pandas_engine",
+    "pandas-stream": "pandas_stream_engine",
+}
+
+
+def get_engine_module(name: str) -> ModuleType:
+    key = name.lower()
+    if key not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}'. Choose one of: {', '.join(ENGINES)}")
+    return importlib.import_module(f".{ENGINES[key]}", __name__)
+
+
+def get_engine(name: str) -> Callable:
+    return get_engine_module(name).execute
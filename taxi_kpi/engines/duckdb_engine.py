@@ -0,0 +1,556 @@
+"""
+DuckDB engine: compiles the KPI spec to SQL.
+
+Disk-backed and out-of-core, so this is the safe default for large months on small machines.
+"""
+
+import json
+from typing import Dict, List, Optional, Sequence
+
+import duckdb
+import pandas as pd
+import pyarrow.compute as pc
+
+from .. import instrument, spec
+from ..compact import compact_types
+from ..filters import TripFilter, trip_filter
+from ..instrument import input_rows, stage
+from ..quality import KEY, OVERALL, build_report, null_name, write_report
+from ..weather import BACKWARD_PREFIX, FORWARD_PREFIX, MATCH_HOUR, hourly_series
+
+
+def sql_quote(s: str) -> str:
+    return s.replace("'", "''")
+
+
+def sql_list(paths: Sequence[str]) -> str:
+    return "[" + ", ".join(f"'{sql_quote(p)}'" for p in paths) + "]"
+
+
+def partial_sql(p: spec.Partial) -> str:
+    if p.kind == "rows":
+        expr = "COUNT(*)"
+    elif p.kind == "sum":
+        # SUM over only NULLs is NULL in SQL; 0 matches Polars/Pandas and keeps partials summable
+        expr = f"CAST(COALESCE(SUM({p.column}), 0) AS DOUBLE)"
+    elif p.kind == "count":
+        expr = f"COUNT({p.column})"
+    else:
+        raise ValueError(f"Unknown partial kind: {p.kind}")
+    return f"{expr} AS {p.name}"
+
+
+def aggregate_sql(a: spec.Aggregate) -> str:
+    # Finalize a KPI from the partial columns of trips_partials
+    if a.kind == "count":
+        expr = spec.ROWS_PARTIAL
+    elif a.kind == "sum":
+        expr = f"CASE WHEN {spec.count_name(a.column)} > 0 THEN {spec.sum_name(a.column)} END"
+    elif a.kind == "mean":
+        expr = f"{spec.sum_name(a.column)} / NULLIF({spec.count_name(a.column)}, 0)"
+    elif a.kind == "ratio":
+        expr = f"COALESCE({spec.sum_name(a.column)} / NULLIF({spec.sum_name(a.denominator)}, 0), 0)"
+    else:
+        raise ValueError(f"Unknown aggregate kind: {a.kind}")
+    return f"{expr} AS {a.name}"
+
+
+def derived_sql(d: spec.Derived) -> str:
+    if d.kind == "trip_date":
+        expr = f"date_trunc('day', {d.column})"
+    elif d.kind == "hour_of_day":
+        expr = f"CAST(EXTRACT(HOUR FROM {d.column}) AS INTEGER)"
+    elif d.kind == "day_of_week":
+        expr = f"STRFTIME({d.column}, '%A')"
+    elif d.kind == "scale":
+        expr = f"{d.column} * {d.factor!r}"
+    elif d.kind == "divide":
+        expr = f"CASE WHEN {d.other} > 0 THEN {d.column} / {d.other} ELSE NULL END"
+    else:
+        raise ValueError(f"Unknown derived kind: {d.kind}")
+    return f"{expr} AS {d.name}"
+
+
+def filter_sql(flt: TripFilter) -> str:
+    """TripFilter on the raw columns, so DuckDB prunes row groups on their min/max statistics."""
+    conds = [f"{spec.PICKUP} IS NOT NULL", f"{spec.DROPOFF} IS NOT NULL", f"{spec.ZONE_KEY} IS NOT NULL"]
+    if flt.start is not None:
+        conds.append(f"{spec.PICKUP} >= TIMESTAMP '{flt.start}'")
+    if flt.end is not None:
+        conds.append(f"{spec.PICKUP} < TIMESTAMP '{flt.end}'")
+    if flt.zones is not None:
+        conds.append(f"{spec.ZONE_KEY} IN ({', '.join(map(str, flt.zones))})")
+    return "\n        AND ".join(conds)
+
+
+def trips_partials_sql(trips: Sequence[str], flt: TripFilter = TripFilter()) -> str:
+    partials = ",\n      ".join(partial_sql(p) for p in spec.PARTIALS)
+    cols = ", ".join(
+        f"CAST({c} AS TIMESTAMP) AS {c}" if c in (spec.PICKUP, spec.DROPOFF) else c
+        for c in spec.TRIP_COLUMNS
+    )
+    return f"""
+    WITH raw_trips AS (
+      SELECT
+        *,
+        EXTRACT(EPOCH FROM ({spec.DROPOFF} - {spec.PICKUP})) AS trip_seconds
+      FROM (
+        SELECT {cols}
+        FROM read_parquet({sql_list(trips)}, union_by_name = true)
+        WHERE {filter_sql(flt)}
+      )
+    ),
+    trip_features AS (
+      SELECT
+        *,
+        trip_seconds / 60.0 AS {spec.TRIP_MINUTES},
+        CASE WHEN trip_seconds > 0 THEN ({spec.DISTANCE} * 3600.0) / trip_seconds END AS {spec.SPEED_MPH}
+      FROM raw_trips
+    )
+    SELECT
+      date_trunc('hour', {spec.PICKUP}) AS {spec.HOUR_KEY},
+      CAST({spec.ZONE_KEY} AS INTEGER) AS {spec.ZONE_KEY},
+      {partials}
+    FROM trip_features
+    GROUP BY 1, 2
+    """
+
+
+def merged_partials_sql(partial_paths: Sequence[str]) -> str:
+    keys = ", ".join(spec.GROUP_KEYS)
+    # SUM(BIGINT) widens to HUGEINT; cast back so counts stay integers
+    sums = ",\n      ".join(
+        f"CAST(SUM({p.name}) AS {'DOUBLE' if p.kind == 'sum' else 'BIGINT'}) AS {p.name}" for p in spec.PARTIALS
+    )
+    return f"""
+    SELECT
+      {keys},
+      {sums}
+    FROM read_parquet({sql_list(partial_paths)}, union_by_name = true)
+    GROUP BY {keys}
+    """
+
+
+def trips_hour_zone_sql(with_partials: bool = False) -> str:
+    cols = [aggregate_sql(a) for a in spec.AGGREGATES]
+    if with_partials:
+        cols.extend(p.name for p in spec.PARTIALS)
+    aggs = ",\n      ".join(cols)
+    return f"""
+    SELECT
+      {", ".join(spec.GROUP_KEYS)},
+      {aggs}
+    FROM trips_partials
+    """
+
+
+def taxi_zone_sql(zones: str) -> str:
+    cols = ", ".join(spec.ZONE_COLUMNS)
+    return f"""
+    SELECT CAST({spec.ZONE_SOURCE_KEY} AS INTEGER) AS {spec.ZONE_KEY}, {cols}
+    FROM read_parquet('{sql_quote(zones)}')
+    """
+
+
+def weather_series_sql(weather: str) -> str:
+    # Sorted, one row per hour; built from year/month/day/hour once and cached (taxi_kpi.weather)
+    return f"SELECT * FROM read_parquet('{sql_quote(hourly_series(weather))}')"
+
+
+def weather_sql(join: str = "exact", tolerance_hours: float = 0.0) -> str:
+    """Weather per trip hour from the weather_series table (exact, asof or interpolate)."""
+    if join == "exact":
+        return "SELECT * FROM weather_series"
+
+    measures = [out for _, out in spec.WEATHER_MEASURES]
+    cond = spec.WEATHER_CONDITION[1]
+    b, f = BACKWARD_PREFIX, FORWARD_PREFIX
+    sides = ",\n        ".join(
+        f"{alias}.{col} AS {prefix}{col}"
+        for alias, prefix in (("b", b), ("f", f))
+        for col in (MATCH_HOUR, *measures, cond)
+    )
+
+    def nearest(col: str) -> str:
+        return f"CASE WHEN use_b THEN {b}{col} WHEN f_ok THEN {f}{col} END"
+
+    cols = []
+    for col in measures:
+        expr = nearest(col)
+        if join == "interpolate":
+            expr = (
+                f"CASE WHEN b_ok AND f_ok AND b_gap + f_gap > 0 "
+                f"THEN {b}{col} + ({f}{col} - {b}{col}) * b_gap / (b_gap + f_gap) ELSE {expr} END"
+            )
+        cols.append(f"{expr} AS {col}")
+    cols.append(f"{nearest(cond)} AS {cond}")
+    cols_sql = ",\n      ".join(cols)
+    return f"""
+    WITH hours AS (
+      SELECT DISTINCT {spec.HOUR_KEY} FROM trips_hour_zone
+    ),
+    series AS (
+      SELECT {spec.HOUR_KEY} AS {MATCH_HOUR}, * EXCLUDE ({spec.HOUR_KEY}) FROM weather_series
+    ),
+    matched AS (
+      SELECT
+        h.{spec.HOUR_KEY},
+        {sides}
+      FROM hours h
+      ASOF LEFT JOIN series b ON h.{spec.HOUR_KEY} >= b.{MATCH_HOUR}
+      ASOF LEFT JOIN series f ON h.{spec.HOUR_KEY} <= f.{MATCH_HOUR}
+    ),
+    gaps AS (
+      SELECT
+        *,
+        epoch({spec.HOUR_KEY}) - epoch({b}{MATCH_HOUR}) AS b_gap,
+        epoch({f}{MATCH_HOUR}) - epoch({spec.HOUR_KEY}) AS f_gap
+      FROM matched
+    ),
+    sides AS (
+      SELECT
+        *,
+        COALESCE(b_gap <= {float(tolerance_hours) * 3600.0!r}, false) AS b_ok,
+        COALESCE(f_gap <= {float(tolerance_hours) * 3600.0!r}, false) AS f_ok
+      FROM gaps
+    )
+    SELECT
+      {spec.HOUR_KEY},
+      {cols_sql}
+    FROM (SELECT *, b_ok AND (NOT f_ok OR b_gap <= f_gap) AS use_b FROM sides)
+    """
+
+
+COMPACT_SQL_TYPES = {"int8": "TINYINT", "int16": "SMALLINT", "int32": "INTEGER", "float32": "FLOAT"}
+
+
+def enum_type(column: str) -> str:
+    return f"{column}_enum"
+
+
+def enum_types_sql(columns: Sequence[str]) -> List[str]:
+    """CREATE TYPE statements for the categorical columns (fixed, sorted categories)."""
+    stmts = []
+    for col in columns:
+        if col in spec.ZONE_COLUMNS:
+            values = f"SELECT DISTINCT {col} FROM taxi_zone WHERE {col} IS NOT NULL ORDER BY 1"
+        elif col == "day_of_week":
+            values = ", ".join(f"'{d}'" for d in spec.DAY_NAMES)
+        else:
+            raise ValueError(f"No categories defined for {col}")
+        stmts.append(f"CREATE TYPE {enum_type(col)} AS ENUM ({values});")
+    return stmts
+
+
+def compact_select_sql(columns: Sequence[str]) -> str:
+    types = compact_types(columns)
+    cols = []
+    for name in columns:
+        kind = types.get(name)
+        if kind is None:
+            cols.append(name)
+        else:
+            sql_type = enum_type(name) if kind == "category" else COMPACT_SQL_TYPES[kind]
+            cols.append(f"CAST({name} AS {sql_type}) AS {name}")
+    return ",\n      ".join(cols)
+
+
+def final_sql(with_partials: bool = False, compact: bool = False) -> str:
+    # Column order is applied here, so no reordering copy is needed afterwards
+    derived = {d.name: derived_sql(d) for d in spec.DERIVED}
+    select = []
+    for name in spec.output_columns(with_partials):
+        if name in derived:
+            select.append(derived[name])
+        elif name in spec.ZONE_COLUMNS:
+            select.append(f"z.{name}")
+        elif name in spec.WEATHER_COLUMNS:
+            select.append(f"w.{name}")
+        else:
+            select.append(f"t.{name}")
+    select_sql = ",\n      ".join(select)
+    joined = f"""
+    SELECT
+      {select_sql}
+    FROM trips_hour_zone t
+    LEFT JOIN weather w USING ({spec.HOUR_KEY})
+    LEFT JOIN taxi_zone z USING ({spec.ZONE_KEY})
+    """
+    if not compact:
+        return f"{joined}ORDER BY t.{spec.HOUR_KEY}, t.{spec.ZONE_KEY}\n"
+    # Cast in the same query, so the wide columns are never handed to pandas
+    return f"""
+    SELECT
+      {compact_select_sql(spec.output_columns(with_partials))}
+    FROM ({joined})
+    ORDER BY {", ".join(spec.GROUP_KEYS)}
+    """
+
+
+def cube_dimensions(levels: Dict[str, Sequence[str]]) -> list:
+    used = {c for dims in levels.values() for c in dims}
+    return [c for c in spec.CUBE_DIMENSIONS if c in used]
+
+
+def grouping_id(dims: Sequence[str], level: Sequence[str]) -> int:
+    # GROUPING_ID(d0, ..., dn): bit set for every column the level does *not* group by, d0 = MSB
+    n = len(dims)
+    return sum(1 << (n - 1 - i) for i, c in enumerate(dims) if c not in level)
+
+
+def cube_sql(levels: Dict[str, Sequence[str]], with_partials: bool = False) -> str:
+    """All cube levels in one GROUP BY GROUPING SETS pass over trips_partials."""
+    dims = cube_dimensions(levels)
+    time_parts = {d.name: derived_sql(d) for d in spec.DERIVED if d.name in dims}
+    base_cols = [f"z.{c}" if c in spec.ZONE_COLUMNS else time_parts[c] for c in dims]
+    sets = ", ".join("(" + ", ".join(level) + ")" for level in levels.values())
+    sums = ",\n      ".join(
+        f"CAST(SUM({p.name}) AS {'DOUBLE' if p.kind == 'sum' else 'BIGINT'}) AS {p.name}" for p in spec.PARTIALS
+    )
+    kpis = [aggregate_sql(a) for a in spec.AGGREGATES]
+    if with_partials:
+        kpis.extend(p.name for p in spec.PARTIALS)
+    kpis_sql = ",\n      ".join(kpis)
+    derived = ",\n      ".join(derived_sql(d) for d in spec.GRAIN_DERIVED)
+    dims_sql = ", ".join(dims)
+    return f"""
+    WITH base AS (
+      SELECT p.*, {", ".join(base_cols)}
+      FROM trips_partials p
+      LEFT JOIN taxi_zone z USING ({spec.ZONE_KEY})
+    ),
+    sets AS (
+      SELECT
+        GROUPING_ID({dims_sql}) AS level_id,
+        {dims_sql},
+        {sums}
+      FROM base
+      GROUP BY GROUPING SETS ({sets})
+    ),
+    kpis AS (
+      SELECT
+        level_id,
+        {dims_sql},
+        {kpis_sql}
+      FROM sets
+    )
+    SELECT
+      *,
+      {derived}
+    FROM kpis
+    """
+
+
+def cube(con: duckdb.DuckDBPyConnection, config, levels: Dict[str, Sequence[str]] = spec.CUBE_LEVELS) -> Dict[str, pd.DataFrame]:
+    """One table per cube level (needs trips_partials and taxi_zone, i.e. after finish())."""
+    dims = cube_dimensions(levels)
+    # Arrow keeps the integer dims integral (other levels leave them NULL in the combined result)
+    with stage("cube") as st:
+        tbl = con.execute(cube_sql(levels, config.with_partials)).fetch_arrow_table()
+        st.native = native_profile(con)
+        st.rows_out = tbl.num_rows
+    out = {}
+    for name, level in levels.items():
+        part = tbl.filter(pc.equal(tbl["level_id"], grouping_id(dims, level)))
+        if level:
+            part = part.sort_by([(c, "ascending") for c in level], null_placement="at_end")
+        out[name] = part.select(spec.level_columns(level, config.with_partials)).to_pandas()
+    return out
+
+
+def connect(config) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect(database=":memory:")
+    if config.threads:
+        con.execute(f"PRAGMA threads={int(config.threads)};")
+    if instrument.active():
+        # Keep per-statement operator profiles (EXPLAIN ANALYZE data) for the instrumentation report
+        con.execute("SET enable_profiling = 'no_output';")
+    return con
+
+
+def native_profile(con: duckdb.DuckDBPyConnection):
+    """Operator tree of the last statement, when instrumenting (see connect())."""
+    if not instrument.active():
+        return None
+    return json.loads(con.get_profiling_information(format="json"))
+
+
+def create_table(con: duckdb.DuckDBPyConnection, name: str, sql: str, rows_in: Optional[int] = None) -> None:
+    """CREATE OR REPLACE TABLE name AS sql, recorded as an instrumentation stage."""
+    with stage(name, rows_in) as st:
+        con.execute(f"CREATE OR REPLACE TABLE {name} AS {sql};")
+        st.native = native_profile(con)
+    if instrument.active():
+        st.rows_out = con.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+
+
+def load_trips(con: duckdb.DuckDBPyConnection, trips: Sequence[str], flt: TripFilter = TripFilter()) -> None:
+    """Raw scan + hour×zone aggregation into trips_partials."""
+    create_table(con, "trips_partials", trips_partials_sql(trips, flt), input_rows(trips))
+
+
+def load_partials(con: duckdb.DuckDBPyConnection, partial_paths: Sequence[str]) -> None:
+    """Merge materialized monthly partials into trips_partials."""
+    create_table(con, "trips_partials", merged_partials_sql(partial_paths), input_rows(partial_paths))
+
+
+def prepare(con: duckdb.DuckDBPyConnection, config) -> str:
+    """Tables behind the final query (needs trips_partials); returns the final SELECT."""
+    create_table(con, "trips_hour_zone", trips_hour_zone_sql(config.with_partials))
+    create_table(con, "taxi_zone", taxi_zone_sql(config.zones))
+    create_table(con, "weather_series", weather_series_sql(config.weather))
+    create_table(con, "weather", weather_sql(config.weather_join, config.weather_tolerance_hours))
+    if config.compact:
+        for stmt in enum_types_sql([c for c, kind in compact_types(spec.COLUMN_ORDER).items() if kind == "category"]):
+            con.execute(stmt)
+    return final_sql(config.with_partials, config.compact)
+
+
+def profile_sql(columns: Sequence[str], table: str = "trips_complete") -> str:
+    """taxi_kpi.quality grouping sets in one GROUP BY GROUPING SETS pass over `table`."""
+    hour, zone = spec.GROUP_KEYS
+    hour_text = f"strftime({hour}, '%Y-%m-%d %H:%M:%S')"
+    nulls = ",\n      ".join(f"COUNT(*) - COUNT({c}) AS {null_name(c)}" for c in columns)
+    # GROUPING_ID(hour, zone): bit 1 = hour rolled up, bit 0 = zone rolled up
+    return f"""
+    SELECT * EXCLUDE (gid) FROM (
+      SELECT
+        GROUPING_ID({hour}, {zone}) AS gid,
+        CASE GROUPING_ID({hour}, {zone})
+          WHEN 0 THEN '{KEY}' WHEN 1 THEN '{hour}' WHEN 2 THEN '{zone}' ELSE '{OVERALL}'
+        END AS dimension,
+        CASE GROUPING_ID({hour}, {zone})
+          WHEN 0 THEN {hour_text} || '|' || CAST({zone} AS VARCHAR)
+          WHEN 1 THEN {hour_text}
+          WHEN 2 THEN CAST({zone} AS VARCHAR)
+          ELSE ''
+        END AS value,
+        COUNT(*) AS rows,
+        {nulls}
+      FROM {table}
+      GROUP BY GROUPING SETS (({hour}, {zone}), ({hour}), ({zone}), ())
+    )
+    WHERE gid <> 0 OR rows > 1
+    ORDER BY gid DESC, dimension, value
+    """
+
+
+def profiled(con: duckdb.DuckDBPyConnection, config, query: str) -> str:
+    """
+    Materialize the result once when it is profiled (config.profile) or instrumented, so the
+    joins and the pandas/file conversion are separate stages; returns a query that reads it back.
+    """
+    if not (config.profile or instrument.active()):
+        return query
+    create_table(con, "trips_complete", query)
+    if config.profile:
+        columns = spec.output_columns(config.with_partials)
+        with stage("quality_profile") as st:
+            groups = con.execute(profile_sql(columns)).df()
+            st.native = native_profile(con)
+            write_report(build_report(groups, columns), config.profile)
+    return "SELECT * FROM trips_complete"
+
+
+def finish(con: duckdb.DuckDBPyConnection, config) -> pd.DataFrame:
+    """trips_partials -> KPIs -> zone/weather joins -> derived columns."""
+    query = profiled(con, config, prepare(con, config))
+    with stage("to_pandas") as st:
+        df = con.execute(query).df()
+        st.rows_out = len(df)
+    return df
+
+
+def csv_select_sql(con: duckdb.DuckDBPyConnection, query: str) -> str:
+    """Format the result like outputs.write_output's CSV (%.6f floats, '%Y-%m-%d %H:%M:%S' timestamps)."""
+    cols = []
+    for name, sql_type, *_ in con.execute(f"DESCRIBE {query}").fetchall():
+        if sql_type in ("DOUBLE", "FLOAT"):
+            cols.append(f"printf('%.6f', {name}) AS {name}")
+        elif sql_type.startswith("TIMESTAMP") or sql_type == "DATE":
+            cols.append(f"strftime({name}, '%Y-%m-%d %H:%M:%S') AS {name}")
+        else:
+            cols.append(name)
+    return ", ".join(cols)
+
+
+def copy_result(con: duckdb.DuckDBPyConnection, query: str, path: str, fmt: str) -> int:
+    """COPY the (ordered) final query straight to disk; returns the row count."""
+    if fmt == "csv":
+        select = f"SELECT {csv_select_sql(con, query)} FROM ({query})"
+        options = "FORMAT CSV, HEADER true, QUOTE '\"', ESCAPE '\"', NULLSTR ''"
+    else:
+        select = query
+        options = "FORMAT PARQUET, COMPRESSION ZSTD, COMPRESSION_LEVEL 12"
+    with stage("copy_to_file") as st:
+        st.rows_out = con.execute(f"COPY ({select}) TO '{sql_quote(path)}' ({options});").fetchone()[0]
+        st.native = native_profile(con)
+    return st.rows_out
+
+
+def execute(config) -> pd.DataFrame:
+    con = connect(config)
+    try:
+        load_trips(con, config.trips, trip_filter(config))
+        return finish(con, config)
+    finally:
+        con.close()
+
+
+def execute_cube(config) -> Dict[str, pd.DataFrame]:
+    """hour×zone table plus every spec.CUBE_LEVELS table from one scan of the raw trips."""
+    con = connect(config)
+    try:
+        load_trips(con, config.trips, trip_filter(config))
+        return {spec.HOUR_ZONE_LEVEL: finish(con, config), **cube(con, config)}
+    finally:
+        con.close()
+
+
+def write_result(config, path: str, fmt: str) -> int:
+    """Raw trips -> trips_complete file without a pandas round trip; returns the row count."""
+    con = connect(config)
+    try:
+        load_trips(con, config.trips, trip_filter(config))
+        return copy_result(con, profiled(con, config, prepare(con, config)), path, fmt)
+    finally:
+        con.close()
+
+
+def write_partials(config, trips: Sequence[str], dst: str) -> None:
+    con = connect(config)
+    try:
+        with stage("write_partials", input_rows(trips)) as st:
+            st.rows_out = con.execute(
+                f"COPY ({trips_partials_sql(trips, trip_filter(config))}) TO '{sql_quote(dst)}' (FORMAT PARQUET, COMPRESSION ZSTD);"
+            ).fetchone()[0]
+            st.native = native_profile(con)
+    finally:
+        con.close()
+
+
+def execute_partials(config, partial_paths: Sequence[str]) -> pd.DataFrame:
+    con = connect(config)
+    try:
+        load_partials(con, partial_paths)
+        return finish(con, config)
+    finally:
+        con.close()
+
+
+def write_result_partials(config, partial_paths: Sequence[str], path: str, fmt: str) -> int:
+    con = connect(config)
+    try:
+        load_partials(con, partial_paths)
+        return copy_result(con, profiled(con, config, prepare(con, config)), path, fmt)
+    finally:
+        con.close()
+
+
+def execute_partials_cube(config, partial_paths: Sequence[str]) -> Dict[str, pd.DataFrame]:
+    con = connect(config)
+    try:
+        load_partials(con, partial_paths)
+        return {spec.HOUR_ZONE_LEVEL: finish(con, config), **cube(con, config)}
+    finally:
+        con.close()
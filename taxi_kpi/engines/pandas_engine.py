@@ -0,0 +1,271 @@
+"""
+Pandas engine: compiles the KPI spec to named aggregations.
+
+Everything is loaded in memory; only the columns in spec.TRIP_COLUMNS are read.
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .. import spec
+from ..compact import categories, compact_types
+from ..filters import TripFilter, trip_filter
+from ..instrument import input_rows, stage
+from ..quality import build_report, profile_frame, write_report
+from ..weather import BACKWARD_PREFIX, FORWARD_PREFIX, MATCH_HOUR, hourly_series
+
+
+def read_trips(trips: Sequence[str], flt: TripFilter = TripFilter()) -> pd.DataFrame:
+    # pyarrow applies `filters` per row group, skipping those its statistics rule out
+    filters = flt.arrow_filters()
+    frames = [pd.read_parquet(path, columns=list(spec.TRIP_COLUMNS), filters=filters) for path in trips]
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    return df.dropna(subset=[spec.PICKUP, spec.DROPOFF, spec.ZONE_KEY])
+
+
+def add_trip_features(df: pd.DataFrame) -> pd.DataFrame:
+    pickup = df[spec.PICKUP].astype("datetime64[us]")
+    dropoff = df[spec.DROPOFF].astype("datetime64[us]")
+    trip_seconds = (dropoff - pickup).dt.total_seconds()
+    return df.assign(**{
+        spec.HOUR_KEY: pickup.dt.floor("h"),
+        spec.ZONE_KEY: df[spec.ZONE_KEY].astype("int32"),
+        spec.TRIP_MINUTES: trip_seconds / 60.0,
+        spec.SPEED_MPH: np.where(trip_seconds > 0, df[spec.DISTANCE] * 3600.0 / trip_seconds, np.nan),
+    })
+
+
+def trips_partials(df: pd.DataFrame) -> pd.DataFrame:
+    named = {}
+    for p in spec.PARTIALS:
+        if p.kind == "rows":
+            named[p.name] = (spec.PICKUP, "size")
+        elif p.kind in ("sum", "count"):
+            named[p.name] = (p.column, p.kind)
+        else:
+            raise ValueError(f"Unknown partial kind: {p.kind}")
+    agg = df.groupby(list(spec.GROUP_KEYS), sort=False).agg(**named).reset_index()
+    return agg.astype({p.name: "float64" if p.kind == "sum" else "int64" for p in spec.PARTIALS})
+
+
+def merged_partials(partial_paths: Sequence[str]) -> pd.DataFrame:
+    frames = [pd.read_parquet(path, columns=spec.PARTIAL_COLUMNS) for path in partial_paths]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return df.groupby(list(spec.GROUP_KEYS), sort=False).sum().reset_index()
+
+
+def finalize(partials: pd.DataFrame, keys: Sequence[str] = spec.GROUP_KEYS) -> pd.DataFrame:
+    """Turn (merged) partial columns into the spec.AGGREGATES KPIs, keeping `keys`."""
+    out = partials[list(keys)].copy()
+    for a in spec.AGGREGATES:
+        if a.kind == "count":
+            out[a.name] = partials[spec.ROWS_PARTIAL]
+        elif a.kind == "sum":
+            n = partials[spec.count_name(a.column)]
+            out[a.name] = partials[spec.sum_name(a.column)].where(n > 0)
+        elif a.kind == "mean":
+            n = partials[spec.count_name(a.column)]
+            out[a.name] = partials[spec.sum_name(a.column)] / n.where(n > 0)
+        elif a.kind == "ratio":
+            num, den = partials[spec.sum_name(a.column)], partials[spec.sum_name(a.denominator)]
+            out[a.name] = np.where(den.to_numpy() != 0, num / den.where(den != 0), 0.0)
+        else:
+            raise ValueError(f"Unknown aggregate kind: {a.kind}")
+    return out
+
+
+def trips_hour_zone(partials: pd.DataFrame, with_partials: bool = False) -> pd.DataFrame:
+    out = finalize(partials)
+    if with_partials:
+        for p in spec.PARTIALS:
+            out[p.name] = partials[p.name]
+    return out
+
+
+def add_derived(df: pd.DataFrame, derived: Sequence[spec.Derived] = spec.DERIVED) -> pd.DataFrame:
+    for d in derived:
+        col = df[d.column]
+        if d.kind == "trip_date":
+            df[d.name] = col.dt.floor("D")
+        elif d.kind == "hour_of_day":
+            df[d.name] = col.dt.hour.astype("int32")
+        elif d.kind == "day_of_week":
+            df[d.name] = col.dt.day_name()
+        elif d.kind == "scale":
+            df[d.name] = col * d.factor
+        elif d.kind == "divide":
+            other = df[d.other]
+            df[d.name] = np.where(other.to_numpy() > 0, col / other.where(other > 0), np.nan)
+        else:
+            raise ValueError(f"Unknown derived kind: {d.kind}")
+    return df
+
+
+def taxi_zone(zones: str) -> pd.DataFrame:
+    df = pd.read_parquet(zones, columns=[spec.ZONE_SOURCE_KEY, *spec.ZONE_COLUMNS])
+    df = df.rename(columns={spec.ZONE_SOURCE_KEY: spec.ZONE_KEY})
+    df[spec.ZONE_KEY] = pd.to_numeric(df[spec.ZONE_KEY], errors="coerce").astype("Int64")
+    return df.dropna(subset=[spec.ZONE_KEY]).astype({spec.ZONE_KEY: "int32"})
+
+
+def weather_series(weather_path: str) -> pd.DataFrame:
+    # Sorted, one row per hour; built from year/month/day/hour once and cached (taxi_kpi.weather)
+    return pd.read_parquet(hourly_series(weather_path))
+
+
+def weather(weather_path: str, hours: pd.Series, join: str = "exact", tolerance_hours: float = 0.0) -> pd.DataFrame:
+    """Weather per trip hour: exact match, or as-of/interpolated from the nearest hours within tolerance."""
+    series = weather_series(weather_path)
+    if join == "exact":
+        return series
+
+    measures = [out for _, out in spec.WEATHER_MEASURES]
+    cond = spec.WEATHER_CONDITION[1]
+    b, f = BACKWARD_PREFIX, FORWARD_PREFIX
+    renamed = series.rename(columns={spec.HOUR_KEY: MATCH_HOUR})
+
+    out = pd.DataFrame({spec.HOUR_KEY: np.sort(hours.unique())})
+    for prefix, direction in ((b, "backward"), (f, "forward")):
+        out = pd.merge_asof(
+            out, renamed.add_prefix(prefix),
+            left_on=spec.HOUR_KEY, right_on=prefix + MATCH_HOUR, direction=direction,
+        )
+
+    tol = float(tolerance_hours) * 3600.0
+    b_gap = (out[spec.HOUR_KEY] - out[b + MATCH_HOUR]).dt.total_seconds().to_numpy()
+    f_gap = (out[f + MATCH_HOUR] - out[spec.HOUR_KEY]).dt.total_seconds().to_numpy()
+    with np.errstate(invalid="ignore"):
+        b_ok = b_gap <= tol
+        f_ok = f_gap <= tol
+        use_b = b_ok & (~f_ok | (b_gap <= f_gap))
+
+    def nearest(col: str) -> pd.Series:
+        picked = out[b + col].where(use_b, out[f + col])
+        return picked.where(use_b | f_ok)
+
+    result = pd.DataFrame({spec.HOUR_KEY: out[spec.HOUR_KEY]})
+    for col in measures:
+        values = nearest(col)
+        if join == "interpolate":
+            gap = b_gap + f_gap
+            both = b_ok & f_ok & (gap > 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                lerp = out[b + col] + (out[f + col] - out[b + col]) * (b_gap / gap)
+            values = lerp.where(both, values)
+        result[col] = values
+    result[cond] = nearest(cond)
+    return result
+
+
+def compact_dtypes(columns: Sequence[str], zones: pd.DataFrame) -> Dict[str, object]:
+    """astype() mapping to the spec.COMPACT_TYPES schema; strings get fixed categories."""
+    dtypes = {}
+    for col, kind in compact_types(columns).items():
+        if kind != "category":
+            dtypes[col] = kind
+        elif col in spec.ZONE_COLUMNS:
+            dtypes[col] = pd.CategoricalDtype(categories(zones[col]), ordered=True)
+        elif col == "day_of_week":
+            dtypes[col] = pd.CategoricalDtype(list(spec.DAY_NAMES), ordered=True)
+        else:
+            raise ValueError(f"No categories defined for {col}")
+    return dtypes
+
+
+def scan_partials(trips: Sequence[str], flt: TripFilter = TripFilter()) -> pd.DataFrame:
+    """Raw trips -> hour×zone partial state (read, per-trip features, aggregation)."""
+    with stage("read_trips", input_rows(trips)) as st:
+        df = read_trips(trips, flt)
+        st.rows_out = len(df)
+    with stage("trip_features", len(df)):
+        df = add_trip_features(df)
+    with stage("aggregate", len(df)) as st:
+        partials = trips_partials(df)
+        st.rows_out = len(partials)
+    return partials
+
+
+def load_partials(partial_paths: Sequence[str]) -> pd.DataFrame:
+    with stage("merge_partials", input_rows(partial_paths)) as st:
+        partials = merged_partials(partial_paths)
+        st.rows_out = len(partials)
+    return partials
+
+
+def finish(partials: pd.DataFrame, config) -> pd.DataFrame:
+    """trips_partials -> KPIs -> zone/weather joins -> derived columns."""
+    with stage("trips_hour_zone", len(partials)) as st:
+        trips = trips_hour_zone(partials, config.with_partials)
+        st.rows_out = len(trips)
+    with stage("joins", len(trips)) as st:
+        zones = taxi_zone(config.zones)
+        if config.compact:
+            # Cast the lookup before the merge, so the zone strings are never repeated per row
+            zones = zones.astype(compact_dtypes(spec.ZONE_COLUMNS, zones))
+        df = (
+            trips
+            .merge(weather(config.weather, trips[spec.HOUR_KEY], config.weather_join, config.weather_tolerance_hours),
+                   on=spec.HOUR_KEY, how="left")
+            .merge(zones, on=spec.ZONE_KEY, how="left")
+            .sort_values(list(spec.GROUP_KEYS), ignore_index=True)
+        )
+        st.rows_out = len(df)
+    with stage("derived", len(df)) as st:
+        df = add_derived(df)[spec.output_columns(config.with_partials)]
+        if config.compact:
+            df = df.astype(compact_dtypes(df.columns, zones))
+        st.rows_out = len(df)
+    if config.profile:
+        with stage("quality_profile", len(df)):
+            write_report(build_report(profile_frame(df), list(df.columns)), config.profile)
+    return df
+
+
+def cube(partials: pd.DataFrame, config, levels: Dict[str, Sequence[str]] = spec.CUBE_LEVELS) -> Dict[str, pd.DataFrame]:
+    """One table per cube level, each a groupby-sum of the shared partial state."""
+    used = {c for dims in levels.values() for c in dims}
+    with stage("cube", len(partials)) as st:
+        base = partials.merge(taxi_zone(config.zones), on=spec.ZONE_KEY, how="left")
+        base = add_derived(base, [d for d in spec.DERIVED if d.name in used])
+        names = [p.name for p in spec.PARTIALS]
+        out = {}
+        for name, level in levels.items():
+            level = list(level)
+            if level:
+                merged = base.groupby(level, sort=True, dropna=False, observed=True)[names].sum().reset_index()
+            else:
+                merged = base[names].sum().to_frame().T.astype(base[names].dtypes.to_dict())
+            df = finalize(merged, level)
+            if config.with_partials:
+                for p in spec.PARTIALS:
+                    df[p.name] = merged[p.name]
+            out[name] = add_derived(df, spec.GRAIN_DERIVED)[spec.level_columns(level, config.with_partials)]
+        st.rows_out = sum(len(df) for df in out.values())
+    return out
+
+
+def execute(config) -> pd.DataFrame:
+    return finish(scan_partials(config.trips, trip_filter(config)), config)
+
+
+def execute_cube(config) -> Dict[str, pd.DataFrame]:
+    """hour×zone table plus every spec.CUBE_LEVELS table from one scan of the raw trips."""
+    partials = scan_partials(config.trips, trip_filter(config))
+    return {spec.HOUR_ZONE_LEVEL: finish(partials, config), **cube(partials, config)}
+
+
+def write_partials(config, trips: Sequence[str], dst: str) -> None:
+    partials = scan_partials(trips, trip_filter(config))
+    with stage("write_partials", len(partials)):
+        partials.to_parquet(dst, engine="pyarrow", index=False, compression="zstd")
+
+
+def execute_partials(config, partial_paths: Sequence[str]) -> pd.DataFrame:
+    return finish(load_partials(partial_paths), config)
+
+
+def execute_partials_cube(config, partial_paths: Sequence[str]) -> Dict[str, pd.DataFrame]:
+    partials = load_partials(partial_paths)
+    return {spec.HOUR_ZONE_LEVEL: finish(partials, config), **cube(partials, config)}
@@ -0,0 +1,110 @@
+"""
+Streaming Pandas engine: out-of-core variant of pandas_engine.
+
+Trips are read as Parquet record batches (only spec.TRIP_COLUMNS), each batch is
+aggregated into hour×zone partial state and the partials are merged by summing.
+Peak memory is one batch plus the merged partials (bounded by the number of distinct
+hour×zone keys), independent of how many rows or months are fed in.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .. import spec
+from ..filters import TripFilter, row_groups, trip_filter
+from ..instrument import input_rows, stage
+from .pandas_engine import add_trip_features, cube, finish, load_partials, trips_partials
+
+DEFAULT_BATCH_ROWS = 1_000_000
+# Pending batch partials are merged once they outgrow both this and the merged state,
+# which keeps memory at a small multiple of the result with amortized-linear merge cost
+MIN_COMPACT_ROWS = 250_000
+
+
+def iter_trip_batches(trips: Sequence[str], batch_rows: int, flt: TripFilter = TripFilter()):
+    # One reader per row group: a single whole-file iter_batches() keeps growing its
+    # read buffers, per-row-group readers release them as they go. Row groups whose
+    # statistics rule out the filter are never read.
+    columns = list(spec.TRIP_COLUMNS)
+    for path in trips:
+        pf = pq.ParquetFile(path)
+        for rg in row_groups(path, flt):
+            for batch in pf.iter_batches(batch_size=batch_rows, row_groups=[rg], columns=columns):
+                yield batch.to_pandas()
+
+
+def _compact(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return df.groupby(list(spec.GROUP_KEYS), sort=False).sum().reset_index()
+
+
+def empty_partials() -> pd.DataFrame:
+    """Zero-row partials with the dtypes a real batch produces (datetime hour_local, int32 zone, ...)."""
+    trips = pd.DataFrame({
+        c: pd.Series(dtype="datetime64[us]" if c in (spec.PICKUP, spec.DROPOFF) else "float64")
+        for c in spec.TRIP_COLUMNS
+    })
+    return trips_partials(add_trip_features(trips))
+
+
+def stream_partials(trips: Sequence[str], batch_rows: Optional[int] = None,
+                    flt: TripFilter = TripFilter()) -> pd.DataFrame:
+    batch_rows = batch_rows or DEFAULT_BATCH_ROWS
+    merged: Optional[pd.DataFrame] = None
+    pending: List[pd.DataFrame] = []
+    pending_rows = 0
+
+    for df in iter_trip_batches(trips, batch_rows, flt):
+        df = df.dropna(subset=[spec.PICKUP, spec.DROPOFF, spec.ZONE_KEY])
+        if flt:
+            df = df[flt.mask(df)]
+        if df.empty:
+            continue
+        part = trips_partials(add_trip_features(df))
+        del df
+        pending.append(part)
+        pending_rows += len(part)
+        if pending_rows >= max(MIN_COMPACT_ROWS, 0 if merged is None else len(merged)):
+            merged = _compact(pending if merged is None else [merged, *pending])
+            pending, pending_rows = [], 0
+
+    if pending:
+        merged = _compact(pending if merged is None else [merged, *pending])
+    if merged is None:
+        # Nothing survived cleaning/filtering: still hand finish() correctly typed columns
+        return empty_partials()
+    return merged
+
+
+def scan_partials(trips: Sequence[str], batch_rows: Optional[int] = None,
+                  flt: TripFilter = TripFilter()) -> pd.DataFrame:
+    with stage("stream_partials", input_rows(trips)) as st:
+        partials = stream_partials(trips, batch_rows, flt)
+        st.rows_out = len(partials)
+    return partials
+
+
+def execute(config) -> pd.DataFrame:
+    return finish(scan_partials(config.trips, config.batch_rows, trip_filter(config)), config)
+
+
+def execute_cube(config) -> Dict[str, pd.DataFrame]:
+    partials = scan_partials(config.trips, config.batch_rows, trip_filter(config))
+    return {spec.HOUR_ZONE_LEVEL: finish(partials, config), **cube(partials, config)}
+
+
+def write_partials(config, trips: Sequence[str], dst: str) -> None:
+    partials = scan_partials(trips, config.batch_rows, trip_filter(config))
+    with stage("write_partials", len(partials)):
+        partials.to_parquet(dst, engine="pyarrow", index=False, compression="zstd")
+
+
+def execute_partials(config, partial_paths: Sequence[str]) -> pd.DataFrame:
+    return finish(load_partials(partial_paths), config)
+
+
+def execute_partials_cube(config, partial_paths: Sequence[str]) -> Dict[str, pd.DataFrame]:
+    partials = load_partials(partial_paths)
+    return {spec.HOUR_ZONE_LEVEL: finish(partials, config), **cube(partials, config)}
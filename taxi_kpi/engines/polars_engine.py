@@ -0,0 +1,374 @@
+"""
+Polars engine: compiles the KPI spec to lazy expressions.
+
+Fastest when the working set fits in RAM; projection/predicate pushdown keeps the scan narrow.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+import polars as pl
+
+from .. import instrument, spec
+from ..compact import categories, compact_types
+from ..filters import TripFilter, trip_filter
+from ..instrument import input_rows, stage
+from ..quality import KEY, OVERALL, build_report, null_name, write_report
+from ..weather import BACKWARD_PREFIX, FORWARD_PREFIX, MATCH_HOUR, hourly_series
+
+
+def partial_expr(p: spec.Partial) -> pl.Expr:
+    if p.kind == "rows":
+        expr = pl.len()
+    elif p.kind == "sum":
+        expr = pl.col(p.column).sum()
+    elif p.kind == "count":
+        expr = pl.col(p.column).count()
+    else:
+        raise ValueError(f"Unknown partial kind: {p.kind}")
+    dtype = pl.Float64 if p.kind == "sum" else pl.Int64
+    return expr.cast(dtype).alias(p.name)
+
+
+def aggregate_expr(a: spec.Aggregate) -> pl.Expr:
+    # Finalize a KPI from the partial columns
+    if a.kind == "count":
+        expr = pl.col(spec.ROWS_PARTIAL)
+    elif a.kind == "sum":
+        expr = pl.when(pl.col(spec.count_name(a.column)) > 0).then(pl.col(spec.sum_name(a.column)))
+    elif a.kind == "mean":
+        n = pl.col(spec.count_name(a.column))
+        expr = pl.when(n > 0).then(pl.col(spec.sum_name(a.column)) / n)
+    elif a.kind == "ratio":
+        den = pl.col(spec.sum_name(a.denominator))
+        expr = pl.when(den != 0).then(pl.col(spec.sum_name(a.column)) / den).otherwise(0.0)
+    else:
+        raise ValueError(f"Unknown aggregate kind: {a.kind}")
+    return expr.alias(a.name)
+
+
+def derived_expr(d: spec.Derived) -> pl.Expr:
+    col = pl.col(d.column)
+    if d.kind == "trip_date":
+        expr = col.dt.truncate("1d")
+    elif d.kind == "hour_of_day":
+        expr = col.dt.hour().cast(pl.Int32)
+    elif d.kind == "day_of_week":
+        expr = col.dt.strftime("%A")
+    elif d.kind == "scale":
+        expr = col * d.factor
+    elif d.kind == "divide":
+        expr = pl.when(pl.col(d.other) > 0).then(col / pl.col(d.other)).otherwise(None)
+    else:
+        raise ValueError(f"Unknown derived kind: {d.kind}")
+    return expr.alias(d.name)
+
+
+def filter_expr(flt: TripFilter) -> Optional[pl.Expr]:
+    """TripFilter on the raw columns (before any cast), so scan_parquet prunes row groups on their statistics."""
+    conds = []
+    if flt.start is not None:
+        conds.append(pl.col(spec.PICKUP) >= flt.start.to_pydatetime())
+    if flt.end is not None:
+        conds.append(pl.col(spec.PICKUP) < flt.end.to_pydatetime())
+    if flt.zones is not None:
+        conds.append(pl.col(spec.ZONE_KEY).is_in(list(flt.zones)))
+    return pl.all_horizontal(conds) if conds else None
+
+
+def scan_trips(trips: Sequence[str], flt: TripFilter = TripFilter()) -> pl.LazyFrame:
+    # Project + cast per file so months with drifting dtypes/time units concatenate cleanly
+    pushed = filter_expr(flt)
+    frames = []
+    for path in trips:
+        lf = pl.scan_parquet(path)
+        if pushed is not None:
+            lf = lf.filter(pushed)
+        frames.append(lf.select([
+            pl.col(spec.PICKUP).cast(pl.Datetime("us")),
+            pl.col(spec.DROPOFF).cast(pl.Datetime("us")),
+            pl.col(spec.ZONE_KEY).cast(pl.Int32),
+            *(pl.col(c).cast(pl.Float64) for c in (spec.FARE, spec.TIP, spec.TOTAL, spec.DISTANCE)),
+        ]))
+    return pl.concat(frames, how="vertical")
+
+
+def trips_partials(trips: Sequence[str], flt: TripFilter = TripFilter()) -> pl.LazyFrame:
+    trip_seconds = (pl.col(spec.DROPOFF) - pl.col(spec.PICKUP)).dt.total_microseconds() / 1_000_000
+    return (
+        scan_trips(trips, flt)
+        .filter(
+            pl.col(spec.PICKUP).is_not_null()
+            & pl.col(spec.DROPOFF).is_not_null()
+            & pl.col(spec.ZONE_KEY).is_not_null()
+        )
+        .with_columns([
+            pl.col(spec.PICKUP).dt.truncate("1h").alias(spec.HOUR_KEY),
+            (trip_seconds / 60.0).alias(spec.TRIP_MINUTES),
+            pl.when(trip_seconds > 0)
+              .then(pl.col(spec.DISTANCE) * 3600.0 / trip_seconds)
+              .otherwise(None)
+              .alias(spec.SPEED_MPH),
+        ])
+        .group_by(list(spec.GROUP_KEYS))
+        .agg([partial_expr(p) for p in spec.PARTIALS])
+    )
+
+
+def merged_partials(partial_paths: Sequence[str]) -> pl.LazyFrame:
+    return (
+        pl.concat([pl.scan_parquet(path).select(spec.PARTIAL_COLUMNS) for path in partial_paths], how="vertical_relaxed")
+        .group_by(list(spec.GROUP_KEYS))
+        .agg([pl.col(p.name).sum() for p in spec.PARTIALS])
+    )
+
+
+def trips_hour_zone(partials: pl.LazyFrame, with_partials: bool = False) -> pl.LazyFrame:
+    keep = [p.name for p in spec.PARTIALS] if with_partials else []
+    return partials.select([*spec.GROUP_KEYS, *(aggregate_expr(a) for a in spec.AGGREGATES), *keep])
+
+
+def taxi_zone(zones: str) -> pl.LazyFrame:
+    return pl.scan_parquet(zones).select([
+        pl.col(spec.ZONE_SOURCE_KEY).cast(pl.Int32).alias(spec.ZONE_KEY),
+        *spec.ZONE_COLUMNS,
+    ])
+
+
+def weather_series(weather_path: str) -> pl.LazyFrame:
+    # Sorted, one row per hour; built from year/month/day/hour once and cached (taxi_kpi.weather)
+    return pl.scan_parquet(hourly_series(weather_path))
+
+
+def weather(weather_path: str, hours: pl.LazyFrame, join: str = "exact", tolerance_hours: float = 0.0) -> pl.LazyFrame:
+    """Weather per trip hour: exact match, or as-of/interpolated from the nearest hours within tolerance."""
+    series = weather_series(weather_path)
+    if join == "exact":
+        return series
+
+    measures = [out for _, out in spec.WEATHER_MEASURES]
+    cond = spec.WEATHER_CONDITION[1]
+    b, f = BACKWARD_PREFIX, FORWARD_PREFIX
+
+    def side(prefix: str) -> pl.LazyFrame:
+        return series.select([
+            pl.col(spec.HOUR_KEY).alias(prefix + MATCH_HOUR),
+            *(pl.col(c).alias(prefix + c) for c in (*measures, cond)),
+        ]).sort(prefix + MATCH_HOUR)
+
+    tol = float(tolerance_hours) * 3600.0
+    b_gap = (pl.col(spec.HOUR_KEY) - pl.col(b + MATCH_HOUR)).dt.total_microseconds() / 1e6
+    f_gap = (pl.col(f + MATCH_HOUR) - pl.col(spec.HOUR_KEY)).dt.total_microseconds() / 1e6
+    b_ok = (pl.col("b_gap") <= tol).fill_null(False)
+    f_ok = (pl.col("f_gap") <= tol).fill_null(False)
+    use_b = b_ok & (~f_ok | (pl.col("b_gap") <= pl.col("f_gap")))
+
+    def nearest(col: str) -> pl.Expr:
+        return pl.when(use_b).then(pl.col(b + col)).when(f_ok).then(pl.col(f + col)).otherwise(None)
+
+    cols = []
+    for col in measures:
+        expr = nearest(col)
+        if join == "interpolate":
+            gap = pl.col("b_gap") + pl.col("f_gap")
+            expr = (
+                pl.when(b_ok & f_ok & (gap > 0))
+                .then(pl.col(b + col) + (pl.col(f + col) - pl.col(b + col)) * pl.col("b_gap") / gap)
+                .otherwise(expr)
+            )
+        cols.append(expr.alias(col))
+    cols.append(nearest(cond).alias(cond))
+
+    return (
+        hours.select(spec.HOUR_KEY).unique().sort(spec.HOUR_KEY)
+        .join_asof(side(b), left_on=spec.HOUR_KEY, right_on=b + MATCH_HOUR, strategy="backward")
+        .join_asof(side(f), left_on=spec.HOUR_KEY, right_on=f + MATCH_HOUR, strategy="forward")
+        .with_columns([b_gap.alias("b_gap"), f_gap.alias("f_gap")])
+        .select([spec.HOUR_KEY, *cols])
+    )
+
+
+COMPACT_DTYPES = {"int8": pl.Int8, "int16": pl.Int16, "int32": pl.Int32, "float32": pl.Float32}
+
+
+def compact_exprs(columns: Sequence[str], zones: str) -> List[pl.Expr]:
+    """Casts to the spec.COMPACT_TYPES schema; strings become Enums with fixed categories."""
+    types = compact_types(columns)
+    cats = [c for c, kind in types.items() if kind == "category" and c in spec.ZONE_COLUMNS]
+    lookup = taxi_zone(zones).select(cats).collect() if cats else None
+    exprs = []
+    for col, kind in types.items():
+        if kind != "category":
+            dtype = COMPACT_DTYPES[kind]
+        elif col in spec.ZONE_COLUMNS:
+            dtype = pl.Enum(categories(lookup[col].to_list()))
+        elif col == "day_of_week":
+            dtype = pl.Enum(list(spec.DAY_NAMES))
+        else:
+            raise ValueError(f"No categories defined for {col}")
+        exprs.append(pl.col(col).cast(dtype))
+    return exprs
+
+
+def result(partials: pl.LazyFrame, config) -> pl.LazyFrame:
+    """trips_partials -> KPIs -> zone/weather joins -> derived columns, in output order."""
+    trips = trips_hour_zone(partials, config.with_partials)
+    columns = spec.output_columns(config.with_partials)
+    out = (
+        trips
+        .join(weather(config.weather, trips, config.weather_join, config.weather_tolerance_hours),
+              on=spec.HOUR_KEY, how="left")
+        .join(taxi_zone(config.zones), on=spec.ZONE_KEY, how="left")
+        .with_columns([derived_expr(d) for d in spec.DERIVED])
+        .sort(list(spec.GROUP_KEYS))
+        .select(columns)
+    )
+    if config.compact:
+        out = out.with_columns(compact_exprs(columns, config.zones))
+    return out
+
+
+def profile_groups(df: pl.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    """taxi_kpi.quality grouping sets of the collected result, all evaluated in one collect_all."""
+    hour, zone = spec.GROUP_KEYS
+    hour_text = pl.col(hour).dt.strftime("%Y-%m-%d %H:%M:%S")
+    aggs = [pl.len().alias("rows"), *(pl.col(c).null_count().alias(null_name(c)) for c in columns)]
+    out = [pl.col("dimension"), pl.col("value"), pl.col("rows").cast(pl.Int64),
+           *(pl.col(null_name(c)).cast(pl.Int64) for c in columns)]
+    lf = df.lazy()
+    plans = [
+        lf.select(aggs).with_columns(pl.lit(OVERALL).alias("dimension"), pl.lit("").alias("value")),
+        lf.group_by(hour).agg(aggs).with_columns(pl.lit(hour).alias("dimension"), hour_text.alias("value")),
+        lf.group_by(zone).agg(aggs).with_columns(pl.lit(zone).alias("dimension"), pl.col(zone).cast(pl.String).alias("value")),
+        lf.group_by([hour, zone]).agg(aggs).filter(pl.col("rows") > 1).with_columns(
+            pl.lit(KEY).alias("dimension"),
+            pl.concat_str([hour_text, pl.col(zone).cast(pl.String)], separator="|").alias("value"),
+        ),
+    ]
+    return pl.concat([p.select(out) for p in pl.collect_all(plans)]).to_pandas()
+
+
+def collect(lf: pl.LazyFrame, name: str, rows_in: Optional[int] = None) -> pl.DataFrame:
+    """collect() as an instrumentation stage, with Polars' own node timings (or plan) attached."""
+    native = None
+    if instrument.active():
+        native = {"plan": lf.explain()}
+    with stage(name, rows_in) as st:
+        if native is not None and hasattr(pl.LazyFrame, "profile"):
+            df, timings = lf.profile()
+            native["profile"] = timings.to_dicts()
+        else:
+            df = lf.collect()
+        st.native = native
+        st.rows_out = df.height
+    return df
+
+
+def profiled(out: pl.LazyFrame, config, rows_in: Optional[int] = None) -> pl.LazyFrame:
+    """
+    Collect the result once when it is profiled (config.profile) or instrumented, so the query
+    and the pandas/file conversion are separate stages; hands it back as a lazy frame.
+    """
+    if not (config.profile or instrument.active()):
+        return out
+    df = collect(out, "query", rows_in)
+    if config.profile:
+        columns = spec.output_columns(config.with_partials)
+        with stage("quality_profile"):
+            write_report(build_report(profile_groups(df, columns), columns), config.profile)
+    return df.lazy()
+
+
+def finish(partials: pl.LazyFrame, config, rows_in: Optional[int] = None) -> pd.DataFrame:
+    df = profiled(result(partials, config), config, rows_in).collect()
+    with stage("to_pandas") as st:
+        out = df.to_pandas()
+        st.rows_out = len(out)
+    return out
+
+
+def sink_result(out: pl.LazyFrame, path: str, fmt: str) -> int:
+    """
+    Write the result without a pandas round trip, in outputs.write_output's CSV layout
+    (float_precision can round the sixth decimal differently from pandas' "%.6f").
+    """
+    with stage("sink_to_file") as st:
+        if fmt == "csv":
+            out.sink_csv(path, float_precision=6, datetime_format="%Y-%m-%d %H:%M:%S", null_value="")
+        else:
+            out.sink_parquet(path, compression="zstd", compression_level=12)
+        st.rows_out = written_rows(path, fmt)
+    return st.rows_out
+
+
+def written_rows(path: str, fmt: str) -> int:
+    # Sinks do not report a row count: Parquet has it in the footer, CSV rows are one line each
+    if fmt == "parquet":
+        return pl.scan_parquet(path).select(pl.len()).collect().item()
+    lines = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 24), b""):
+            lines += chunk.count(b"\n")
+    return lines - 1
+
+
+def cube(partials: pl.LazyFrame, config, levels: Dict[str, Sequence[str]] = spec.CUBE_LEVELS) -> Dict[str, pd.DataFrame]:
+    """One table per cube level; the levels share one base plan and are collected together."""
+    used = {c for dims in levels.values() for c in dims}
+    base = (
+        partials
+        .join(taxi_zone(config.zones), on=spec.ZONE_KEY, how="left")
+        .with_columns([derived_expr(d) for d in spec.DERIVED if d.name in used])
+    )
+    keep = [p.name for p in spec.PARTIALS] if config.with_partials else []
+    sums = [pl.col(p.name).sum() for p in spec.PARTIALS]
+    plans = []
+    for level in levels.values():
+        level = list(level)
+        grouped = base.group_by(level).agg(sums).sort(level, nulls_last=True) if level else base.select(sums)
+        plans.append(
+            grouped
+            .select([*level, *(aggregate_expr(a) for a in spec.AGGREGATES), *keep])
+            .with_columns([derived_expr(d) for d in spec.GRAIN_DERIVED])
+            .select(spec.level_columns(level, config.with_partials))
+        )
+    with stage("cube") as st:
+        tables = {name: df.to_pandas() for name, df in zip(levels, pl.collect_all(plans))}
+        st.rows_out = sum(len(df) for df in tables.values())
+    return tables
+
+
+def execute(config) -> pd.DataFrame:
+    return finish(trips_partials(config.trips, trip_filter(config)), config, input_rows(config.trips))
+
+
+def execute_cube(config) -> Dict[str, pd.DataFrame]:
+    """hour×zone table plus every spec.CUBE_LEVELS table from one scan of the raw trips."""
+    partials = collect(trips_partials(config.trips, trip_filter(config)), "scan_aggregate", input_rows(config.trips)).lazy()
+    return {spec.HOUR_ZONE_LEVEL: finish(partials, config), **cube(partials, config)}
+
+
+def write_result(config, path: str, fmt: str) -> int:
+    """Raw trips -> trips_complete file without a pandas round trip; returns the row count."""
+    out = profiled(result(trips_partials(config.trips, trip_filter(config)), config), config, input_rows(config.trips))
+    return sink_result(out, path, fmt)
+
+
+def write_partials(config, trips: Sequence[str], dst: str) -> None:
+    df = collect(trips_partials(trips, trip_filter(config)), "scan_aggregate", input_rows(trips))
+    with stage("write_partials", df.height):
+        df.write_parquet(dst, compression="zstd")
+
+
+def execute_partials(config, partial_paths: Sequence[str]) -> pd.DataFrame:
+    return finish(merged_partials(partial_paths), config, input_rows(partial_paths))
+
+
+def write_result_partials(config, partial_paths: Sequence[str], path: str, fmt: str) -> int:
+    out = profiled(result(merged_partials(partial_paths), config), config, input_rows(partial_paths))
+    return sink_result(out, path, fmt)
+
+
+def execute_partials_cube(config, partial_paths: Sequence[str]) -> Dict[str, pd.DataFrame]:
+    partials = collect(merged_partials(partial_paths), "merge_partials", input_rows(partial_paths)).lazy()
+    return {spec.HOUR_ZONE_LEVEL: finish(partials, config), **cube(partials, config)}
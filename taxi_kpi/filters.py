@@ -0,0 +1,175 @@
+"""
+Pickup-time window and pickup-zone filter, pushed down to the Parquet scan.
+
+PipelineConfig.start / end / pickup_zones restrict the trips that are aggregated:
+  start         first pickup time kept (inclusive), e.g. "2024-01-08" or "2024-01-08 06:00"
+  end           pickup time where the window stops (exclusive)
+  pickup_zones  PULocationIDs and/or borough names from the zone lookup ("Manhattan", 132)
+
+Every engine compiles the same TripFilter to its own predicate and applies it in the scan,
+before the null-key filter and the hour×zone aggregation: DuckDB and Polars push it into
+read_parquet / scan_parquet, pandas passes it as pyarrow `filters=`, and pandas-stream skips
+row groups with `row_groups()`. All of them prune on the footer's min/max statistics, so row
+groups outside the window or zones are never decoded, and the stray rows TLC months carry
+(pickups years outside the file's month) no longer reach hour_local.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from . import spec
+
+
+def parse_time(value, name: str) -> Optional[pd.Timestamp]:
+    """--start/--end value -> naive Timestamp (TLC pickup times are naive local time)."""
+    if value is None or value == "":
+        return None
+    try:
+        ts = pd.Timestamp(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid {name} time {value!r}: {e}") from None
+    if ts is pd.NaT:
+        raise ValueError(f"Invalid {name} time {value!r}")
+    if ts.tzinfo is not None:
+        raise ValueError(f"{name} must be a local time without a UTC offset, got {value!r}")
+    return ts
+
+
+def resolve_zones(values: Sequence, zones_path: str) -> Tuple[int, ...]:
+    """Zone IDs and borough names -> sorted PULocationIDs (names are looked up in the zone table)."""
+    ids, boroughs = set(), []
+    for v in values:
+        text = str(v).strip()
+        if text.isdigit():
+            ids.add(int(text))
+        else:
+            boroughs.append(text)
+    if boroughs:
+        lookup = pq.read_table(zones_path, columns=[spec.ZONE_SOURCE_KEY, "Borough"]).to_pandas()
+        names = lookup["Borough"].astype("string").str.lower()
+        for borough in boroughs:
+            match = lookup.loc[names == borough.lower(), spec.ZONE_SOURCE_KEY]
+            if match.empty:
+                known = sorted(lookup["Borough"].dropna().astype(str).unique())
+                raise ValueError(f"Unknown borough {borough!r}. Known: {', '.join(known)}")
+            ids.update(int(z) for z in pd.to_numeric(match, errors="coerce").dropna())
+    return tuple(sorted(ids))
+
+
+@dataclass(frozen=True)
+class TripFilter:
+    start: Optional[pd.Timestamp] = None
+    end: Optional[pd.Timestamp] = None
+    zones: Optional[Tuple[int, ...]] = None
+
+    def __bool__(self) -> bool:
+        return self.start is not None or self.end is not None or self.zones is not None
+
+    def key(self) -> Optional[str]:
+        """Stable text form (None when unfiltered); part of the incremental state fingerprint."""
+        if not self:
+            return None
+        zones = "*" if self.zones is None else ",".join(map(str, self.zones))
+        return f"{self.start}|{self.end}|{zones}"
+
+    def describe(self) -> str:
+        parts = []
+        if self.start is not None or self.end is not None:
+            parts.append(f"pickup in [{self.start or '-inf'}, {self.end or '+inf'})")
+        if self.zones is not None:
+            parts.append(f"{len(self.zones)} pickup zone(s)")
+        return ", ".join(parts) or "none"
+
+    def arrow_filters(self) -> Optional[List[tuple]]:
+        """pyarrow/pandas read_parquet `filters=` (one AND-ed conjunction)."""
+        if not self:
+            return None
+        out = []
+        if self.start is not None:
+            out.append((spec.PICKUP, ">=", self.start))
+        if self.end is not None:
+            out.append((spec.PICKUP, "<", self.end))
+        if self.zones is not None:
+            out.append((spec.ZONE_KEY, "in", list(self.zones)))
+        return out
+
+    def mask(self, df: pd.DataFrame) -> pd.Series:
+        """Rows of a raw-trips frame inside the filter."""
+        keep = pd.Series(True, index=df.index)
+        if self.start is not None:
+            keep &= df[spec.PICKUP] >= self.start
+        if self.end is not None:
+            keep &= df[spec.PICKUP] < self.end
+        if self.zones is not None:
+            keep &= df[spec.ZONE_KEY].isin(self.zones)
+        return keep
+
+    def may_match(self, pickup_min, pickup_max, zone_min, zone_max) -> bool:
+        """False only when min/max statistics prove a row group has no matching row (None = unknown)."""
+        try:
+            if pickup_min is not None and pickup_max is not None:
+                if self.start is not None and pd.Timestamp(pickup_max) < self.start:
+                    return False
+                if self.end is not None and pd.Timestamp(pickup_min) >= self.end:
+                    return False
+            if self.zones is not None and zone_min is not None and zone_max is not None:
+                if not any(zone_min <= z <= zone_max for z in self.zones):
+                    return False
+        except (TypeError, ValueError):
+            # Statistics of an unexpected type (e.g. tz-aware or raw ints): keep the row group
+            return True
+        return True
+
+
+def trip_filter(config) -> TripFilter:
+    """TripFilter of a PipelineConfig (pickup_zones are resolved to IDs in PipelineConfig)."""
+    zones = config.pickup_zones
+    return TripFilter(
+        start=parse_time(config.start, "start"),
+        end=parse_time(config.end, "end"),
+        zones=None if zones is None else tuple(zones),
+    )
+
+
+def check_filter(flt: TripFilter) -> None:
+    if flt.start is not None and flt.end is not None and flt.start >= flt.end:
+        raise ValueError(f"start ({flt.start}) must be before end ({flt.end})")
+    if flt.zones is not None and not flt.zones:
+        raise ValueError("pickup zone filter matches no zones")
+
+
+def _column_stats(rg, index: int):
+    if index < 0:
+        return None, None
+    stats = rg.column(index).statistics
+    if stats is None or not stats.has_min_max:
+        return None, None
+    return stats.min, stats.max
+
+
+def row_groups(path: str, flt: TripFilter) -> List[int]:
+    """Row groups of `path` whose footer statistics may hold rows inside `flt`."""
+    md = pq.ParquetFile(path).metadata
+    if not flt:
+        return list(range(md.num_row_groups))
+    schema = md.schema.to_arrow_schema()
+    pickup_idx = schema.get_field_index(spec.PICKUP)
+    zone_idx = schema.get_field_index(spec.ZONE_KEY)
+    keep = []
+    for i in range(md.num_row_groups):
+        rg = md.row_group(i)
+        if flt.may_match(*_column_stats(rg, pickup_idx), *_column_stats(rg, zone_idx)):
+            keep.append(i)
+    return keep
+
+
+def pruning_summary(trips: Sequence[str], flt: TripFilter) -> Tuple[int, int]:
+    """(row groups that may match, total row groups) over all trip files; footers only."""
+    kept = total = 0
+    for path in trips:
+        total += pq.ParquetFile(path).metadata.num_row_groups
+        kept += len(row_groups(path, flt))
+    return kept, total
@@ -0,0 +1,159 @@
+"""
+Incremental multi-month builds.
+
+Each source trip file (one TLC month) is aggregated once into hour×zone partial state
+(spec.PARTIALS) under <state-dir>/months/. A manifest records a fingerprint of every
+input; on the next run only months whose fingerprint changed (or that are new) are
+re-aggregated. The monthly partials are then merged, finalized and rejoined with zones
+and weather, which only touches the small aggregate files.
+
+Fingerprint = file size + mtime + Parquet footer facts (row count, row groups and the
+per-row-group min/max pickup time) + the spec/state version + the pickup window/zone
+filter (taxi_kpi.filters), since filtered months hold different partials.
+
+State layout:
+  <state-dir>/manifest.json
+  <state-dir>/months/<source stem>-<path hash>.parquet
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from . import spec
+from .engines import get_engine_module
+from .filters import trip_filter
+from .outputs import write_output
+
+MANIFEST_NAME = "manifest.json"
+MONTHS_DIR = "months"
+
+
+def spec_fingerprint() -> str:
+    payload = repr((spec.STATE_VERSION, spec.TRIP_COLUMNS, spec.GROUP_KEYS, spec.PARTIALS))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _stat_value(value):
+    # Footer statistics come back as datetime/int/float; keep them JSON friendly
+    return None if value is None else str(value)
+
+
+def fingerprint(path: str, trip_filter_key: Optional[str] = None) -> dict:
+    st = os.stat(path)
+    md = pq.ParquetFile(path).metadata
+    pickup_idx = md.schema.to_arrow_schema().get_field_index(spec.PICKUP)
+
+    row_groups = []
+    for i in range(md.num_row_groups):
+        rg = md.row_group(i)
+        entry = {"rows": rg.num_rows}
+        if pickup_idx >= 0:
+            stats = rg.column(pickup_idx).statistics
+            if stats is not None and stats.has_min_max:
+                entry["min"] = _stat_value(stats.min)
+                entry["max"] = _stat_value(stats.max)
+        row_groups.append(entry)
+
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "num_rows": md.num_rows,
+        "row_groups": row_groups,
+        "spec": spec_fingerprint(),
+        "filter": trip_filter_key,
+    }
+
+
+def partial_name(path: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return f"{Path(path).stem}-{digest}.parquet"
+
+
+def load_manifest(state_dir: Path) -> Dict[str, dict]:
+    path = state_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("inputs", {})
+
+
+def save_manifest(state_dir: Path, inputs: Dict[str, dict]) -> None:
+    # Write-then-rename so a crash never leaves a half-written manifest behind
+    path = state_dir / MANIFEST_NAME
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": spec.STATE_VERSION, "inputs": inputs}, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def refresh_partials(config, engine: str, state_dir: str, force: bool = False) -> List[str]:
+    """Bring the per-month partials for config.trips up to date; returns their paths in input order."""
+    root = Path(state_dir).expanduser().resolve()
+    months_dir = root / MONTHS_DIR
+    months_dir.mkdir(parents=True, exist_ok=True)
+
+    module = get_engine_module(engine)
+    manifest = load_manifest(root)
+    partial_paths = []
+    filter_key = trip_filter(config).key()
+
+    for src in config.trips:
+        fp = fingerprint(src, filter_key)
+        dst = months_dir / partial_name(src)
+        entry: Optional[dict] = manifest.get(src)
+
+        if not force and entry and entry.get("fingerprint") == fp and dst.exists():
+            print(f"↷ Up to date: {src}")
+            partial_paths.append(str(dst))
+            continue
+
+        print(f"→ Aggregating: {src}")
+        t0 = time.time()
+        tmp = dst.with_suffix(".parquet.tmp")
+        module.write_partials(config, [src], str(tmp))
+        os.replace(tmp, dst)
+        secs = time.time() - t0
+
+        manifest[src] = {
+            "fingerprint": fp,
+            "partials": dst.name,
+            "engine": engine,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seconds": round(secs, 3),
+        }
+        # Persist after every month so an interrupted run keeps the months it finished
+        save_manifest(root, manifest)
+        print(f"✔ Aggregated: {dst.name}  |  {secs:.1f}s")
+        partial_paths.append(str(dst))
+
+    return partial_paths
+
+
+def run_incremental(config, engine: str, state_dir: str, force: bool = False) -> pd.DataFrame:
+    partial_paths = refresh_partials(config, engine, state_dir, force=force)
+    return get_engine_module(engine).execute_partials(config, partial_paths)
+
+
+def run_incremental_cube(config, engine: str, state_dir: str, force: bool = False) -> Dict[str, pd.DataFrame]:
+    """run_incremental() plus the spec.CUBE_LEVELS tables, all from the merged monthly partials."""
+    partial_paths = refresh_partials(config, engine, state_dir, force=force)
+    return get_engine_module(engine).execute_partials_cube(config, partial_paths)
+
+
+def write_incremental(config, engine: str, state_dir: str, path: str, fmt: str, force: bool = False) -> int:
+    """run_incremental() written straight to `path` (see pipeline.write_pipeline); returns the row count."""
+    partial_paths = refresh_partials(config, engine, state_dir, force=force)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    module = get_engine_module(engine)
+    if hasattr(module, "write_result_partials"):
+        return module.write_result_partials(config, partial_paths, path, fmt)
+    df = module.execute_partials(config, partial_paths)
+    write_output(df, path, fmt)
+    return len(df)
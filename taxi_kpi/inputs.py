@@ -0,0 +1,29 @@
+"""
+Input discovery for the KPI pipeline.
+
+--trips accepts any mix of files, globs and directories (directories are searched
+recursively for *.parquet, like scripts/concat_parquet.py).
+"""
+
+import glob
+import os
+from typing import List, Sequence
+
+
+def resolve_inputs(patterns: Sequence[str]) -> List[str]:
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(glob.glob(os.path.join(pattern, "**", "*.parquet"), recursive=True))
+        elif glob.has_magic(pattern):
+            files.extend(glob.glob(pattern))
+        else:
+            files.append(pattern)
+
+    files = sorted(set(os.path.abspath(f) for f in files if f.lower().endswith(".parquet")))
+    missing = [f for f in files if not os.path.isfile(f)]
+    if missing:
+        raise FileNotFoundError(f"Trip file(s) not found: {', '.join(missing)}")
+    if not files:
+        raise FileNotFoundError(f"No parquet files matched: {' '.join(patterns)}")
+    return files
@@ -0,0 +1,186 @@
+"""
+Per-stage instrumentation: wall time, rows in/out and peak RSS for every pipeline stage.
+
+Engines mark their stages with `stage()`; it is a no-op unless a `recording()` is active,
+so uninstrumented runs pay nothing. While recording, a sampler thread polls the process
+RSS so each stage gets its own peak (not just the process high-water mark), and engines
+attach their native profile to the stage:
+
+  duckdb  operator tree with timings and cardinalities (the EXPLAIN ANALYZE data), captured
+          from the statement that actually ran, so nothing is executed twice
+  polars  LazyFrame.profile() node timings where available, else the optimized plan
+
+    with recording("polars") as rec:
+        df = run_pipeline(config, engine="polars")
+        with stage("write_output", rows_in=len(df)):
+            write_output(df, "out.csv")
+    rec.write("reports/instrument.jsonl")     # .jsonl appends one run per line (nightly history)
+
+CLI: python3 -m taxi_kpi build ... --instrument reports/instrument.jsonl
+"""
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pyarrow.parquet as pq
+
+REPORT_FORMATS = ("json", "jsonl")
+SAMPLE_SECONDS = 0.01
+MB = 1024 * 1024
+
+_active = None   # the Recorder of the current recording(), if any
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc; elsewhere the process peak is the best we have)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def parquet_rows(paths: Sequence[str]) -> int:
+    """Row count of Parquet files from their footers (no data read)."""
+    return sum(pq.read_metadata(p).num_rows for p in paths)
+
+
+def input_rows(paths: Sequence[str]) -> Optional[int]:
+    """parquet_rows() while recording, None otherwise (so plain runs skip the footer reads)."""
+    return parquet_rows(paths) if _active is not None else None
+
+
+class Stage:
+    """One timed stage; engines may fill rows_in / rows_out / native while it runs."""
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.native = None
+        self.seconds = 0.0
+        self.rss_start = self.rss_end = self.peak_rss = 0
+
+    def as_dict(self) -> dict:
+        out = {
+            "stage": self.name,
+            "seconds": round(self.seconds, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rss_start_mb": round(self.rss_start / MB, 1),
+            "rss_end_mb": round(self.rss_end / MB, 1),
+            "peak_rss_mb": round(self.peak_rss / MB, 1),
+        }
+        if self.native is not None:
+            out["native"] = self.native
+        return out
+
+
+class Recorder:
+    def __init__(self, engine: str, **context):
+        self.engine = engine
+        self.context = context
+        self.stages = []
+        self.started = datetime.now(timezone.utc)
+        self.seconds = 0.0
+        self._open = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="taxi_kpi-rss", daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(SAMPLE_SECONDS):
+            rss = rss_bytes()
+            with self._lock:
+                for st in self._open:
+                    st.peak_rss = max(st.peak_rss, rss)
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        st = Stage(name, rows_in)
+        st.rss_start = st.peak_rss = rss_bytes()
+        with self._lock:
+            self._open.append(st)
+        t0 = time.perf_counter()
+        try:
+            yield st
+        finally:
+            st.seconds = time.perf_counter() - t0
+            st.rss_end = rss_bytes()
+            with self._lock:
+                self._open.remove(st)
+                st.peak_rss = max(st.peak_rss, st.rss_end)
+            self.stages.append(st)
+
+    def report(self) -> dict:
+        return {
+            "engine": self.engine,
+            "started_at": self.started.isoformat(timespec="seconds"),
+            "seconds": round(self.seconds, 6),
+            "peak_rss_mb": round(peak_rss_bytes() / MB, 1),
+            **self.context,
+            "stages": [st.as_dict() for st in self.stages],
+        }
+
+    def write(self, path: str) -> None:
+        """JSON report; a .jsonl path gets one compact line appended per run."""
+        fmt = report_format(path)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        if fmt == "jsonl":
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.report()) + "\n")
+        else:
+            Path(path).write_text(json.dumps(self.report(), indent=2) + "\n", encoding="utf-8")
+
+
+def report_format(path: str) -> str:
+    fmt = Path(path).suffix.lower().lstrip(".")
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Instrumentation report must be .json or .jsonl, got '{path}'")
+    return fmt
+
+
+@contextmanager
+def recording(engine: str, **context):
+    """Record every stage() run inside the block; yields the Recorder."""
+    global _active
+    if _active is not None:
+        raise RuntimeError("An instrumentation recording is already active")
+    rec = Recorder(engine, **context)
+    rec._sampler.start()
+    _active = rec
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    finally:
+        rec.seconds = time.perf_counter() - t0
+        _active = None
+        rec._stop.set()
+        rec._sampler.join()
+
+
+def active() -> bool:
+    return _active is not None
+
+
+@contextmanager
+def stage(name: str, rows_in: Optional[int] = None):
+    """Time a pipeline stage (a throwaway Stage when nothing is recording)."""
+    if _active is None:
+        yield Stage(name, rows_in)
+        return
+    with _active.stage(name, rows_in) as st:
+        yield st
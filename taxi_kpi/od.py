@@ -0,0 +1,203 @@
+"""
+Pickup×dropoff origin-destination (OD) matrix.
+
+Trips, revenue, distance and duration per (hour or day, PULocationID, DOLocationID). TLC
+zone IDs are small integers (1..265), so no string-keyed group-by is needed: every trip is
+encoded as one int64 key ((bucket * N_ZONES) + PU) * N_ZONES + DO, each Parquet record batch
+is reduced with np.unique + np.bincount, and the per-batch results are merged the same way
+(pending batches are compacted once they outgrow the merged state, as in pandas-stream).
+Only non-empty cells are kept, so memory follows the number of OD pairs that actually occur,
+not 265² × hours.
+
+Measures are sums, so OD tables of different months merge by adding them:
+  trips                  number of trips
+  revenue                SUM(total_amount), missing amounts count as 0
+  total_distance_miles   SUM(trip_distance), missing distances count as 0
+  total_trip_minutes     SUM(dropoff - pickup) in minutes (avg duration = this / trips)
+
+On disk it is one Parquet file with int16 zone keys, sorted by PULocationID, DOLocationID,
+time and cut into small row groups: an origin slice is pruned to a few row groups by their
+min/max statistics, a destination slice only scans the 2-byte DOLocationID column.
+
+    table = build_od(PipelineConfig(trips=[...], start="2024-01-08", end="2024-01-15"), grain="hour")
+    write_od(table, "datasets/od_hourly.parquet")
+    jfk = load_od("datasets/od_hourly.parquet", origins=[132])
+    matrix = dense(jfk, "trips")          # N_ZONES × N_ZONES numpy array, [PU, DO]
+
+PipelineConfig.start / end / pickup_zones (taxi_kpi.filters) apply here too.
+"""
+
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from . import spec
+from .filters import TripFilter, row_groups, trip_filter
+from .instrument import input_rows, stage
+from .outputs import DEFAULT_ROW_GROUP_ROWS
+
+# Highest TLC zone ID (264/265 are the "Unknown" / outside-NYC zones); index 0 stays empty
+MAX_ZONE = 265
+N_ZONES = MAX_ZONE + 1
+
+# grain -> (time column, bucket width in microseconds)
+OD_GRAINS = {
+    "hour": (spec.HOUR_KEY, 3_600_000_000),
+    "day": ("trip_date", 86_400_000_000),
+}
+OD_MEASURES = ("revenue", "total_distance_miles", "total_trip_minutes")
+OD_COLUMNS = (spec.PICKUP, spec.DROPOFF, spec.ZONE_KEY, spec.DROPOFF_ZONE_KEY, spec.TOTAL, spec.DISTANCE)
+GRAIN_KEY = b"taxi_kpi.od_grain"
+
+DEFAULT_BATCH_ROWS = 1_000_000
+MIN_COMPACT_ROWS = 250_000
+
+
+def _micros(arr: pa.Array) -> np.ndarray:
+    return pc.cast(arr, pa.timestamp("us"), safe=False).cast(pa.int64()).to_numpy(zero_copy_only=False)
+
+
+def _floats(arr: pa.Array) -> np.ndarray:
+    return pc.fill_null(arr, 0).cast(pa.float64()).to_numpy(zero_copy_only=False)
+
+
+def encode(bucket: np.ndarray, pu: np.ndarray, do: np.ndarray) -> np.ndarray:
+    return (bucket * N_ZONES + pu) * N_ZONES + do
+
+
+def decode(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Floor division, so buckets before 1970 (junk pickup times) decode correctly too
+    rest, do = np.divmod(keys, N_ZONES)
+    bucket, pu = np.divmod(rest, N_ZONES)
+    return bucket, pu, do
+
+
+def reduce(keys: np.ndarray, trips: np.ndarray, sums: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sum trips/sums per distinct key; returns (sorted keys, trips, sums)."""
+    uniq, inv = np.unique(keys, return_inverse=True)
+    n = len(uniq)
+    out_trips = np.bincount(inv, weights=trips, minlength=n).astype(np.int64)
+    out_sums = np.column_stack([np.bincount(inv, weights=sums[:, j], minlength=n) for j in range(sums.shape[1])])
+    return uniq, out_trips, out_sums
+
+
+def batch_cells(batch: pa.RecordBatch, width_us: int, flt: TripFilter):
+    """One record batch -> its OD cells (keys, trips, sums), or None when no row qualifies."""
+    valid = pc.and_(
+        pc.and_(pc.is_valid(batch.column(spec.PICKUP)), pc.is_valid(batch.column(spec.DROPOFF))),
+        pc.and_(pc.is_valid(batch.column(spec.ZONE_KEY)), pc.is_valid(batch.column(spec.DROPOFF_ZONE_KEY))),
+    )
+    batch = batch.filter(valid)
+    if batch.num_rows == 0:
+        return None
+    pickup = _micros(batch.column(spec.PICKUP))
+    dropoff = _micros(batch.column(spec.DROPOFF))
+    pu = batch.column(spec.ZONE_KEY).to_numpy(zero_copy_only=False).astype(np.int64)
+    do = batch.column(spec.DROPOFF_ZONE_KEY).to_numpy(zero_copy_only=False).astype(np.int64)
+
+    keep = (pu >= 0) & (pu <= MAX_ZONE) & (do >= 0) & (do <= MAX_ZONE)
+    if flt.start is not None:
+        keep &= pickup >= flt.start.value // 1000
+    if flt.end is not None:
+        keep &= pickup < flt.end.value // 1000
+    if flt.zones is not None:
+        keep &= np.isin(pu, flt.zones)
+    if not keep.any():
+        return None
+
+    keys = encode(pickup[keep] // width_us, pu[keep], do[keep])
+    sums = np.column_stack([
+        _floats(batch.column(spec.TOTAL))[keep],
+        _floats(batch.column(spec.DISTANCE))[keep],
+        (dropoff[keep] - pickup[keep]) / 60_000_000.0,
+    ])
+    return reduce(keys, np.ones(len(keys)), sums)
+
+
+def _compact(parts: List[tuple]) -> tuple:
+    if len(parts) == 1:
+        return parts[0]
+    return reduce(
+        np.concatenate([p[0] for p in parts]),
+        np.concatenate([p[1] for p in parts]),
+        np.concatenate([p[2] for p in parts]),
+    )
+
+
+def aggregate_od(trips: Sequence[str], grain: str = "hour", flt: TripFilter = TripFilter(),
+                 batch_rows: Optional[int] = None) -> pa.Table:
+    """Raw trip files -> OD table (columns: time, PULocationID, DOLocationID, trips, OD_MEASURES)."""
+    if grain not in OD_GRAINS:
+        raise ValueError(f"Unknown OD grain '{grain}'. Choose one of: {', '.join(OD_GRAINS)}")
+    time_col, width_us = OD_GRAINS[grain]
+    batch_rows = batch_rows or DEFAULT_BATCH_ROWS
+
+    merged = None
+    pending: List[tuple] = []
+    pending_rows = 0
+    for path in trips:
+        pf = pq.ParquetFile(path)
+        for rg in row_groups(path, flt):
+            for batch in pf.iter_batches(batch_size=batch_rows, row_groups=[rg], columns=list(OD_COLUMNS)):
+                cells = batch_cells(batch, width_us, flt)
+                if cells is None:
+                    continue
+                pending.append(cells)
+                pending_rows += len(cells[0])
+                if pending_rows >= max(MIN_COMPACT_ROWS, 0 if merged is None else len(merged[0])):
+                    merged = _compact(pending if merged is None else [merged, *pending])
+                    pending, pending_rows = [], 0
+    if pending:
+        merged = _compact(pending if merged is None else [merged, *pending])
+    if merged is None:
+        merged = (np.empty(0, np.int64), np.empty(0, np.int64), np.empty((0, len(OD_MEASURES))))
+
+    keys, counts, sums = merged
+    bucket, pu, do = decode(keys)
+    order = np.lexsort((bucket, do, pu))
+    table = pa.table({
+        time_col: pa.array(bucket[order] * width_us, pa.int64()).cast(pa.timestamp("us")),
+        spec.ZONE_KEY: pa.array(pu[order].astype(np.int16)),
+        spec.DROPOFF_ZONE_KEY: pa.array(do[order].astype(np.int16)),
+        "trips": pa.array(counts[order].astype(np.int32)),
+        **{name: pa.array(sums[order, j]) for j, name in enumerate(OD_MEASURES)},
+    })
+    return table.replace_schema_metadata({GRAIN_KEY: grain.encode("utf-8")})
+
+
+def build_od(config, grain: str = "hour") -> pa.Table:
+    """OD table of config.trips, honouring the config's pickup window/zone filter."""
+    with stage("od_aggregate", input_rows(config.trips)) as st:
+        table = aggregate_od(config.trips, grain, trip_filter(config), config.batch_rows)
+        st.rows_out = table.num_rows
+    return table
+
+
+def write_od(table: pa.Table, path: str, row_group_rows: Optional[int] = None) -> None:
+    """Sorted, int16-keyed, ZSTD Parquet with small row groups (origin slices prune on statistics)."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with stage("write_od", table.num_rows):
+        pq.write_table(table, path, compression="zstd", row_group_size=row_group_rows or DEFAULT_ROW_GROUP_ROWS)
+
+
+def load_od(path: str, origins: Optional[Sequence[int]] = None,
+            destinations: Optional[Sequence[int]] = None) -> pa.Table:
+    """An OD file, optionally sliced to some pickup and/or dropoff zones (filters pushed into the read)."""
+    filters = []
+    if origins is not None:
+        filters.append((spec.ZONE_KEY, "in", [int(z) for z in origins]))
+    if destinations is not None:
+        filters.append((spec.DROPOFF_ZONE_KEY, "in", [int(z) for z in destinations]))
+    return pq.read_table(path, filters=filters or None)
+
+
+def dense(table: pa.Table, measure: str = "trips") -> np.ndarray:
+    """N_ZONES × N_ZONES array of `measure` summed over time, indexed [PULocationID, DOLocationID]."""
+    pu = table.column(spec.ZONE_KEY).to_numpy().astype(np.int64)
+    do = table.column(spec.DROPOFF_ZONE_KEY).to_numpy().astype(np.int64)
+    values = table.column(measure).to_numpy().astype(np.float64)
+    return np.bincount(pu * N_ZONES + do, weights=values, minlength=N_ZONES * N_ZONES).reshape(N_ZONES, N_ZONES)
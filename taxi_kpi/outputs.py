@@ -0,0 +1,137 @@
+"""
+Writers for the final trips_complete table.
+
+Matches the export cell of clean.ipynb, so every engine writes CSVs with the same columns,
+order and formatting (floats may differ in the last digit).
+
+write_partitioned() writes a Hive-partitioned Parquet dataset instead of one file:
+
+  out_dir/year=2024/month=1/part-0.parquet
+  out_dir/year=2024/month=1/Borough=Manhattan/part-0.parquet   (with Borough partitioning)
+
+Rows inside each file are sorted by hour_local, PULocationID and cut into small row
+groups, so min/max statistics (and the page index) let readers skip most row groups on
+time-range and zone filters. Read it back with partition discovery, e.g.
+  duckdb: read_parquet('out_dir/**/*.parquet', hive_partitioning = true)
+  pyarrow: ds.dataset('out_dir', partitioning='hive')
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from . import spec
+
+OUTPUT_FORMATS = ("csv", "parquet")
+PARTITION_KEYS = ("year", "month", "Borough")
+DEFAULT_ROW_GROUP_ROWS = 32_768   # ~5 days of hour×zone rows: fine-grained skipping, still good compression
+HIVE_NULL = "__HIVE_DEFAULT_PARTITION__"
+
+
+def infer_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt.lower()
+    suffix = Path(path).suffix.lower().lstrip(".")
+    if suffix not in OUTPUT_FORMATS:
+        raise ValueError(f"Cannot infer output format from '{path}'; pass --format csv|parquet")
+    return suffix
+
+
+def write_output(df: pd.DataFrame, path: str, fmt: Optional[str] = None) -> None:
+    fmt = infer_format(path, fmt)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "csv":
+        df.to_csv(
+            path,
+            index=False,
+            na_rep="",
+            float_format="%.6f",
+            date_format="%Y-%m-%d %H:%M:%S",
+            lineterminator="\n",
+        )
+    else:
+        df.to_parquet(
+            path,
+            engine="pyarrow",
+            index=False,
+            compression="zstd",      # strong + fast reads
+            compression_level=12,    # ~near-max without hurting read speed. Range: 1 to 22
+        )
+
+
+def write_cube(tables: Dict[str, pd.DataFrame], out_dir: str, fmt: str = "parquet") -> Dict[str, str]:
+    """Write every cube level except hour×zone as out_dir/<level>.<fmt>; returns {level: path}."""
+    paths = {}
+    for name, df in tables.items():
+        if name == spec.HOUR_ZONE_LEVEL:
+            continue
+        paths[name] = str(Path(out_dir) / f"{name}.{fmt}")
+        write_output(df, paths[name], fmt)
+    return paths
+
+
+def _partition_dir(keys: Sequence[str], values) -> str:
+    parts = []
+    for key, value in zip(keys, values):
+        if value is None or (isinstance(value, float) and pd.isna(value)) or value is pd.NA:
+            text = HIVE_NULL
+        else:
+            # "N/A" and friends must not become nested folders; Hive readers URL-decode segments
+            text = quote(str(value), safe="")
+        parts.append(f"{key}={text}")
+    return os.path.join(*parts)
+
+
+def write_partitioned(
+    df: pd.DataFrame,
+    out_dir: str,
+    partition_by: Sequence[str],
+    row_group_rows: Optional[int] = None,
+) -> int:
+    """Write df as a Hive-partitioned, sorted Parquet dataset; returns the number of files written.
+
+    Partitions present in df are replaced; other partitions already under out_dir are left alone,
+    so months can be added one run at a time.
+    """
+    keys = list(partition_by)
+    unknown = [k for k in keys if k not in PARTITION_KEYS]
+    if unknown:
+        raise ValueError(f"Unsupported partition column(s): {', '.join(unknown)} (use {', '.join(PARTITION_KEYS)})")
+    row_group_rows = row_group_rows or DEFAULT_ROW_GROUP_ROWS
+
+    hour = df[spec.HOUR_KEY]
+    extra = {}
+    if "year" in keys:
+        extra["year"] = hour.dt.year.astype("int16")
+    if "month" in keys:
+        extra["month"] = hour.dt.month.astype("int8")
+    keyed = df.assign(**extra) if extra else df
+    keyed = keyed.sort_values([*keys, *spec.GROUP_KEYS], kind="stable", ignore_index=True)
+
+    root = Path(out_dir)
+    written = 0
+    for values, part in keyed.groupby(keys, sort=False, dropna=False):
+        values = values if isinstance(values, tuple) else (values,)
+        dst = root / _partition_dir(keys, values) / "part-0.parquet"
+        dst.parent.mkdir(parents=True, exist_ok=True)
+
+        # Partition columns live in the path (Hive convention), not in the file
+        table = pa.Table.from_pandas(part.drop(columns=keys), preserve_index=False)
+        tmp = dst.with_suffix(".parquet.tmp")
+        pq.write_table(
+            table,
+            tmp,
+            compression="zstd",
+            compression_level=12,
+            row_group_size=row_group_rows,
+            write_statistics=True,
+            write_page_index=True,
+        )
+        os.replace(tmp, dst)
+        written += 1
+    return written
@@ -0,0 +1,77 @@
+"""
+Top-level entry point: pick an engine, run it, return the trips_complete frame.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from .engines import get_engine, get_engine_module
+from .filters import check_filter, resolve_zones, trip_filter
+from .outputs import infer_format, write_output
+from .quality import report_format
+from .weather import DEFAULT_WEATHER_TOLERANCE_HOURS, check_join
+
+DEFAULT_ZONES = "datasets/taxi_zone_lookup.parquet"
+DEFAULT_WEATHER = "datasets/weather_data.parquet"
+
+
+@dataclass
+class PipelineConfig:
+    trips: List[str]
+    zones: str = DEFAULT_ZONES
+    weather: str = DEFAULT_WEATHER
+    threads: Optional[int] = None   # DuckDB PRAGMA threads; other engines use their defaults
+    with_partials: bool = False     # append spec.PARTIALS columns so the output can be rolled up later
+    batch_rows: Optional[int] = None  # pandas-stream: rows per record batch
+    weather_join: str = "exact"     # exact | asof | interpolate (see taxi_kpi.weather)
+    weather_tolerance_hours: float = DEFAULT_WEATHER_TOLERANCE_HOURS
+    compact: bool = False           # categorical strings + narrow numerics (spec.COMPACT_TYPES, taxi_kpi.compact)
+    profile: Optional[str] = None   # write a data-quality report (.json/.parquet, taxi_kpi.quality) of the result
+    start: Optional[str] = None     # keep pickups >= start (taxi_kpi.filters; pushed down to row-group stats)
+    end: Optional[str] = None       # keep pickups < end
+    pickup_zones: Optional[Sequence[Union[int, str]]] = None  # PULocationIDs and/or borough names
+
+    def __post_init__(self):
+        check_join(self.weather_join, self.weather_tolerance_hours)
+        if self.pickup_zones is not None:
+            # Borough names -> zone IDs once, so every engine (and the state fingerprint) sees IDs
+            self.pickup_zones = resolve_zones(self.pickup_zones, self.zones)
+        check_filter(trip_filter(self))
+        if self.profile:
+            report_format(self.profile)
+
+
+def run_pipeline(config: PipelineConfig, engine: str = "duckdb") -> pd.DataFrame:
+    """Build the hour×zone KPI table (columns in spec.output_columns(), sorted by hour_local, PULocationID)."""
+    return get_engine(engine)(config)
+
+
+def run_cube(config: PipelineConfig, engine: str = "duckdb") -> Dict[str, pd.DataFrame]:
+    """
+    The hour×zone table (key spec.HOUR_ZONE_LEVEL) plus one small pre-aggregated table per
+    spec.CUBE_LEVELS entry, all finalized from a single scan of the raw trips.
+    """
+    return get_engine_module(engine).execute_cube(config)
+
+
+def write_pipeline(config: PipelineConfig, path: str, fmt: Optional[str] = None, engine: str = "duckdb") -> int:
+    """
+    Build trips_complete straight into `path` (.csv/.parquet) and return the row count.
+
+    DuckDB (COPY ... TO) and Polars (sink_csv/sink_parquet) stream the ordered result to disk
+    without a pandas DataFrame. DuckDB's CSV matches write_output(run_pipeline(...)) byte for
+    byte; Polars' float_precision rounds some values differently from pandas' "%.6f", so its
+    CSV can differ in the sixth decimal. The pandas engines have no such path and fall back
+    to exactly write_output(run_pipeline(...)).
+    """
+    fmt = infer_format(path, fmt)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    module = get_engine_module(engine)
+    if hasattr(module, "write_result"):
+        return module.write_result(config, path, fmt)
+    df = module.execute(config)
+    write_output(df, path, fmt)
+    return len(df)
@@ -0,0 +1,167 @@
+"""
+Data-quality profile of the trips_complete table, computed inside the engine.
+
+Replaces the notebook's collect-and-inspect cells (df.duplicated() over all 29 columns,
+isna().sum(), collecting zones/weather to pandas twice). Each engine aggregates its
+result in one pass into grouping sets of the key columns (spec.GROUP_KEYS):
+
+  dimension   value            what it gives
+  all         ""               row count and per-column null counts
+  hour_local  each hour        null counts per hour (weather gaps cluster here)
+  PULocationID each zone       null counts per zone (zone lookup gaps cluster here)
+  key         duplicate keys   only (hour_local, PULocationID) groups with more than one row
+
+with one `rows` column and one `null_<column>` column per output column. build_report()
+turns those few thousand rows into the report; write_report() stores it as JSON or as a
+Parquet table (nulls per column and per cluster, summary in the file metadata).
+
+    python3 -m taxi_kpi build --trips ... --output ... --profile datasets/quality.json
+"""
+
+import json
+from pathlib import Path
+from typing import Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from . import spec
+
+OVERALL = "all"
+KEY = "key"
+NULL_PREFIX = "null_"
+REPORT_FORMATS = ("json", "parquet")
+MAX_DUPLICATE_EXAMPLES = 20
+SUMMARY_KEY = b"taxi_kpi.quality"
+
+
+def null_name(column: str) -> str:
+    return f"{NULL_PREFIX}{column}"
+
+
+def _hour_text(hours: pd.Series) -> pd.Series:
+    return hours.dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def profile_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """The grouping sets above for a pandas frame (used by the pandas engines)."""
+    columns = list(df.columns)
+    nulls = df.isna()
+    nulls.columns = [null_name(c) for c in columns]
+    keyed = pd.concat([df[list(spec.GROUP_KEYS)], nulls], axis=1)
+    parts = []
+
+    overall = nulls.sum().to_frame().T
+    overall.insert(0, "rows", len(df))
+    overall.insert(0, "value", "")
+    overall.insert(0, "dimension", OVERALL)
+    parts.append(overall)
+
+    for key in spec.GROUP_KEYS:
+        g = keyed.groupby(key, sort=True)
+        part = g[list(nulls.columns)].sum()
+        part.insert(0, "rows", g.size())
+        part = part.reset_index().rename(columns={key: "value"})
+        if key == spec.HOUR_KEY:
+            part["value"] = _hour_text(part["value"])
+        part.insert(0, "dimension", key)
+        parts.append(part)
+
+    g = keyed.groupby(list(spec.GROUP_KEYS), sort=True)
+    dup = g.size()
+    dup = dup[dup > 1]
+    if len(dup):
+        part = g[list(nulls.columns)].sum().loc[dup.index]
+        part.insert(0, "rows", dup)
+        part = part.reset_index()
+        part.insert(0, "value", _hour_text(part[spec.HOUR_KEY]) + "|" + part[spec.ZONE_KEY].astype(str))
+        part = part.drop(columns=list(spec.GROUP_KEYS))
+        part.insert(0, "dimension", KEY)
+        parts.append(part)
+
+    out = pd.concat(parts, ignore_index=True)
+    out["value"] = out["value"].astype(str)
+    return out
+
+
+def build_report(groups: pd.DataFrame, columns: Sequence[str]) -> dict:
+    """Duplicates, null rates and null clusters from an engine's grouping-set frame."""
+    overall = groups[groups["dimension"] == OVERALL].iloc[0]
+    rows = int(overall["rows"])
+    dups = groups[groups["dimension"] == KEY].sort_values("value")
+    duplicate_rows = int((dups["rows"] - 1).sum())
+
+    nulls = {}
+    for c in columns:
+        n = int(overall[null_name(c)])
+        nulls[c] = {"nulls": n, "null_rate": n / rows if rows else 0.0}
+
+    clusters = []
+    for dim in spec.GROUP_KEYS:
+        part = groups[groups["dimension"] == dim]
+        for c in columns:
+            if not nulls[c]["nulls"]:
+                continue
+            hit = part[part[null_name(c)] > 0]
+            for value, n_rows, n_null in zip(hit["value"], hit["rows"], hit[null_name(c)]):
+                clusters.append({
+                    "dimension": dim,
+                    "value": str(value),
+                    "column": c,
+                    "rows": int(n_rows),
+                    "nulls": int(n_null),
+                    "null_rate": int(n_null) / int(n_rows),
+                    # Share of the column's nulls that fall in this hour/zone
+                    "share_of_nulls": int(n_null) / nulls[c]["nulls"],
+                })
+    clusters.sort(key=lambda r: (-r["nulls"], r["column"], r["dimension"], r["value"]))
+
+    return {
+        "rows": rows,
+        "duplicates": {
+            "key": list(spec.GROUP_KEYS),
+            "distinct_keys": rows - duplicate_rows,
+            "duplicate_rows": duplicate_rows,
+            "duplicate_keys": int(len(dups)),
+            "examples": [
+                {"key": v, "rows": int(n)} for v, n in zip(dups["value"][:MAX_DUPLICATE_EXAMPLES], dups["rows"])
+            ],
+        },
+        "columns": nulls,
+        "null_clusters": clusters,
+    }
+
+
+def report_format(path: str) -> str:
+    fmt = Path(path).suffix.lower().lstrip(".")
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Quality report must be .json or .parquet, got '{path}'")
+    return fmt
+
+
+def write_report(report: dict, path: str) -> None:
+    """JSON as-is; Parquet as one row per column (dimension "all") and per null cluster."""
+    fmt = report_format(path)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "json":
+        Path(path).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        return
+
+    rows = [
+        {"dimension": OVERALL, "value": "", "column": c, "rows": report["rows"], **v, "share_of_nulls": 1.0 if v["nulls"] else 0.0}
+        for c, v in report["columns"].items()
+    ]
+    rows.extend(report["null_clusters"])
+    tbl = pa.Table.from_pylist(rows, schema=pa.schema([
+        ("dimension", pa.string()),
+        ("value", pa.string()),
+        ("column", pa.string()),
+        ("rows", pa.int64()),
+        ("nulls", pa.int64()),
+        ("null_rate", pa.float64()),
+        ("share_of_nulls", pa.float64()),
+    ]))
+    summary = {k: v for k, v in report.items() if k not in ("columns", "null_clusters")}
+    tbl = tbl.replace_schema_metadata({SUMMARY_KEY: json.dumps(summary).encode("utf-8")})
+    pq.write_table(tbl, path, compression="zstd")
@@ -0,0 +1,68 @@
+"""
+Roll the hour×zone table up to coarser grains without rescanning raw trips.
+
+Needs an output built with `--with-partials` (or `PipelineConfig(with_partials=True)`):
+the partial columns (n_trips, sum_<x>, n_<x>) are summed per group and the KPIs are
+finalized from them, so averages and ratios are exact at any grain (a mean of
+hour×zone averages would not be).
+
+    from taxi_kpi.rollup import load_partials, rollup
+    df = load_partials("datasets/trips_complete.parquet")
+    by_borough = rollup(df, ["Borough"])
+    heatmap = rollup(df, ["day_of_week", "hour_of_day"])
+    overall = rollup(df, [])
+"""
+
+from pathlib import Path
+from typing import Sequence
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from . import spec
+from .engines.pandas_engine import add_derived, finalize
+
+# Dimensions carried by the hour×zone output that rollups can group by
+ROLLUP_DIMENSIONS = (
+    spec.HOUR_KEY,
+    spec.ZONE_KEY,
+    *spec.ZONE_COLUMNS,
+    "trip_date",
+    "hour_of_day",
+    "day_of_week",
+)
+
+ROLLUP_DERIVED = spec.GRAIN_DERIVED
+
+PARTIAL_NAMES = [p.name for p in spec.PARTIALS]
+
+
+def load_partials(path: str) -> pd.DataFrame:
+    """Read only the dimension + partial columns of a trips_complete file (.parquet or .csv)."""
+    columns = [*ROLLUP_DIMENSIONS, *PARTIAL_NAMES]
+    if Path(path).suffix.lower() == ".csv":
+        df = pd.read_csv(path, usecols=lambda c: c in columns)
+    else:
+        available = set(pq.read_schema(path).names)
+        df = pd.read_parquet(path, columns=[c for c in columns if c in available])
+    missing = [c for c in PARTIAL_NAMES if c not in df.columns]
+    if missing:
+        raise ValueError(f"{path} has no partial state ({', '.join(missing[:3])}, ...); rebuild with --with-partials")
+    return df
+
+
+def rollup(df: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    """KPIs per `by` group (an empty `by` gives one overall row)."""
+    by = list(by)
+    unknown = [c for c in by if c not in df.columns]
+    if unknown:
+        raise ValueError(f"Unknown rollup column(s): {', '.join(unknown)}")
+    missing = [c for c in PARTIAL_NAMES if c not in df.columns]
+    if missing:
+        raise ValueError("Input has no partial state; rebuild with --with-partials")
+
+    if by:
+        merged = df.groupby(by, sort=True, dropna=False, observed=True)[PARTIAL_NAMES].sum().reset_index()
+    else:
+        merged = df[PARTIAL_NAMES].sum().to_frame().T.astype(df[PARTIAL_NAMES].dtypes.to_dict())
+    return add_derived(finalize(merged, by), ROLLUP_DERIVED)
@@ -0,0 +1,225 @@
+"""
+Engine-agnostic definition of the hour×zone KPI table.
+
+This is the single place where the KPIs are defined. The DuckDB, Polars and Pandas
+engines compile the objects below into SQL, expressions or named aggregations, so a
+metric is added or changed here and every engine picks it up.
+
+Semantics (shared by all engines):
+- A trip counts when pickup, dropoff and PULocationID are all present.
+- hour_local = pickup time truncated to the hour.
+- trip_minutes = (dropoff - pickup) in fractional minutes.
+- speed_mph = trip_distance / hours, only for trips with a positive duration.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+# Raw TLC yellow-taxi columns the pipeline reads (everything else is pruned at scan time)
+PICKUP = "tpep_pickup_datetime"
+DROPOFF = "tpep_dropoff_datetime"
+ZONE_KEY = "PULocationID"
+FARE = "fare_amount"
+TIP = "tip_amount"
+TOTAL = "total_amount"
+DISTANCE = "trip_distance"
+TRIP_COLUMNS = (PICKUP, DROPOFF, ZONE_KEY, FARE, TIP, TOTAL, DISTANCE)
+# Dropoff zone: only the origin-destination matrix reads it (taxi_kpi.od)
+DROPOFF_ZONE_KEY = "DOLocationID"
+
+# Per-trip features computed before grouping
+TRIP_MINUTES = "trip_minutes"
+SPEED_MPH = "speed_mph"
+
+HOUR_KEY = "hour_local"
+GROUP_KEYS = (HOUR_KEY, ZONE_KEY)
+
+MILES_TO_KM = 1.60934
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """
+    One hour×zone measure.
+
+    kind:
+      count -> number of trips in the group
+      sum   -> SUM(column), null when the group has no non-null values
+      mean  -> AVG(column), nulls ignored
+      ratio -> SUM(column) / SUM(denominator), 0 when the denominator sums to 0
+
+    Every kind is finalized from PARTIALS, so the result is the same whether the
+    group was aggregated in one pass or merged from several months.
+    """
+    name: str
+    kind: str
+    column: Optional[str] = None
+    denominator: Optional[str] = None
+
+
+AGGREGATES = (
+    Aggregate("trips", "count"),
+    Aggregate("avg_fare", "mean", FARE),
+    Aggregate("avg_tip", "mean", TIP),
+    Aggregate("avg_total", "mean", TOTAL),
+    Aggregate("avg_distance", "mean", DISTANCE),
+    Aggregate("tip_pct", "ratio", TIP, TOTAL),
+    Aggregate("avg_trip_minutes", "mean", TRIP_MINUTES),
+    Aggregate("revenue_per_hour", "sum", TOTAL),
+    Aggregate("total_distance_miles", "sum", DISTANCE),
+    Aggregate("avg_speed_mph", "mean", SPEED_MPH),
+)
+
+
+@dataclass(frozen=True)
+class Partial:
+    """
+    Mergeable aggregate state behind the KPIs; partials of the same key are combined by summing.
+
+    kind:
+      rows  -> number of trips in the group
+      sum   -> SUM(column)
+      count -> COUNT(column), i.e. non-null values
+    """
+    name: str
+    kind: str
+    column: Optional[str] = None
+
+
+def _measured_columns():
+    seen = []
+    for a in AGGREGATES:
+        for c in (a.column, a.denominator):
+            if c and c not in seen:
+                seen.append(c)
+    return seen
+
+
+def sum_name(column: str) -> str:
+    return f"sum_{column}"
+
+
+def count_name(column: str) -> str:
+    return f"n_{column}"
+
+
+ROWS_PARTIAL = "n_trips"
+MEASURED_COLUMNS = tuple(_measured_columns())
+PARTIALS = (Partial(ROWS_PARTIAL, "rows"),) + tuple(
+    p for c in MEASURED_COLUMNS for p in (Partial(sum_name(c), "sum", c), Partial(count_name(c), "count", c))
+)
+PARTIAL_COLUMNS = [*GROUP_KEYS, *(p.name for p in PARTIALS)]
+
+# Bump when trip features or partial semantics change; invalidates materialized monthly state
+STATE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Derived:
+    """
+    A column computed after the zone/weather joins.
+
+    kind:
+      trip_date   -> column truncated to the day
+      hour_of_day -> hour of column (int32)
+      day_of_week -> weekday name of column ("Monday", ...)
+      scale       -> column * factor
+      divide      -> column / other, null when other <= 0
+    """
+    name: str
+    kind: str
+    column: str
+    other: Optional[str] = None
+    factor: float = 1.0
+
+
+DERIVED = (
+    Derived("trip_date", "trip_date", HOUR_KEY),
+    Derived("hour_of_day", "hour_of_day", HOUR_KEY),
+    Derived("day_of_week", "day_of_week", HOUR_KEY),
+    Derived("avg_speed_kmh", "scale", "avg_speed_mph", factor=MILES_TO_KM),
+    Derived("total_distance_km", "scale", "total_distance_miles", factor=MILES_TO_KM),
+    Derived("tip_pct_percent", "scale", "tip_pct", factor=100.0),
+    Derived("avg_revenue_per_trip", "divide", "revenue_per_hour", other="trips"),
+)
+
+# Zone lookup: LocationID -> PULocationID plus the descriptive columns
+ZONE_SOURCE_KEY = "LocationID"
+ZONE_COLUMNS = ("Borough", "Zone", "service_zone")
+
+# Meteostat hourly export: the timestamp is rebuilt from these parts
+WEATHER_TIME_PARTS = ("year", "month", "day", "hour")
+# (source column, output column); measures are cast to float, the condition code is kept as-is
+WEATHER_MEASURES = (
+    ("temp", "temp_c"),
+    ("rhum", "humidity"),
+    ("prcp", "precip_mm"),
+    ("wdir", "wind_direction"),
+    ("wspd", "wind_speed_kmh"),
+    ("pres", "pressure_hpa"),
+)
+WEATHER_CONDITION = ("coco", "weather_condition")
+WEATHER_COLUMNS = tuple(out for _, out in WEATHER_MEASURES) + (WEATHER_CONDITION[1],)
+
+# Final column order of the trips_complete output
+COLUMN_ORDER = [
+    HOUR_KEY,
+    ZONE_KEY,
+    *ZONE_COLUMNS,
+    *(a.name for a in AGGREGATES),
+    *WEATHER_COLUMNS,
+    *(d.name for d in DERIVED),
+]
+
+
+# Opt-in compact output schema (PipelineConfig.compact), applied by each engine before the
+# frame is materialized: {column: (default type, compact type)}. Types are logical names
+# ("category", "float32", "int8", ...) that every engine maps to its own. Strings become
+# categoricals; KPIs that are means/ratios and the weather readings fit float32, while the
+# hourly sums keep float64 (revenue totals need more than float32's ~7 digits) and the
+# partial state is left alone so it still merges exactly.
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+COMPACT_TYPES = {
+    ZONE_KEY: ("int32", "int16"),
+    **{c: ("string", "category") for c in ZONE_COLUMNS},
+    "trips": ("int64", "int32"),
+    **{a.name: ("float64", "float32") for a in AGGREGATES if a.kind in ("mean", "ratio")},
+    **{out: ("float64", "float32") for _, out in WEATHER_MEASURES},
+    WEATHER_CONDITION[1]: ("int64", "float32"),   # float so hours without weather stay null
+    "hour_of_day": ("int32", "int8"),
+    "day_of_week": ("string", "category"),
+    "avg_speed_kmh": ("float64", "float32"),
+    "tip_pct_percent": ("float64", "float32"),
+    "avg_revenue_per_trip": ("float64", "float32"),
+}
+
+# Pre-aggregated dashboard levels written next to the hour×zone table (taxi_kpi.cube).
+# Every level is a coarsening of hour×zone, so all of them are finalized from the same
+# partial state: one scan of the raw trips feeds the whole cube.
+HOUR_ZONE_LEVEL = "hour_zone"
+CUBE_LEVELS = {
+    "borough": ("Borough",),
+    "trip_date": ("trip_date",),
+    "weekday_hour": ("day_of_week", "hour_of_day"),
+    "overall": (),
+}
+# Columns every level can group by: zone attributes come from the lookup join, the time
+# parts are the spec.DERIVED time columns of hour_local
+CUBE_DIMENSIONS = (*ZONE_COLUMNS, "trip_date", "hour_of_day", "day_of_week")
+# Grain-independent derived columns (the time parts only make sense per hour)
+GRAIN_DERIVED = tuple(d for d in DERIVED if d.kind in ("scale", "divide"))
+
+
+def level_columns(dims, with_partials: bool = False) -> list:
+    """Column order of one cube level: its dimensions, the KPIs, then the grain-independent derived columns."""
+    cols = [*dims, *(a.name for a in AGGREGATES), *(d.name for d in GRAIN_DERIVED)]
+    if with_partials:
+        cols.extend(p.name for p in PARTIALS)
+    return cols
+
+
+def output_columns(with_partials: bool = False) -> list:
+    """COLUMN_ORDER, optionally followed by the mergeable partial state (see taxi_kpi.rollup)."""
+    if not with_partials:
+        return list(COLUMN_ORDER)
+    return [*COLUMN_ORDER, *(p.name for p in PARTIALS)]
@@ -0,0 +1,107 @@
+"""
+Hourly weather series, built once and cached.
+
+The raw weather file stores local time as year/month/day/hour columns. `hourly_series()`
+turns it into a sorted, de-duplicated (hour_local, measures..., weather_condition) Parquet
+sidecar next to the source (or in the temp dir if that is read-only) and reuses it until the
+source file changes. Every engine reads the sidecar instead of rebuilding timestamps.
+
+How trip hours are matched to it is set by PipelineConfig.weather_join:
+  exact        hour_local equality (the notebook's join; unmatched hours stay null)
+  asof         nearest weather hour within the tolerance (ties go to the earlier hour)
+  interpolate  linear interpolation between the surrounding hours when both are within the
+               tolerance, otherwise the asof value; the condition code is always the asof one
+Each engine builds the lookup for the distinct trip hours only, with a sorted as-of merge.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from . import spec
+
+WEATHER_JOINS = ("exact", "asof", "interpolate")
+DEFAULT_WEATHER_TOLERANCE_HOURS = 3.0
+SOURCE_KEY = b"taxi_kpi.weather_source"
+
+# Helper columns of the as-of lookup: matched weather hour on either side of a trip hour
+BACKWARD_PREFIX = "b_"
+FORWARD_PREFIX = "f_"
+MATCH_HOUR = "w_hour"
+
+
+def _source_tag(path: str) -> bytes:
+    st = os.stat(path)
+    payload = (spec.WEATHER_TIME_PARTS, spec.WEATHER_MEASURES, spec.WEATHER_CONDITION)
+    return repr((st.st_size, st.st_mtime_ns, payload)).encode("utf-8")
+
+
+def build_hourly(path: str) -> pa.Table:
+    cond_src, cond_out = spec.WEATHER_CONDITION
+    sources = [src for src, _ in spec.WEATHER_MEASURES]
+    tbl = pq.read_table(path, columns=[*spec.WEATHER_TIME_PARTS, *sources, cond_src])
+    mask = pc.is_valid(tbl[spec.WEATHER_TIME_PARTS[0]])
+    for p in spec.WEATHER_TIME_PARTS[1:]:
+        mask = pc.and_(mask, pc.is_valid(tbl[p]))
+    tbl = tbl.filter(mask)
+
+    y, m, d, h = (tbl[p].to_numpy().astype(np.int64) for p in spec.WEATHER_TIME_PARTS)
+    days = (
+        (y - 1970).astype("datetime64[Y]").astype("datetime64[M]") + (m - 1).astype("timedelta64[M]")
+    ).astype("datetime64[D]") + (d - 1).astype("timedelta64[D]")
+    hours = days.astype("datetime64[us]") + h.astype("timedelta64[h]")
+
+    out = pa.table({
+        spec.HOUR_KEY: pa.array(hours, type=pa.timestamp("us")),
+        **{dst: pc.cast(tbl[src], pa.float64()) for src, dst in spec.WEATHER_MEASURES},
+        cond_out: tbl[cond_src],
+    })
+    # Sorted + one row per hour, so every engine can as-of merge it without re-sorting
+    order = np.argsort(hours, kind="stable")
+    out = out.take(pa.array(order))
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = np.diff(hours[order].astype(np.int64)) != 0
+    return out.filter(pa.array(keep))
+
+
+def _cache_path(path: str, directory: Path) -> Path:
+    return directory / f".{Path(path).stem}.hourly.parquet"
+
+
+def hourly_series(path: str) -> str:
+    """Path of the cached hourly series for a raw weather file (rebuilt when the source changes)."""
+    tag = _source_tag(path)
+    candidates = [Path(path).resolve().parent, Path(tempfile.gettempdir()) / "taxi_kpi"]
+    for directory in candidates:
+        cached = _cache_path(path, directory)
+        try:
+            if (pq.read_schema(cached).metadata or {}).get(SOURCE_KEY) == tag:
+                return str(cached)
+        except (OSError, pa.ArrowInvalid):
+            pass
+
+    tbl = build_hourly(path)
+    tbl = tbl.replace_schema_metadata({**(tbl.schema.metadata or {}), SOURCE_KEY: tag})
+    for directory in candidates:
+        cached = _cache_path(path, directory)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_name(cached.name + f".tmp-{os.getpid()}")
+            pq.write_table(tbl, tmp, compression="zstd")
+            os.replace(tmp, cached)
+            return str(cached)
+        except OSError:
+            continue
+    raise OSError(f"Could not write the hourly weather cache for {path}")
+
+
+def check_join(join: str, tolerance_hours: float) -> None:
+    if join not in WEATHER_JOINS:
+        raise ValueError(f"Unknown weather join {join!r}; expected one of {', '.join(WEATHER_JOINS)}")
+    if tolerance_hours < 0:
+        raise ValueError("Weather tolerance must be >= 0 hours")
@@ -0,0 +1,34 @@
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from taxi_kpi import spec
+
+DATASETS = Path(__file__).resolve().parent.parent / "datasets"
+
+
+@pytest.fixture
+def sample_inputs(tmp_path):
+    """A small January 2024 trips file (two row groups) plus copies of the bundled zones and weather."""
+    start = datetime(2024, 1, 1)
+    n = 400
+    pickups = [start + timedelta(minutes=37 * i) for i in range(n)]
+    trips = pa.table({
+        spec.PICKUP: pa.array(pickups, pa.timestamp("us")),
+        spec.DROPOFF: pa.array([p + timedelta(minutes=12) for p in pickups], pa.timestamp("us")),
+        spec.ZONE_KEY: pa.array([(i % 7) * 20 + 4 for i in range(n)], pa.int32()),
+        spec.DROPOFF_ZONE_KEY: pa.array([(i % 5) * 30 + 13 for i in range(n)], pa.int32()),
+        spec.FARE: [10.0 + i % 9 for i in range(n)],
+        spec.TIP: [1.5] * n,
+        spec.TOTAL: [14.0 + i % 9 for i in range(n)],
+        spec.DISTANCE: [2.0 + (i % 4) / 2 for i in range(n)],
+    })
+    trips_path = tmp_path / "yellow_tripdata_2024-01.parquet"
+    pq.write_table(trips, trips_path, row_group_size=n // 2)
+    zones = shutil.copy(DATASETS / "taxi_zone_lookup.parquet", tmp_path)
+    weather = shutil.copy(DATASETS / "weather_data.parquet", tmp_path)
+    return {"trips": [str(trips_path)], "zones": str(zones), "weather": str(weather)}
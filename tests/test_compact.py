@@ -0,0 +1,12 @@
+import pytest
+
+from taxi_kpi import ENGINES, PipelineConfig, run_pipeline
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_compact_categoricals_are_ordered(sample_inputs, engine):
+    df = run_pipeline(PipelineConfig(**sample_inputs, compact=True), engine=engine)
+
+    for col in ("Borough", "Zone", "service_zone", "day_of_week"):
+        assert df[col].dtype.ordered, col
+    assert list(df["day_of_week"].cat.categories[:2]) == ["Monday", "Tuesday"]
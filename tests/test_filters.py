@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from taxi_kpi import ENGINES, PipelineConfig, run_pipeline, spec
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+@pytest.mark.parametrize("window", [
+    {"start": "2025-01-01", "end": "2025-02-01"},   # no pickup in range: every row group pruned
+    {"pickup_zones": [1]},                           # zone absent from the sample
+])
+def test_empty_filter_gives_empty_typed_result(sample_inputs, engine, window):
+    df = run_pipeline(PipelineConfig(**sample_inputs, **window), engine=engine)
+
+    assert df.empty
+    assert list(df.columns) == spec.output_columns()
+    assert pd.api.types.is_datetime64_any_dtype(df[spec.HOUR_KEY])
+    assert pd.api.types.is_integer_dtype(df[spec.ZONE_KEY])
+    assert pd.api.types.is_integer_dtype(df["trips"])
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_window_and_zones_drop_rows_before_aggregation(sample_inputs, engine):
+    config = PipelineConfig(**sample_inputs, start="2024-01-03", end="2024-01-05", pickup_zones=[4, 24])
+
+    df = run_pipeline(config, engine=engine)
+
+    assert not df.empty
+    assert df[spec.HOUR_KEY].min() >= pd.Timestamp("2024-01-03")
+    assert df[spec.HOUR_KEY].max() < pd.Timestamp("2024-01-05")
+    assert set(df[spec.ZONE_KEY]) <= {4, 24}
+    # 37-minute spacing from midnight Jan 1, zones cycle every 7 trips (4, 24 = positions 0 and 1)
+    expected = sum(1 for i in range(400)
+                   if 2 * 1440 <= 37 * i < 4 * 1440 and i % 7 in (0, 1))
+    assert df["trips"].sum() == expected
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from taxi_kpi import PipelineConfig, run_pipeline, spec
+from taxi_kpi.engines.pandas_stream_engine import stream_partials
+from taxi_kpi.filters import trip_filter
+
+
+def test_no_surviving_batch_gives_typed_partials(sample_inputs):
+    config = PipelineConfig(**sample_inputs, start="2025-01-01", end="2025-02-01")
+
+    partials = stream_partials(config.trips, flt=trip_filter(config))
+
+    assert partials.empty
+    assert list(partials.columns) == spec.PARTIAL_COLUMNS
+    assert pd.api.types.is_datetime64_any_dtype(partials[spec.HOUR_KEY])
+    assert partials[spec.ZONE_KEY].dtype == "int32"
+    assert partials[spec.ROWS_PARTIAL].dtype == "int64"
+
+
+def test_zero_match_build_is_empty(sample_inputs):
+    config = PipelineConfig(**sample_inputs, start="2025-01-01", end="2025-02-01")
+
+    df = run_pipeline(config, engine="pandas-stream")
+
+    assert df.empty
+    assert list(df.columns) == spec.output_columns()